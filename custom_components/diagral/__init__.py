@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
+import asyncio
 from dataclasses import asdict
+from functools import partial
 import logging
 from urllib.parse import urlparse
 
@@ -10,30 +12,39 @@ from pydiagral.api import DiagralAPI
 from pydiagral.exceptions import DiagralAPIError
 from pydiagral.models import Webhook
 
-from homeassistant.components.webhook import (
-    async_generate_id as webhook_generate_id,
-    # SUPPORTED_METHODS,
-    async_register as webhook_async_register,
-    async_unregister as webhook_async_unregister,
-)
+from homeassistant.components.webhook import async_generate_id as webhook_generate_id
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME, Platform
 from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.exceptions import ConfigEntryNotReady, HomeAssistantError
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.network import NoURLAvailableError, get_url
+from homeassistant.helpers.typing import ConfigType
 
 from .const import (
     CONF_API_KEY,
     CONF_PIN_CODE,
     CONF_SECRET_KEY,
     CONF_SERIAL_ID,
+    CONF_WEBHOOK_ID,
+    CONF_WEBHOOK_URL,
     CONFIG_VERSION,
     DOMAIN,
     HA_CLOUD_DOMAIN,
+    WEBHOOK_RETRY_INITIAL_DELAY,
+    WEBHOOK_RETRY_MAX_ATTEMPTS,
+    WEBHOOK_RETRY_MAX_DELAY,
 )
 from .coordinator import DiagralDataUpdateCoordinator
 from .models import DiagralConfigData, DiagralData
-from .webhook import handle_webhook
+from .services import async_setup_services
+from .session import async_create_diagral_api
+from .storage import DiagralSnapshotStore
+from .webhook import (
+    async_process_notification,
+    async_register_webhook_handler,
+    async_unregister_webhook_handler,
+)
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
@@ -44,6 +55,22 @@ PLATFORMS: list[Platform] = [
 
 type DiagralConfigEntry = ConfigEntry[DiagralData]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+class WebhookUnavailable(HomeAssistantError):
+    """Error to indicate the webhook cannot be created with the current setup.
+
+    Unlike Diagral cloud or network failures, retrying does not help until
+    the setup changes (external URL, cloud subscription).
+    """
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the actions of the Diagral domain."""
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: DiagralConfigEntry) -> bool:
     """Set up Diagral from a config entry."""
@@ -52,7 +79,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: DiagralConfigEntry) -> b
     config_dict = asdict(config)
 
     try:
-        api = DiagralAPI(
+        api = async_create_diagral_api(
+            hass,
             username=config_dict[CONF_USERNAME],
             password=config_dict[CONF_PASSWORD],
             serial_id=config_dict[CONF_SERIAL_ID],
@@ -60,19 +88,34 @@ async def async_setup_entry(hass: HomeAssistant, entry: DiagralConfigEntry) -> b
             secret_key=config_dict[CONF_SECRET_KEY],
             pincode=config_dict[CONF_PIN_CODE],
         )
+        coordinator = DiagralDataUpdateCoordinator(
+            hass, api, DiagralSnapshotStore(hass, entry.entry_id)
+        )
+        if await coordinator.async_restore_snapshot():
+            # Entities are created from the snapshot, refresh in the background
+            entry.async_create_background_task(
+                hass,
+                coordinator.async_refresh(),
+                f"{DOMAIN}_{entry.entry_id}_initial_refresh",
+            )
+        else:
+            await coordinator.async_config_entry_first_refresh()
 
-        await api.__aenter__()  # Open the session explicitly  # pylint: disable=C2801
-        coordinator = DiagralDataUpdateCoordinator(hass, api)
-        await coordinator.async_config_entry_first_refresh()
-
-        # Register the webhook
-        webhook_id = await register_webhook(hass, entry, api, "setup_entry")
-
+        # The webhook is provisioned in the background once entities are set up
         entry.runtime_data = DiagralData(
-            config=config, coordinator=coordinator, api=api, webhook_id=webhook_id
+            config=config, coordinator=coordinator, api=api, webhook_id=None
+        )
+        entry.runtime_data.webhook_queue.async_start(
+            hass, entry, partial(async_process_notification, hass, entry)
         )
         await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+        entry.async_create_background_task(
+            hass,
+            async_provision_webhook(hass, entry, api),
+            f"{DOMAIN}_{entry.entry_id}_provision_webhook",
+        )
+
     except DiagralAPIError as err:
         _LOGGER.error("Failed to set up Diagral integration: %s", err)
         raise ConfigEntryNotReady from err
@@ -107,13 +150,72 @@ async def async_migrate_entry(hass: HomeAssistant, config_entry: DiagralConfigEn
     return True
 
 
+async def async_provision_webhook(
+    hass: HomeAssistant,
+    entry: DiagralConfigEntry,
+    api: DiagralAPI,
+) -> str | None:
+    """Register the webhook, retrying with an exponential backoff on failure.
+
+    Only transient failures (Diagral cloud, network) are retried.
+    """
+    delay = WEBHOOK_RETRY_INITIAL_DELAY
+    for attempt in range(1, WEBHOOK_RETRY_MAX_ATTEMPTS + 1):
+        try:
+            webhook_id = await register_webhook(hass, entry, api, "setup_entry")
+        except WebhookUnavailable as err:
+            _LOGGER.error(
+                "Webhook cannot be created for %s: %s. Use the register_webhook "
+                "action once fixed",
+                entry.title,
+                err,
+            )
+            return None
+        except DiagralAPIError as err:
+            _LOGGER.warning("Failed to register webhook for %s: %s", entry.title, err)
+            webhook_id = None
+
+        if webhook_id is not None:
+            entry.runtime_data.webhook_id = webhook_id
+            entry.runtime_data.coordinator.async_set_webhook_registered(True)
+            return webhook_id
+
+        if attempt == WEBHOOK_RETRY_MAX_ATTEMPTS:
+            break
+        _LOGGER.info(
+            "Webhook registration attempt %s/%s failed for %s. Retrying in %s seconds",
+            attempt,
+            WEBHOOK_RETRY_MAX_ATTEMPTS,
+            entry.title,
+            delay,
+        )
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, WEBHOOK_RETRY_MAX_DELAY)
+
+    _LOGGER.error(
+        "Webhook registration failed %s times for %s. Use the register_webhook action to retry",
+        WEBHOOK_RETRY_MAX_ATTEMPTS,
+        entry.title,
+    )
+    return None
+
+
 async def register_webhook(
     hass: HomeAssistant,
     entry: DiagralConfigEntry,
     api: DiagralAPI,
     source: str = "Unknown",
+    force: bool = False,
 ) -> str | None:
-    """Register the webhook for Diagral."""
+    """Register the webhook for Diagral.
+
+    The webhook_id and URL are stored in the config entry and reused across
+    reloads and restarts. The Diagral cloud is only called when the URL changed
+    or when the registration is forced.
+
+    Return None when the registration failed and may succeed later, raise
+    WebhookUnavailable when it cannot succeed with the current setup.
+    """
     from homeassistant.components.cloud import (  # noqa: PLC0415
         CloudNotAvailable,
         CloudNotConnected,
@@ -122,7 +224,7 @@ async def register_webhook(
     )
 
     _LOGGER.debug("Webhook registration requested by '%s' for %s", source, entry.title)
-    webhook_id: str = webhook_generate_id()
+    webhook_id: str = entry.data.get(CONF_WEBHOOK_ID) or webhook_generate_id()
     # Get the external URL recommended for the webhook (priority to external before cloud)
     try:
         external_url = get_url(
@@ -133,14 +235,12 @@ async def register_webhook(
             prefer_external=True,
         )
         _LOGGER.debug("Returned external URL for webhook : %s", external_url)
-    except NoURLAvailableError:
-        _LOGGER.error(
-            "No URL available for Diagral webhook matching criteria (ssl, external). Webhook will not be created"
-        )
-        return None
+    except NoURLAvailableError as err:
+        raise WebhookUnavailable(
+            "No URL available for Diagral webhook matching criteria (ssl, external)"
+        ) from err
 
     if external_url is not None:
-        webhook_set_needed = True
         # If the external URL is a Nabu Casa URL, use the cloudhook
         if external_url.endswith(HA_CLOUD_DOMAIN):
             _LOGGER.debug(
@@ -152,101 +252,120 @@ async def register_webhook(
                     webhook_url = await cloud_get_or_create_cloudhook(hass, webhook_id)
                 else:
                     # If the cloud subscription is not active, we cannot create a webhook
-                    _LOGGER.error(
-                        "Cloud subscription not active. Webhook will not be created"
-                    )
-                    return None
-            except (CloudNotConnected, CloudNotAvailable):
-                _LOGGER.error(
-                    "Cloud not connected or not available. Webhook will not be created"
-                )
+                    raise WebhookUnavailable("Cloud subscription not active")
+            except CloudNotConnected:
+                _LOGGER.warning("Cloud not connected. Webhook will not be created")
                 return None
+            except CloudNotAvailable as err:
+                raise WebhookUnavailable("Cloud not available") from err
             except ValueError as e:
-                _LOGGER.error("Failed to create cloudhook: %s", e)
-                return None
+                raise WebhookUnavailable(f"Failed to create cloudhook: {e}") from e
         else:  # Use the external URL
             webhook_url = f"{external_url}/api/webhook/{webhook_id}"
             _LOGGER.debug("Selected external URL for webhook : %s", webhook_url)
 
-        # Check if the webhook is already registered
-        try:
-            actual_webhook: Webhook = await api.get_webhook()
-            # If the webhook is already registered, update the URL
-            # Trigger warning if the URL is different (not same scheme and hostname)
-            if actual_webhook is not None:
-                _LOGGER.debug(
-                    "Actual Webhook : %s / New Webhook : %s",
-                    actual_webhook,
-                    webhook_url,
-                )
-                if actual_webhook.webhook_url.startswith(
-                    f"{urlparse(webhook_url).scheme}://{urlparse(webhook_url).hostname}"
-                ):
-                    _LOGGER.info(
-                        "Webhook already registered for %s on %s. Updating URL to %s",
-                        entry.title,
-                        actual_webhook.webhook_url,
-                        webhook_url,
-                    )
-                else:
-                    _LOGGER.warning(
-                        "A Webhook subscription already exists for another URL (%s). Integration will force update of webhook_url to %s",
-                        actual_webhook.webhook_url,
-                        webhook_url,
-                    )
-                await api.update_webhook(
-                    webhook_url=webhook_url,
-                    subscribe_to_anomaly=True,
-                    subscribe_to_alert=True,
-                    subscribe_to_state=True,
-                )
-                webhook_set_needed = False
-        except DiagralAPIError as err:
-            if "No subscription found for" in str(err):
-                pass
-            else:
-                raise
+        if not force and webhook_url == entry.data.get(CONF_WEBHOOK_URL):
+            _LOGGER.debug(
+                "Webhook URL unchanged for %s. Reusing the Diagral subscription",
+                entry.title,
+            )
+        else:
+            if not await _async_set_diagral_webhook(entry, api, webhook_url):
+                return None
+            hass.config_entries.async_update_entry(
+                entry,
+                data={
+                    **entry.data,
+                    CONF_WEBHOOK_ID: webhook_id,
+                    CONF_WEBHOOK_URL: webhook_url,
+                },
+            )
 
-        # If the webhook is not registered, register it
-        if webhook_set_needed:
-            try:
-                await api.register_webhook(
-                    webhook_url=webhook_url,
-                    subscribe_to_anomaly=True,
-                    subscribe_to_alert=True,
-                    subscribe_to_state=True,
-                )
-            except DiagralAPIError as e:
-                _LOGGER.error(
-                    "Failed to create webhook for %s on %s : %s",
+        async_register_webhook_handler(hass, entry, webhook_id)
+        _LOGGER.info("Webhook successfully registered for %s", entry.title)
+
+    return webhook_id
+
+
+async def _async_set_diagral_webhook(
+    entry: DiagralConfigEntry, api: DiagralAPI, webhook_url: str
+) -> bool:
+    """Create or update the webhook subscription on the Diagral cloud."""
+    webhook_set_needed = True
+    # Check if the webhook is already registered
+    try:
+        actual_webhook: Webhook = await api.get_webhook()
+        # If the webhook is already registered, update the URL
+        # Trigger warning if the URL is different (not same scheme and hostname)
+        if actual_webhook is not None:
+            _LOGGER.debug(
+                "Actual Webhook : %s / New Webhook : %s",
+                actual_webhook,
+                webhook_url,
+            )
+            if actual_webhook.webhook_url.startswith(
+                f"{urlparse(webhook_url).scheme}://{urlparse(webhook_url).hostname}"
+            ):
+                _LOGGER.info(
+                    "Webhook already registered for %s on %s. Updating URL to %s",
                     entry.title,
+                    actual_webhook.webhook_url,
                     webhook_url,
-                    e,
                 )
-                return None
             else:
-                _LOGGER.info(
-                    "Webhook successfully created for %s on : %s",
-                    entry.title,
+                _LOGGER.warning(
+                    "A Webhook subscription already exists for another URL (%s). Integration will force update of webhook_url to %s",
+                    actual_webhook.webhook_url,
                     webhook_url,
                 )
+            await api.update_webhook(
+                webhook_url=webhook_url,
+                subscribe_to_anomaly=True,
+                subscribe_to_alert=True,
+                subscribe_to_state=True,
+            )
+            webhook_set_needed = False
+    except DiagralAPIError as err:
+        if "No subscription found for" in str(err):
+            pass
+        else:
+            raise
 
-        webhook_async_register(
-            hass, DOMAIN, "Diagral Webhook", webhook_id, handle_webhook
-        )
-        _LOGGER.info("Webhook successfully registered for %s", entry.title)
+    # If the webhook is not registered, register it
+    if webhook_set_needed:
+        try:
+            await api.register_webhook(
+                webhook_url=webhook_url,
+                subscribe_to_anomaly=True,
+                subscribe_to_alert=True,
+                subscribe_to_state=True,
+            )
+        except DiagralAPIError as e:
+            _LOGGER.error(
+                "Failed to create webhook for %s on %s : %s",
+                entry.title,
+                webhook_url,
+                e,
+            )
+            return False
+        else:
+            _LOGGER.info(
+                "Webhook successfully created for %s on : %s",
+                entry.title,
+                webhook_url,
+            )
 
-    return webhook_id
+    return True
 
 
 async def unregister_webhook(
     hass: HomeAssistant,
     entry: DiagralConfigEntry,
     api: DiagralAPI,
-    webhook_id: str,
+    webhook_id: str | None,
     source: str = "Unknown",
 ) -> None:
-    """Unregister the webhook for Diagral."""
+    """Unregister the webhook for Diagral and delete it from the Diagral cloud."""
     from homeassistant.components.cloud import async_delete_cloudhook as cloud_delete_cloudhook  # noqa: PLC0415
 
     _LOGGER.debug(
@@ -274,21 +393,28 @@ async def unregister_webhook(
                     await cloud_delete_cloudhook(hass, webhook_id)
                 except ValueError as e:
                     _LOGGER.error("Failed to delete cloudhook: %s", e)
-            else:
-                webhook_async_unregister(hass, webhook_id)
+            async_unregister_webhook_handler(hass, webhook_id)
+            # Forget the webhook so that the next registration creates a new one
+            hass.config_entries.async_update_entry(
+                entry,
+                data={
+                    key: value
+                    for key, value in entry.data.items()
+                    if key not in (CONF_WEBHOOK_ID, CONF_WEBHOOK_URL)
+                },
+            )
             # Force the webhook_id in the entry runtime data to be sure it is saved
             entry.runtime_data.webhook_id = None
+            entry.runtime_data.coordinator.async_set_webhook_registered(False)
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: DiagralConfigEntry) -> bool:
     """Unload a config entry."""
 
-    api: DiagralAPI = entry.runtime_data.api
-    webhook_id: str = entry.runtime_data.webhook_id
-
-    await unregister_webhook(hass, entry, api, webhook_id, "unload_entry")
-
-    await api.__aexit__(None, None, None)  # Close explicitly the session
+    # Only stop handling the webhook locally: the Diagral subscription (and the
+    # cloudhook) are kept to be reused on the next setup
+    if webhook_id := entry.runtime_data.webhook_id:
+        async_unregister_webhook_handler(hass, webhook_id)
 
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         if DOMAIN in hass.data and entry.entry_id in hass.data[DOMAIN]:
@@ -299,27 +425,57 @@ async def async_unload_entry(hass: HomeAssistant, entry: DiagralConfigEntry) ->
 
 async def async_remove_entry(hass: HomeAssistant, entry: DiagralConfigEntry) -> None:
     """Handle removal of an entry."""
+    await DiagralSnapshotStore(hass, entry.entry_id).async_remove()
+
     # Retrieve the stored API key
     apikey = entry.data.get(CONF_API_KEY)
 
     if apikey:
         try:
-            async with DiagralAPI(
+            diagral = async_create_diagral_api(
+                hass,
                 username=entry.data[CONF_USERNAME],
                 password=entry.data[CONF_PASSWORD],
                 serial_id=entry.data[CONF_SERIAL_ID],
-            ) as diagral:
-                await diagral.login()
-                try:
-                    await diagral.delete_apikey(apikey=apikey)
-                    _LOGGER.info(
-                        "API key %s successfully deleted for %s during entry removal",
-                        apikey,
-                        entry.title,
-                    )
-                except DiagralAPIError as e:
-                    _LOGGER.error("Failed to delete API key for %s: %s", entry.title, e)
+                apikey=apikey,
+                secret_key=entry.data.get(CONF_SECRET_KEY),
+            )
+            await diagral.login()
+            if webhook_id := entry.data.get(CONF_WEBHOOK_ID):
+                await _async_delete_stored_webhook(hass, entry, diagral, webhook_id)
+            try:
+                await diagral.delete_apikey(apikey=apikey)
+                _LOGGER.info(
+                    "API key %s successfully deleted for %s during entry removal",
+                    apikey,
+                    entry.title,
+                )
+            except DiagralAPIError as e:
+                _LOGGER.error("Failed to delete API key for %s: %s", entry.title, e)
         except DiagralAPIError as e:
             _LOGGER.error("Failed to interact with API for %s: %s", entry.title, e)
     else:
         _LOGGER.warning("No API key found for %s, skipping deletion", entry.title)
+
+
+async def _async_delete_stored_webhook(
+    hass: HomeAssistant, entry: DiagralConfigEntry, api: DiagralAPI, webhook_id: str
+) -> None:
+    """Delete the webhook kept across reloads when the entry is removed."""
+    from homeassistant.components.cloud import (  # noqa: PLC0415
+        CloudNotAvailable,
+        async_delete_cloudhook as cloud_delete_cloudhook,
+    )
+
+    try:
+        await api.delete_webhook()
+    except DiagralAPIError as e:
+        _LOGGER.error("Failed to delete webhook for %s: %s", entry.title, e)
+    else:
+        _LOGGER.info("Webhook successfully deleted for %s", entry.title)
+
+    if entry.data.get(CONF_WEBHOOK_URL, "").startswith("https://hooks.nabu.casa/"):
+        try:
+            await cloud_delete_cloudhook(hass, webhook_id)
+        except (CloudNotAvailable, ValueError) as e:
+            _LOGGER.error("Failed to delete cloudhook: %s", e)
@@ -1,16 +1,13 @@
 """Diagral Alarm Control Panel integration for Home Assistant."""
 
+from collections.abc import Callable
+from functools import partial
 import logging
 from typing import Any
 
 from pydiagral.api import DiagralAPI
 from pydiagral.exceptions import DiagralAPIError
-from pydiagral.models import (
-    AlarmConfiguration,
-    Group,
-    SystemStatus,
-    WebHookNotificationUser,
-)
+from pydiagral.models import AlarmConfiguration, Group, SystemStatus
 import voluptuous as vol
 
 from homeassistant.components.alarm_control_panel import (
@@ -19,28 +16,66 @@ from homeassistant.components.alarm_control_panel import (
     AlarmControlPanelState,
     CodeFormat,
 )
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
 from homeassistant.helpers import entity_platform
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from . import DiagralConfigEntry, register_webhook, unregister_webhook
+from . import (
+    DiagralConfigEntry,
+    WebhookUnavailable,
+    register_webhook,
+    unregister_webhook,
+)
 from .const import (
     CONF_ALARMPANEL_ACTIONTYPE_CODE,
-    CONF_ALARMPANEL_CODE,
     DOMAIN,
     INPUT_GROUPS,
+    MODE_ARM_AWAY,
+    MODE_ARM_HOME,
+    MODE_DISARM,
     SERVICE_ARM_GROUP,
     SERVICE_DISARMGROUP,
+    SERVICE_REFRESH_CONFIGURATION,
     SERVICE_REGISTER_WEBHOOK,
+    SERVICE_SET_GROUPS,
     SERVICE_UNREGISTER_WEBHOOK,
+    SIGNAL_WEBHOOK_EVENT,
 )
-from .coordinator import DiagralDataUpdateCoordinator
+from .commands import (
+    MODE_COMMANDS,
+    DiagralCommandQueue,
+    DiagralModeCommand,
+    validate_code,
+)
+from .confirmation import DiagralCommandWaiter
+from .coordinator import DiagralDataUpdateCoordinator, get_active_groups
 from .entity import DiagralEntity
+from .lookup import EMPTY_LOOKUP_INDEX, DiagralLookupIndex
 from .models import DiagralConfigData
 
 _LOGGER = logging.getLogger(__name__)
 
+# Check of the active groups confirming a group command
+GROUP_COMMAND_CHECKS: dict[str, Callable[[set[int], set[int]], bool]] = {
+    "activate_group": lambda groups, active: groups.issubset(active),
+    "disable_group": lambda groups, active: groups.isdisjoint(active),
+}
+GROUP_COMMAND_DESCRIPTIONS: dict[str, str] = {
+    "activate_group": "arm group(s)",
+    "disable_group": "disarm group(s)",
+}
+GROUP_COMMAND_RESPONSE_KEYS: dict[str, str] = {
+    "activate_group": "activated",
+    "disable_group": "disabled",
+}
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -64,6 +99,12 @@ async def async_setup_entry(
         {vol.Required(INPUT_GROUPS): vol.Any(vol.Coerce(int), [vol.Coerce(int)])},
         DiagralAlarmControlPanel.action_disarm_groups.__name__,
     )
+    platform.async_register_entity_service(
+        SERVICE_SET_GROUPS,
+        {vol.Required(INPUT_GROUPS): vol.Any(vol.Coerce(int), [vol.Coerce(int)])},
+        DiagralAlarmControlPanel.action_set_groups.__name__,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
     platform.async_register_entity_service(
         SERVICE_REGISTER_WEBHOOK,
         None,
@@ -74,12 +115,18 @@ async def async_setup_entry(
         None,
         DiagralAlarmControlPanel.action_unregister_webhook.__name__,
     )
+    platform.async_register_entity_service(
+        SERVICE_REFRESH_CONFIGURATION,
+        None,
+        DiagralAlarmControlPanel.action_refresh_configuration.__name__,
+    )
 
     # Create the alarm control panel entity
-    async_add_entities(
-        [DiagralAlarmControlPanel(hass, entry, entry.entry_id, coordinator, config)],
-        True,
+    alarm_panel = DiagralAlarmControlPanel(
+        hass, entry, entry.entry_id, coordinator, config
     )
+    entry.runtime_data.alarm_panel = alarm_panel
+    async_add_entities([alarm_panel], True)
 
 
 class DiagralAlarmControlPanel(DiagralEntity, AlarmControlPanelEntity):
@@ -94,7 +141,7 @@ class DiagralAlarmControlPanel(DiagralEntity, AlarmControlPanelEntity):
         config: DiagralConfigData,
     ) -> None:
         """Initialize the Diagral Alarm Control Panel."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, frozenset({"system_status"}))
         self._config = config
         self._alarm_config: AlarmConfiguration = coordinator.data.get(
             "alarm_config", {}
@@ -107,18 +154,32 @@ class DiagralAlarmControlPanel(DiagralEntity, AlarmControlPanelEntity):
         )
         self._changed_by: str = ""
         self._api: DiagralAPI = entry.runtime_data.api
+        self._commands: DiagralCommandQueue = entry.runtime_data.command_queue
         self._attr_code_arm_required: bool = self._is_code_arm_required()
         self._attr_supported_features = (
             AlarmControlPanelEntityFeature.ARM_AWAY
             | AlarmControlPanelEntityFeature.ARM_HOME
         )
         self._attr_extra_state_attributes: dict[str, Any] = {}
+        # Last mode command, until confirmed by the alarm or expired
+        self._pending_command: DiagralCommandWaiter | None = None
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         system_status: SystemStatus = self.coordinator.data.get("system_status")
 
+        if self._pending_command is not None:
+            if not self._pending_command.done:
+                # The status predates the command, keep the optimistic state
+                _LOGGER.debug(
+                    "Waiting for %s confirmation, ignoring %s",
+                    self._pending_command.command,
+                    system_status,
+                )
+                return
+            self._pending_command = None
+
         # Update the status of the alarm
         new_state: AlarmControlPanelState | None = self._get_ha_state(system_status)
         if new_state:
@@ -197,39 +258,16 @@ class DiagralAlarmControlPanel(DiagralEntity, AlarmControlPanelEntity):
 
     def _validate_code(self, to_state, code_provided: int | None = None) -> bool:
         """Validate given code."""
-        code = self._config.options.alarmpanel_options[CONF_ALARMPANEL_CODE]
-        trigger = self._config.options.alarmpanel_options[
-            CONF_ALARMPANEL_ACTIONTYPE_CODE
-        ]
-
-        # Convert code to int if not None
-        if code_provided is not None:
-            code_provided = int(code_provided)
-
-        if trigger == "never":
-            _LOGGER.debug("Code validation not required")
-            return True
-
-        if (
-            trigger == "disarm" and to_state == AlarmControlPanelState.DISARMED
-        ) or trigger == "always":
-            _LOGGER.debug("Code validation required")
-            if code is None:
-                _LOGGER.error("Code is not set in the configuration")
-                return False
-            return code_provided == code
-        return True
+        return validate_code(
+            self._config.options.alarmpanel_options, to_state, code_provided
+        )
 
     async def async_alarm_disarm(self, code: int | None = None) -> None:
         """Send disarm command."""
         if self._validate_code(
             to_state=AlarmControlPanelState.DISARMED, code_provided=code
         ):
-            try:
-                await self._api.stop_system()
-                await self.coordinator.async_request_refresh()
-            except DiagralAPIError as e:
-                _LOGGER.error("Failed to disarm Diagral alarm : %s", e)
+            await self._async_send_mode_command(MODE_COMMANDS[MODE_DISARM])
         else:
             _LOGGER.error("Invalid code provided for disarming")
 
@@ -238,11 +276,7 @@ class DiagralAlarmControlPanel(DiagralEntity, AlarmControlPanelEntity):
         if self._validate_code(
             to_state=AlarmControlPanelState.ARMED_AWAY, code_provided=code
         ):
-            try:
-                await self._api.start_system()
-                await self.coordinator.async_request_refresh()
-            except DiagralAPIError as e:
-                _LOGGER.error("Failed to arm Diagral alarm in away mode: %s", e)
+            await self._async_send_mode_command(MODE_COMMANDS[MODE_ARM_AWAY])
         else:
             _LOGGER.error("Invalid code provided for arming away")
 
@@ -251,25 +285,97 @@ class DiagralAlarmControlPanel(DiagralEntity, AlarmControlPanelEntity):
         if self._validate_code(
             to_state=AlarmControlPanelState.ARMED_HOME, code_provided=code
         ):
-            try:
-                await self._api.presence()
-                await self.coordinator.async_request_refresh()
-            except DiagralAPIError as e:
-                _LOGGER.error("Failed to arm Diagral alarm in home mode: %s", e)
+            await self._async_send_mode_command(MODE_COMMANDS[MODE_ARM_HOME])
         else:
             _LOGGER.error("Invalid code provided for arming home")
 
+    async def _async_send_mode_command(self, mode: DiagralModeCommand) -> None:
+        """Send a mode command requested from the alarm panel."""
+        try:
+            await self.async_send_mode(mode)
+        except DiagralAPIError as e:
+            _LOGGER.error("Failed to %s: %s", mode.description, e)
+
+    async def async_send_mode(self, mode: DiagralModeCommand) -> bool:
+        """Queue a mode command, superseding the mode commands still waiting.
+
+        Return False when the command was superseded before being sent.
+        """
+        return await self._commands.async_run(
+            partial(self._async_run_mode_command, mode), key="mode"
+        )
+
+    async def _async_run_mode_command(self, mode: DiagralModeCommand) -> None:
+        """Send a mode command, showing its transition state until confirmed."""
+        waiter: DiagralCommandWaiter = self.coordinator.confirmations.expect(
+            mode.command, mode.is_confirmed_by
+        )
+        previous_state: AlarmControlPanelState | None = self._attr_alarm_state
+        self._pending_command = waiter
+        # Apply the alarm status once the command is confirmed or expired
+        waiter.future.add_done_callback(
+            lambda _: self._async_command_done(waiter, previous_state)
+        )
+        # A triggered alarm stays triggered until it is disarmed
+        if (
+            previous_state != AlarmControlPanelState.TRIGGERED
+            or mode.target_state == AlarmControlPanelState.DISARMED
+        ):
+            self._attr_alarm_state = mode.transition_state
+            self.async_write_ha_state()
+        sent = False
+        try:
+            await self.coordinator.async_send_command(waiter)
+            sent = True
+        finally:
+            # Also roll back on unexpected errors and cancellation
+            if not sent and self._pending_command is waiter:
+                self._pending_command = None
+                self._attr_alarm_state = previous_state
+                self.async_write_ha_state()
+
+    async def _async_send_command(
+        self, waiter: DiagralCommandWaiter, description: str, *args: Any
+    ) -> bool:
+        """Send a command and let the coordinator track its confirmation."""
+        try:
+            await self.coordinator.async_send_command(waiter, *args)
+        except DiagralAPIError as e:
+            _LOGGER.error("Failed to %s: %s", description, e)
+            return False
+        return True
+
+    @callback
+    def _async_command_done(
+        self,
+        waiter: DiagralCommandWaiter,
+        previous_state: AlarmControlPanelState | None,
+    ) -> None:
+        """Show the alarm status once the pending command is resolved."""
+        if self._pending_command is not waiter:
+            return
+        if not waiter.confirmed:
+            # Apply the status from the state before the command (a trigger)
+            self._attr_alarm_state = previous_state
+        self._handle_coordinator_update()
+        # The update only writes changes from the state it compares with, which
+        # may already be the rolled back state
+        self.async_write_ha_state()
+
+    @callback
+    def _async_clear_pending_command(self) -> None:
+        """Stop waiting for the pending command."""
+        self._pending_command = None
+
     async def action_arm_groups(self, group_ids: int | list[int]) -> None:
         """Activate one or more groups."""
         _LOGGER.debug("Arming group %s with API instance: %s", group_ids, id(self._api))
         if isinstance(group_ids, int):
             group_ids = [group_ids]
             _LOGGER.debug("Armed group(s) after transformation: %s", group_ids)
-        try:
-            await self._api.activate_group(group_ids)
-            await self.coordinator.async_request_refresh()
-        except DiagralAPIError as e:
-            _LOGGER.error("Failed to arm group(s): %s", e)
+        await self._commands.async_run(
+            partial(self._async_send_group_command, "activate_group", group_ids)
+        )
 
     async def action_disarm_groups(self, group_ids: int | list[int]) -> None:
         """Disarm one or more groups."""
@@ -279,20 +385,111 @@ class DiagralAlarmControlPanel(DiagralEntity, AlarmControlPanelEntity):
         if isinstance(group_ids, int):
             group_ids = [group_ids]
             _LOGGER.debug("Disarmed group(s) after transformation: %s", group_ids)
-        try:
-            await self._api.disable_group(group_ids)
-            await self.coordinator.async_request_refresh()
-        except DiagralAPIError as e:
-            _LOGGER.error("Failed to disarm group(s): %s", e)
+        await self._commands.async_run(
+            partial(self._async_send_group_command, "disable_group", group_ids)
+        )
+
+    async def action_set_groups(self, group_ids: int | list[int]) -> ServiceResponse:
+        """Set the active groups, only sending the groups that change."""
+        desired: set[int] = (
+            {group_ids} if isinstance(group_ids, int) else set(group_ids)
+        )
+        lookup: DiagralLookupIndex = self.coordinator.data.get(
+            "lookup", EMPTY_LOOKUP_INDEX
+        )
+        if unknown := desired - lookup.groups.keys():
+            raise ServiceValidationError(
+                translation_domain=DOMAIN,
+                translation_key="unknown_groups",
+                translation_placeholders={
+                    "group_ids": ", ".join(map(str, sorted(unknown)))
+                },
+            )
+        response: dict[str, Any] = {
+            "activated": [],
+            "disabled": [],
+            "superseded": True,
+            "error": None,
+        }
+
+        async def send() -> None:
+            response["superseded"] = False
+            # Computed when the command runs, after the commands queued before
+            active: set[int] = self._active_groups(
+                self.coordinator.data.get("system_status")
+            )
+            _LOGGER.debug("Setting active groups from %s to %s", active, desired)
+            for command, group_ids in (
+                ("activate_group", sorted(desired - active)),
+                ("disable_group", sorted(active - desired)),
+            ):
+                if not group_ids:
+                    continue
+                try:
+                    await self.coordinator.async_send_command(
+                        self._expect_group_command(command, group_ids), group_ids
+                    )
+                except DiagralAPIError as e:
+                    _LOGGER.error(
+                        "Failed to %s: %s", GROUP_COMMAND_DESCRIPTIONS[command], e
+                    )
+                    # The groups sent by a previous step stay in the response
+                    response["error"] = {
+                        "command": command,
+                        "group_ids": group_ids,
+                        "message": str(e),
+                    }
+                    return
+                response[GROUP_COMMAND_RESPONSE_KEYS[command]] = group_ids
+
+        # A newer groups request replaces this one while it waits
+        await self._commands.async_run(send, key="groups")
+        return response
+
+    def _active_groups(self, system_status: SystemStatus | None) -> set[int]:
+        """Return the active groups, as shown by the active groups sensor."""
+        if system_status is None:
+            return set()
+        return set(
+            get_active_groups(system_status, self.coordinator.data.get("alarm_config"))
+        )
+
+    def _expect_group_command(
+        self, command: str, group_ids: list[int]
+    ) -> DiagralCommandWaiter:
+        """Register the confirmation of a group command."""
+        groups: set[int] = set(group_ids)
+        return self.coordinator.confirmations.expect(
+            command,
+            lambda status: GROUP_COMMAND_CHECKS[command](
+                groups, self._active_groups(status)
+            ),
+        )
+
+    async def _async_send_group_command(
+        self, command: str, group_ids: list[int]
+    ) -> bool:
+        """Send a group command and let the coordinator track its confirmation."""
+        return await self._async_send_command(
+            self._expect_group_command(command, group_ids),
+            GROUP_COMMAND_DESCRIPTIONS[command],
+            group_ids,
+        )
 
     async def action_register_webhook(self) -> None:
         """Register the webhook for Diagral."""
         entry = self.hass.config_entries.async_get_entry(self._entry_id)
-        webhook_id = await register_webhook(
-            self.hass, entry, entry.runtime_data.api, "HA Action"
-        )
+        # Always push the webhook to the Diagral cloud when explicitly requested
+        try:
+            webhook_id = await register_webhook(
+                self.hass, entry, entry.runtime_data.api, "HA Action", force=True
+            )
+        except WebhookUnavailable as err:
+            _LOGGER.error("Webhook cannot be created for %s: %s", entry.title, err)
+            webhook_id = None
         # Force the webhook_id in the entry runtime data to be sure it is saved
         entry.runtime_data.webhook_id = webhook_id
+        self.coordinator.async_set_webhook_registered(webhook_id is not None)
 
     async def action_unregister_webhook(self) -> None:
         """Unregister the webhook for Diagral."""
@@ -307,14 +504,22 @@ class DiagralAlarmControlPanel(DiagralEntity, AlarmControlPanelEntity):
             "HA Action",
         )
 
+    async def action_refresh_configuration(self) -> None:
+        """Refresh the configuration, devices and groups from Diagral Cloud."""
+        self.coordinator.async_invalidate_static_data("HA Action")
+        await self.coordinator.async_request_refresh()
+
     async def async_added_to_hass(self) -> None:
         """Register callbacks."""
         await super().async_added_to_hass()
+        self.async_on_remove(self._async_clear_pending_command)
         # Register callbacks for webhook events (STATUS)
         self.async_on_remove(
             async_dispatcher_connect(
                 self.hass,
-                f"signal-{DOMAIN}-webhook-STATUS",
+                SIGNAL_WEBHOOK_EVENT.format(
+                    entry_id=self._entry_id, alarm_type="STATUS"
+                ),
                 self._handle_event_status,
             )
         )
@@ -322,7 +527,9 @@ class DiagralAlarmControlPanel(DiagralEntity, AlarmControlPanelEntity):
         self.async_on_remove(
             async_dispatcher_connect(
                 self.hass,
-                f"signal-{DOMAIN}-webhook-ALERT",
+                SIGNAL_WEBHOOK_EVENT.format(
+                    entry_id=self._entry_id, alarm_type="ALERT"
+                ),
                 self._handle_event_alert,
             )
         )
@@ -331,9 +538,9 @@ class DiagralAlarmControlPanel(DiagralEntity, AlarmControlPanelEntity):
     def _handle_event_status(self, event) -> None:
         """Handle incoming event for STATUS events."""
         _LOGGER.debug("Alarm Control Panel Received event: %s", event)
-        user_info: WebHookNotificationUser | None = event["data"].get("user", None)
+        user_info: dict[str, Any] | None = event["data"].get("user", None)
         if user_info:
-            changed_by: str = user_info.username
+            changed_by: str = user_info.get("username")
             _LOGGER.debug("Alarm State changed by %s", changed_by)
             self._changed_by = changed_by
             self.async_write_ha_state()
@@ -349,16 +556,14 @@ class DiagralAlarmControlPanel(DiagralEntity, AlarmControlPanelEntity):
         ALARM_INTRUSION_CODES = {1130, 1139, 1141}
         if event_alarm_code in ALARM_INTRUSION_CODES:
             # Set the group name and id
-            groups: list[Group] = self._alarm_config.groups
-            group_index: int | None = (
-                int(event["data"].get("group_index"))
-                if "group_index" in event["data"]
-                else None
+            lookup: DiagralLookupIndex = self.coordinator.data.get(
+                "lookup", EMPTY_LOOKUP_INDEX
             )
+            group_index: int | None = None
+            if (raw_group_index := event["data"].get("group_index")) is not None:
+                group_index = int(raw_group_index)
             if group_index:
-                group: Group = next(
-                    (group for group in groups if group.index == group_index), None
-                )
+                group: Group | None = lookup.group(group_index)
                 # Add group name and id to the attributes
                 trigger_info = {}
                 if group and group.name:
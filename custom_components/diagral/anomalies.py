@@ -0,0 +1,109 @@
+"""Rendering of the Diagral anomalies for the anomalies sensor."""
+
+from __future__ import annotations
+
+from dataclasses import fields
+from operator import attrgetter
+from typing import Any, NamedTuple
+
+from pydiagral.models import Anomalies, AnomalyDetail
+
+from .lookup import DiagralLookupIndex
+
+# Anomaly categories (sensors, badges, ...) in the order of the Anomalies model
+ANOMALY_CATEGORIES: tuple[str, ...] = tuple(
+    field.name for field in fields(Anomalies) if field.name != "created_at"
+)
+# Order of the equipment fields in the attributes, anomaly names being flattened last
+DETAIL_FIELDS: tuple[str, ...] = ("serial", "index", "group", "label")
+
+
+class RenderedAnomalies(NamedTuple):
+    """Anomaly count and details grouped by category."""
+
+    count: int
+    details: dict[str, list[dict[str, Any]]]
+
+
+_equipment_key = attrgetter("serial", "index", "group", "label")
+_anomaly_name_key = attrgetter("id", "name")
+
+
+def anomalies_fingerprint(anomalies: Anomalies) -> tuple:
+    """Return a hashable fingerprint of the anomalies content.
+
+    Built with C-level attribute getters, it is cheaper than a render.
+    """
+    fingerprint: list = []
+    for category in ANOMALY_CATEGORIES:
+        fingerprint.append(category)
+        if equipments := getattr(anomalies, category):
+            fingerprint.extend(map(_equipment_key, equipments))
+            fingerprint.extend(
+                tuple(map(_anomaly_name_key, equipment.anomaly_names or ()))
+                for equipment in equipments
+            )
+    return tuple(fingerprint)
+
+
+def _render_equipment(
+    equipment: AnomalyDetail, lookup: DiagralLookupIndex
+) -> dict[str, Any]:
+    """Render the details of an equipment with anomalies."""
+    detail: dict[str, Any] = {}
+    for key in DETAIL_FIELDS:
+        value = getattr(equipment, key)
+        if value is None:
+            continue
+        if key == "group" and value in lookup.groups:
+            value = lookup.groups[value].name
+        elif key == "index" and value in lookup.device_labels:
+            value = lookup.device_labels[value]
+        detail[key] = value
+    # Flatten anomaly names directly into the details
+    for anomaly in equipment.anomaly_names or ():
+        detail["id"] = anomaly.id
+        detail["name"] = anomaly.name
+    return detail
+
+
+def render_anomalies(
+    anomalies: Anomalies, lookup: DiagralLookupIndex
+) -> RenderedAnomalies:
+    """Count the anomalies and render their details per category."""
+    count = 0
+    details: dict[str, list[dict[str, Any]]] = {}
+    for category in ANOMALY_CATEGORIES:
+        equipments: list[AnomalyDetail] | None = getattr(anomalies, category)
+        if not equipments:
+            continue
+        count += len(equipments)
+        details[category] = [
+            _render_equipment(equipment, lookup) for equipment in equipments
+        ]
+    return RenderedAnomalies(count, details)
+
+
+class DiagralAnomaliesRenderer:
+    """Render anomalies, reusing the last result while they are unchanged."""
+
+    def __init__(self) -> None:
+        """Initialize the renderer."""
+        self._fingerprint: tuple | None = None
+        self._lookup: DiagralLookupIndex | None = None
+        self._rendered: RenderedAnomalies | None = None
+
+    def render(
+        self, anomalies: Anomalies, lookup: DiagralLookupIndex
+    ) -> RenderedAnomalies:
+        """Return the rendered anomalies."""
+        fingerprint = anomalies_fingerprint(anomalies)
+        if (
+            self._rendered is None
+            or lookup is not self._lookup
+            or fingerprint != self._fingerprint
+        ):
+            self._rendered = render_anomalies(anomalies, lookup)
+            self._fingerprint = fingerprint
+            self._lookup = lookup
+        return self._rendered
@@ -0,0 +1,157 @@
+"""Commands sent to the Diagral alarm and their serialization."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+import logging
+import time
+from typing import Any
+
+from pydiagral.models import SystemStatus
+
+from homeassistant.components.alarm_control_panel import AlarmControlPanelState
+
+from .const import (
+    CONF_ALARMPANEL_ACTIONTYPE_CODE,
+    CONF_ALARMPANEL_CODE,
+    MODE_ARM_AWAY,
+    MODE_ARM_HOME,
+    MODE_DISARM,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class DiagralModeCommand:
+    """A command setting the mode of the alarm."""
+
+    # DiagralAPI method sending the command
+    command: str
+    target_state: AlarmControlPanelState
+    # State shown until the alarm confirms the command
+    transition_state: AlarmControlPanelState
+    # Diagral statuses confirming that the alarm accepted the command
+    statuses: frozenset[str]
+    description: str
+
+    def is_confirmed_by(self, system_status: SystemStatus) -> bool:
+        """Return whether a status confirms the command."""
+        return system_status.status.lower() in self.statuses
+
+
+MODE_COMMANDS: dict[str, DiagralModeCommand] = {
+    MODE_DISARM: DiagralModeCommand(
+        "stop_system",
+        AlarmControlPanelState.DISARMED,
+        AlarmControlPanelState.DISARMING,
+        frozenset({"off"}),
+        "disarm Diagral alarm",
+    ),
+    MODE_ARM_AWAY: DiagralModeCommand(
+        "start_system",
+        AlarmControlPanelState.ARMED_AWAY,
+        AlarmControlPanelState.ARMING,
+        frozenset({"group", "tempo_group"}),
+        "arm Diagral alarm in away mode",
+    ),
+    MODE_ARM_HOME: DiagralModeCommand(
+        "presence",
+        AlarmControlPanelState.ARMED_HOME,
+        AlarmControlPanelState.ARMING,
+        frozenset({"presence"}),
+        "arm Diagral alarm in home mode",
+    ),
+}
+
+
+def validate_code(
+    alarmpanel_options: dict[str, Any],
+    to_state: AlarmControlPanelState,
+    code_provided: int | None = None,
+) -> bool:
+    """Validate the code given for a transition to a state."""
+    code = alarmpanel_options[CONF_ALARMPANEL_CODE]
+    trigger = alarmpanel_options[CONF_ALARMPANEL_ACTIONTYPE_CODE]
+
+    # Convert code to int if not None
+    if code_provided is not None:
+        code_provided = int(code_provided)
+
+    if trigger == "never":
+        _LOGGER.debug("Code validation not required")
+        return True
+
+    if (
+        trigger == "disarm" and to_state == AlarmControlPanelState.DISARMED
+    ) or trigger == "always":
+        _LOGGER.debug("Code validation required")
+        if code is None:
+            _LOGGER.error("Code is not set in the configuration")
+            return False
+        return code_provided == code
+    return True
+
+
+class DiagralCommandQueue:
+    """Run the commands of an alarm one at a time, in order.
+
+    Commands sharing a coalescing key (the alarm mode) replace each other while
+    they wait: only the last one submitted is sent to the Diagral cloud.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the queue."""
+        self._lock = asyncio.Lock()
+        # Coalescing key -> token of the last command submitted with this key
+        self._latest: dict[str, object] = {}
+        self.depth = 0
+        self.max_depth = 0
+        self.executed = 0
+        self.superseded = 0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+
+    async def async_run(
+        self, command: Callable[[], Awaitable[None]], key: str | None = None
+    ) -> bool:
+        """Run a command after the ones submitted before it.
+
+        Return False if the command was superseded by a newer one with the same
+        key before its turn came.
+        """
+        token = object()
+        if key is not None:
+            self._latest[key] = token
+        submitted_at = time.monotonic()
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        try:
+            async with self._lock:
+                if key is not None and self._latest[key] is not token:
+                    _LOGGER.debug("Skipping %s command superseded by a newer one", key)
+                    self.superseded += 1
+                    return False
+                wait = time.monotonic() - submitted_at
+                self.last_wait = round(wait, 3)
+                self.max_wait = round(max(self.max_wait, wait), 3)
+                await command()
+                self.executed += 1
+                return True
+        finally:
+            self.depth -= 1
+            if key is not None and self._latest.get(key) is token:
+                del self._latest[key]
+
+    def as_dict(self) -> dict[str, float]:
+        """Return the queue metrics."""
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "executed": self.executed,
+            "superseded": self.superseded,
+            "last_wait": self.last_wait,
+            "max_wait": self.max_wait,
+        }
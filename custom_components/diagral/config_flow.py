@@ -8,7 +8,6 @@ import re
 from typing import Any
 
 from pydiagral import DiagralAPIError
-from pydiagral.api import DiagralAPI
 from pydiagral.exceptions import (
     AuthenticationError,
     ClientError,
@@ -22,7 +21,7 @@ import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.config_entries import ConfigFlow, ConfigFlowResult
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
-from homeassistant.core import callback
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import section
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.selector import (
@@ -47,6 +46,7 @@ from .const import (
     DOMAIN,
 )
 from .models import AccountInfoData, DiagralOptionsData, ValidateConnectionData
+from .session import async_create_diagral_api
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -75,6 +75,7 @@ def is_valid_alarmpanel_code(code: int) -> bool:
 
 
 async def validate_account(
+    hass: HomeAssistant,
     account_info: AccountInfoData,
     previous_data: DiagralConfigEntry | None = {},
     ephemeral: bool = True,
@@ -102,24 +103,24 @@ async def validate_account(
         #    API key and secret key
 
         try:
-            async with DiagralAPI(**diagral_api_params) as diagral:
-                _LOGGER.debug("Attempting to test connection with Diagral Cloud...")
-                connection: TryConnectResult = await diagral.try_connection(
-                    ephemeral=ephemeral
-                )
-                _LOGGER.debug("Connection successful")
+            diagral = async_create_diagral_api(hass, **diagral_api_params)
+            _LOGGER.debug("Attempting to test connection with Diagral Cloud...")
+            connection: TryConnectResult = await diagral.try_connection(
+                ephemeral=ephemeral
+            )
+            _LOGGER.debug("Connection successful")
 
-                # If ephemeral mode is disabled, we get the alarm name
-                # else, we set the alarm name to None (as keys are removed)
-                if not ephemeral:
-                    alarm_name: str = await diagral.get_alarm_name()
-                else:
-                    alarm_name = None
+            # If ephemeral mode is disabled, we get the alarm name
+            # else, we set the alarm name to None (as keys are removed)
+            if not ephemeral:
+                alarm_name: str = await diagral.get_alarm_name()
+            else:
+                alarm_name = None
 
-                return ValidateConnectionData(
-                    title=f"{alarm_name} ({account_info.serial_id})",
-                    keys=connection.keys,
-                )
+            return ValidateConnectionData(
+                title=f"{alarm_name} ({account_info.serial_id})",
+                keys=connection.keys,
+            )
         except (
             ConfigurationError,
             AuthenticationError,
@@ -209,6 +210,7 @@ class DiagralConfigFlow(ConfigFlow, domain=DOMAIN):
                     # in ephemeral mode as final keys (API key and secret key)
                     # will be request in last step
                     await validate_account(
+                        self.hass,
                         account_info=AccountInfoData(
                             username=user_input[CONF_USERNAME],
                             password=user_input[CONF_PASSWORD],
@@ -296,6 +298,7 @@ class DiagralConfigFlow(ConfigFlow, domain=DOMAIN):
                     # not in ephemeral mode as final keys (API key and secret key)
                     # is requested in this step
                     info: ValidateConnectionData = await validate_account(
+                        self.hass,
                         account_info=AccountInfoData(
                             username=self.account_username,
                             password=self.account_password,
@@ -398,6 +401,7 @@ class DiagralConfigFlow(ConfigFlow, domain=DOMAIN):
             if not errors:
                 try:
                     info: ValidateConnectionData | None = await validate_account(
+                        self.hass,
                         account_info=AccountInfoData(
                             username=user_input[CONF_USERNAME],
                             password=user_input[CONF_PASSWORD],
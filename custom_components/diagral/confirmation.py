@@ -0,0 +1,109 @@
+"""Confirmation of the commands sent to the Diagral alarm."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import time
+
+from pydiagral.models import SystemStatus
+
+
+@dataclass(slots=True)
+class DiagralCommandWaiter:
+    """A command waiting for the alarm to reach its expected status."""
+
+    command: str
+    expected: Callable[[SystemStatus], bool]
+    issued_at: float = field(default_factory=time.monotonic)
+    # True when confirmed, False when expired
+    future: asyncio.Future[bool] = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+
+    @property
+    def done(self) -> bool:
+        """Return whether the command is confirmed or expired."""
+        return self.future.done()
+
+    @property
+    def confirmed(self) -> bool:
+        """Return whether the alarm confirmed the command."""
+        return (
+            self.future.done()
+            and not self.future.cancelled()
+            and self.future.result()
+        )
+
+
+class DiagralCommandConfirmations:
+    """Resolve the command waiters from the statuses received from the alarm.
+
+    Statuses come from webhooks, command answers and polls, so a command is
+    usually confirmed without any dedicated call to the Diagral cloud.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the confirmations."""
+        self._waiters: list[DiagralCommandWaiter] = []
+        # Command -> latency statistics
+        self._stats: dict[str, dict[str, float]] = {}
+
+    def expect(
+        self, command: str, expected: Callable[[SystemStatus], bool]
+    ) -> DiagralCommandWaiter:
+        """Register a command before sending it."""
+        waiter = DiagralCommandWaiter(command, expected)
+        self._waiters.append(waiter)
+        return waiter
+
+    def resolve(self, system_status: SystemStatus) -> None:
+        """Confirm the commands whose expected status is reached."""
+        for waiter in list(self._waiters):
+            if waiter.expected(system_status):
+                self._finish(waiter, True)
+
+    def expire(self, waiter: DiagralCommandWaiter) -> None:
+        """Give up waiting for a command confirmation."""
+        if not waiter.done:
+            self._finish(waiter, False)
+
+    def discard(self, waiter: DiagralCommandWaiter) -> None:
+        """Forget a command that could not be sent."""
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        waiter.future.cancel()
+
+    async def wait(self, waiter: DiagralCommandWaiter, timeout: float) -> bool:
+        """Wait for a command confirmation, return False on timeout."""
+        try:
+            async with asyncio.timeout(timeout):
+                return await asyncio.shield(waiter.future)
+        except TimeoutError:
+            return False
+
+    def _finish(self, waiter: DiagralCommandWaiter, confirmed: bool) -> None:
+        """Resolve a waiter and record its latency."""
+        self._waiters.remove(waiter)
+        waiter.future.set_result(confirmed)
+        stats = self._stats.setdefault(
+            waiter.command,
+            {"confirmed": 0, "expired": 0, "last_latency": 0.0, "max_latency": 0.0},
+        )
+        if not confirmed:
+            stats["expired"] += 1
+            return
+        latency = time.monotonic() - waiter.issued_at
+        stats["confirmed"] += 1
+        stats["last_latency"] = round(latency, 3)
+        stats["max_latency"] = round(max(stats["max_latency"], latency), 3)
+
+    def as_dict(self) -> dict[str, object]:
+        """Return the confirmation statistics."""
+        return {
+            "pending": len(self._waiters),
+            "commands": {
+                command: dict(stats) for command, stats in self._stats.items()
+            },
+        }
@@ -10,6 +10,8 @@ CONF_SERIAL_ID = "serial_id"
 CONF_PIN_CODE = "pin_code"
 CONF_API_KEY = "api_key"
 CONF_SECRET_KEY = "secret_key"
+CONF_WEBHOOK_ID = "webhook_id"
+CONF_WEBHOOK_URL = "webhook_url"
 CONF_ALARMPANEL_ACTIONTYPE_CODE = "alarmpanel_actiontype_code"
 CONF_ALARMPANEL_ACTIONTYPE_CODE_OPTIONS = [
     "never",
@@ -19,12 +21,69 @@ CONF_ALARMPANEL_ACTIONTYPE_CODE_OPTIONS = [
 CONF_ALARMPANEL_CODE = "alarmpanel_code"
 
 DEFAULT_SCAN_INTERVAL = 300
+# Slower polling used while the webhook keeps delivering notifications
+WEBHOOK_SCAN_INTERVAL = 1800
+# Without any notification for this long, the webhook is considered silent
+WEBHOOK_SILENCE_THRESHOLD = 21600
+API_CALL_TIMEOUT = 30
+# Refresh requests (commands, webhooks, actions) within this window share one fetch
+REFRESH_COALESCE_WINDOW = 5
+# Time given to the alarm to confirm a command before its state is fetched again
+COMMAND_CONFIRMATION_TIMEOUT = 60
+# Configuration, devices and groups rarely change: refresh them every 6 hours
+STATIC_DATA_TTL = 21600
+
+# Delay used to group the writes of the coordinator snapshot (seconds)
+SNAPSHOT_SAVE_DELAY = 30
+
+# Retry of the background webhook provisioning (seconds, doubled on each failure)
+WEBHOOK_RETRY_INITIAL_DELAY = 30
+WEBHOOK_RETRY_MAX_DELAY = 1800
+WEBHOOK_RETRY_MAX_ATTEMPTS = 10
+
+# Duplicate webhook deliveries are dropped within this window (seconds)
+WEBHOOK_DEDUP_TTL = 600
+WEBHOOK_DEDUP_MAX_SIZE = 256
+# Webhook notifications waiting to be processed, the oldest are dropped beyond
+WEBHOOK_QUEUE_MAX_SIZE = 100
+
+SCAN_INTERVAL_REASON_NO_WEBHOOK = "no_webhook"
+SCAN_INTERVAL_REASON_WEBHOOK_ACTIVE = "webhook_active"
+SCAN_INTERVAL_REASON_WEBHOOK_SILENT = "webhook_silent"
 
 HA_CLOUD_DOMAIN = ".nabu.casa"
 
 SERVICE_ARM_GROUP = "arm_groups"
 SERVICE_DISARMGROUP = "disarm_groups"
+SERVICE_SET_GROUPS = "set_groups"
+SERVICE_SET_MODE = "set_mode"
 SERVICE_REGISTER_WEBHOOK = "register_webhook"
 SERVICE_UNREGISTER_WEBHOOK = "unregister_webhook"
+SERVICE_REFRESH_CONFIGURATION = "refresh_configuration"
 
 INPUT_GROUPS = "group_ids"
+INPUT_CONFIG_ENTRIES = "config_entry_ids"
+INPUT_SERIALS = "serials"
+INPUT_MODE = "mode"
+INPUT_CODE = "code"
+INPUT_MAX_CONCURRENCY = "max_concurrency"
+
+# Alarm modes of the set_mode action
+MODE_DISARM = "disarm"
+MODE_ARM_AWAY = "arm_away"
+MODE_ARM_HOME = "arm_home"
+# Alarms commanded at the same time by the set_mode action
+SET_MODE_DEFAULT_CONCURRENCY = 4
+SET_MODE_MAX_CONCURRENCY = 20
+
+# Dispatcher signal of the webhook events, scoped to the config entry
+SIGNAL_WEBHOOK_EVENT = f"signal-{DOMAIN}-webhook-{{entry_id}}-{{alarm_type}}"
+# Bus event types of the webhook events: catch-all and per alarm type (DIAGRAL_ALERT, ...)
+EVENT_WEBHOOK = f"{DOMAIN.upper()}_EVENT"
+EVENT_WEBHOOK_TYPED = f"{DOMAIN.upper()}_{{alarm_type}}"
+
+# Webhook STATUS code sent when the central programming changed (Contact ID 306)
+ALARM_CODE_CONFIGURATION_CHANGED = 1306
+# Webhook STATUS codes for a group disarmed / armed by a user (Contact ID 401/407)
+ALARM_CODES_GROUP_DISARMED = {1401, 1407}
+ALARM_CODES_GROUP_ARMED = {3401, 3407}
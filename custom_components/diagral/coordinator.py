@@ -1,7 +1,10 @@
 """DataUpdateCoordinator for Diagral integration."""
 
-from datetime import timedelta
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
 import logging
+import time
 from typing import Any
 
 from pydiagral.api import DiagralAPI
@@ -12,52 +15,494 @@ from pydiagral.models import (
     DeviceInfos,
     Group,
     SystemStatus,
+    WebHookNotification,
 )
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+import homeassistant.util.dt as dt_util
 
-from .const import BRAND, DEFAULT_SCAN_INTERVAL, DOMAIN
+from .const import (
+    ALARM_CODES_GROUP_ARMED,
+    ALARM_CODES_GROUP_DISARMED,
+    API_CALL_TIMEOUT,
+    BRAND,
+    COMMAND_CONFIRMATION_TIMEOUT,
+    DEFAULT_SCAN_INTERVAL,
+    DOMAIN,
+    REFRESH_COALESCE_WINDOW,
+    SCAN_INTERVAL_REASON_NO_WEBHOOK,
+    SCAN_INTERVAL_REASON_WEBHOOK_ACTIVE,
+    SCAN_INTERVAL_REASON_WEBHOOK_SILENT,
+    STATIC_DATA_TTL,
+    WEBHOOK_SCAN_INTERVAL,
+    WEBHOOK_SILENCE_THRESHOLD,
+)
+from .confirmation import DiagralCommandConfirmations, DiagralCommandWaiter
+from .lookup import DiagralLookupIndex
+from .sequencer import DiagralStateSequencer
+from .storage import DiagralSnapshotStore
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def patch_system_status(
+    system_status: SystemStatus, notification: WebHookNotification
+) -> SystemStatus | None:
+    """Return the system status resulting from a STATUS notification.
+
+    Only group arming/disarming notifications carrying a numeric group index
+    can be applied, and only while the alarm is OFF or in GROUP mode: the
+    groups of the TEMPO_GROUP and PRESENCE modes are not known from the
+    notification alone. None is returned in any other case.
+    """
+    alarm_code = int(notification.alarm_code)
+    group_index = str(notification.group_index or "")
+    if not group_index.isdigit() or alarm_code not in (
+        ALARM_CODES_GROUP_ARMED | ALARM_CODES_GROUP_DISARMED
+    ):
+        return None
+    if system_status is None or system_status.status.upper() not in (
+        "OFF",
+        "GROUP",
+    ):
+        return None
+
+    activated_groups: set[int] = set(system_status.activated_groups or [])
+    if alarm_code in ALARM_CODES_GROUP_ARMED:
+        activated_groups.add(int(group_index))
+    else:
+        activated_groups.discard(int(group_index))
+
+    return SystemStatus(
+        status="GROUP" if activated_groups else "OFF",
+        activated_groups=sorted(activated_groups),
+    )
+
+
+def get_active_groups(
+    system_status: SystemStatus, alarm_config: AlarmConfiguration | None
+) -> list[int]:
+    """Return the active groups of the alarm.
+
+    In PRESENCE mode, the active groups are the presence groups of the alarm
+    configuration, not the activated groups of the status.
+    """
+    if system_status.status == "PRESENCE":
+        return list(alarm_config.presence_group or []) if alarm_config else []
+    return list(system_status.activated_groups or [])
+
+
 class DiagralDataUpdateCoordinator(DataUpdateCoordinator):
-    """Class to manage fetching Diagral data."""
+    """Class to manage fetching Diagral data.
+
+    Data is refreshed in two tiers: the static tier (configuration, devices and
+    groups) is cached for STATIC_DATA_TTL seconds or until it is invalidated,
+    while the volatile tier (system status and anomalies) is fetched on every
+    update.
 
-    def __init__(self, hass: HomeAssistant, api: DiagralAPI) -> None:
+    The update interval adapts to the webhook liveness: polling slows down to
+    WEBHOOK_SCAN_INTERVAL while notifications keep arriving, and goes back to
+    DEFAULT_SCAN_INTERVAL without webhook or once it stays silent for
+    WEBHOOK_SILENCE_THRESHOLD seconds.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        api: DiagralAPI,
+        store: DiagralSnapshotStore | None = None,
+        concurrent_fetch: bool = True,
+        refresh_window: float = REFRESH_COALESCE_WINDOW,
+        confirmation_timeout: float = COMMAND_CONFIRMATION_TIMEOUT,
+    ) -> None:
         """Initialize the coordinator."""
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
             update_interval=timedelta(seconds=DEFAULT_SCAN_INTERVAL),
+            # The first request is fetched at once, the requests of the burst
+            # following it (STATUS webhook, ANOMALY storm) share a single fetch
+            # at the end of the window
+            request_refresh_debouncer=Debouncer(
+                hass, _LOGGER, cooldown=refresh_window, immediate=True
+            ),
         )
         self.api = api
+        self.store = store
+        self.concurrent_fetch = concurrent_fetch
+        # Time given to the alarm to confirm a command before fetching its status
+        self.confirmation_timeout = confirmation_timeout
+        self.stale: bool = False
+        # Last successful refresh from the Diagral cloud (reported in diagnostics)
+        self.last_refreshed_at: datetime | None = None
+        self._static_refreshed_at: float | None = None
+        self._static_invalidated: bool = False
+        self.update_interval_reason: str = SCAN_INTERVAL_REASON_NO_WEBHOOK
+        self.webhook_registered_at: datetime | None = None
+        self.last_webhook_received_at: datetime | None = None
+        self._notified_data: dict[str, Any] | None = None
+        self._notified_success: bool | None = None
+        self._notified_stale: bool = False
+        self._pending_refresh_requests: int = 0
+        self.refresh_requests: int = 0
+        self.coalesced_fetches: int = 0
+        self.last_absorbed_requests: int = 0
+        self.max_absorbed_requests: int = 0
+        self.sequencer = DiagralStateSequencer()
+        self.confirmations = DiagralCommandConfirmations()
+        # Monotonic time of the last system status applied from a webhook
+        self._status_applied_at: float | None = None
+
+    async def async_restore_snapshot(self) -> bool:
+        """Load the last snapshot as stale data.
+
+        Return True when data was restored, so the live refresh can run in the
+        background.
+        """
+        if self.store is None or (data := await self.store.async_load()) is None:
+            return False
+        _LOGGER.debug("Restored data from snapshot, waiting for live refresh")
+        self.data = data
+        self.stale = True
+        return True
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Notify the listeners whose data keys changed since the last update.
+
+        Listeners registered with a set of coordinator data keys as context are
+        only called when one of these keys changed. Listeners without context
+        are always called.
+        """
+        # Confirm the pending commands before the entities read the status
+        if self.data and (system_status := self.data.get("system_status")):
+            self.confirmations.resolve(system_status)
+        changed_keys: set[str] | None = self._async_changed_keys()
+        _LOGGER.debug("Coordinator data keys changed: %s", changed_keys)
+        if (
+            self.store is not None
+            and self.data
+            and not self.stale
+            and changed_keys != set()
+        ):
+            self.store.async_save(self.data)
+        for update_callback, context in list(self._listeners.values()):
+            if (
+                changed_keys is None
+                or not isinstance(context, frozenset)
+                or not changed_keys.isdisjoint(context)
+            ):
+                update_callback()
+
+    @callback
+    def _async_changed_keys(self) -> set[str] | None:
+        """Return the data keys changed since the last notification.
+
+        None means every listener must be notified (first data or change of
+        availability or staleness).
+        """
+        previous: dict[str, Any] | None = self._notified_data
+        previous_success: bool | None = self._notified_success
+        previous_stale: bool = self._notified_stale
+        self._notified_data = dict(self.data) if self.data else None
+        self._notified_success = self.last_update_success
+        self._notified_stale = self.stale
+        if (
+            previous is None
+            or self._notified_data is None
+            or previous_success != self.last_update_success
+            or previous_stale != self.stale
+        ):
+            return None
+        return {
+            key
+            for key in previous.keys() | self._notified_data.keys()
+            if previous.get(key) is not self._notified_data.get(key)
+            and previous.get(key) != self._notified_data.get(key)
+        }
+
+    @callback
+    def async_set_webhook_registered(self, registered: bool) -> None:
+        """Record whether a webhook is registered for this alarm."""
+        self.webhook_registered_at = dt_util.utcnow() if registered else None
+        self._async_adapt_update_interval()
+
+    @callback
+    def async_webhook_received(self) -> None:
+        """Record that a webhook notification has just been received."""
+        self.last_webhook_received_at = dt_util.utcnow()
+        self._async_adapt_update_interval()
+
+    @callback
+    def _async_adapt_update_interval(self) -> None:
+        """Select the update interval according to the webhook liveness."""
+        if self.webhook_registered_at is None:
+            interval = DEFAULT_SCAN_INTERVAL
+            reason = SCAN_INTERVAL_REASON_NO_WEBHOOK
+        else:
+            # A freshly registered webhook gets the benefit of the doubt
+            last_seen: datetime = max(
+                self.webhook_registered_at,
+                self.last_webhook_received_at or self.webhook_registered_at,
+            )
+            silence: timedelta = dt_util.utcnow() - last_seen
+            if silence > timedelta(seconds=WEBHOOK_SILENCE_THRESHOLD):
+                interval = DEFAULT_SCAN_INTERVAL
+                reason = SCAN_INTERVAL_REASON_WEBHOOK_SILENT
+            else:
+                interval = WEBHOOK_SCAN_INTERVAL
+                reason = SCAN_INTERVAL_REASON_WEBHOOK_ACTIVE
+
+        if reason != self.update_interval_reason:
+            _LOGGER.debug("Update interval changed to %ss (%s)", interval, reason)
+        self.update_interval_reason = reason
+        # Applied when the next refresh is scheduled
+        self.update_interval = timedelta(seconds=interval)
+
+    @callback
+    def async_invalidate_static_data(self, reason: str) -> None:
+        """Force the static tier to be fetched again on the next update."""
+        _LOGGER.debug("Static data invalidated (%s)", reason)
+        self._static_invalidated = True
+
+    @callback
+    def async_apply_status_notification(
+        self, notification: WebHookNotification
+    ) -> bool:
+        """Apply a STATUS notification to the data without calling the API.
+
+        Return False when the notification cannot be translated into a system
+        status, in which case a refresh is required. Notifications older than
+        the last applied one are dropped.
+        """
+        if not self.data:
+            return False
+        if not self.sequencer.accept("STATUS", notification.date_time):
+            _LOGGER.debug("Dropping out of order status webhook: %s", notification)
+            return True
+        system_status = patch_system_status(
+            self.data.get("system_status"), notification
+        )
+        if system_status is None:
+            return False
+        _LOGGER.debug("Applying system status from webhook: %s", system_status)
+        self.async_apply_system_status(system_status)
+        return True
+
+    @callback
+    def async_apply_system_status(self, system_status: SystemStatus) -> None:
+        """Push a system status received outside of a poll (webhook, command)."""
+        self._status_applied_at = time.monotonic()
+        self.async_set_updated_data({**self.data, "system_status": system_status})
+
+    async def async_send_command(
+        self, waiter: DiagralCommandWaiter, *args: Any
+    ) -> None:
+        """Send a command, apply the status it answers and track its confirmation.
+
+        The waiter is discarded when the command fails for any reason. A
+        command exceeding API_CALL_TIMEOUT raises a DiagralAPIError.
+        """
+        try:
+            async with asyncio.timeout(API_CALL_TIMEOUT):
+                system_status: SystemStatus | None = await getattr(
+                    self.api, waiter.command
+                )(*args)
+        except TimeoutError as err:
+            self.confirmations.discard(waiter)
+            raise DiagralAPIError(
+                f"Timeout after {API_CALL_TIMEOUT}s while sending {waiter.command}"
+            ) from err
+        except BaseException:
+            self.confirmations.discard(waiter)
+            raise
+        # The command answers with the new status, which may already confirm it
+        if system_status is not None:
+            self.async_apply_system_status(system_status)
+        self.async_track_confirmation(waiter)
+
+    @callback
+    def async_track_confirmation(self, waiter: DiagralCommandWaiter) -> None:
+        """Wait in the background for the alarm to confirm a command."""
+        if waiter.done:
+            return
+        self.config_entry.async_create_background_task(
+            self.hass,
+            self._async_confirm(waiter),
+            f"{DOMAIN}_confirm_{waiter.command}",
+        )
+
+    async def _async_confirm(self, waiter: DiagralCommandWaiter) -> None:
+        """Fetch the status of a command left unconfirmed by the webhooks."""
+        if await self.confirmations.wait(waiter, self.confirmation_timeout):
+            return
+        _LOGGER.warning(
+            "Command %s not confirmed within %ss, fetching the alarm status",
+            waiter.command,
+            self.confirmation_timeout,
+        )
+        await self.async_refresh_status()
+        self.confirmations.expire(waiter)
+
+    async def async_refresh_status(self) -> None:
+        """Fetch the system status only and push it to the listeners."""
+        system_status: SystemStatus | None = await self._async_fetch_volatile(
+            "system_status", self.api.get_system_status
+        )
+        if system_status is not None:
+            self.async_apply_system_status(system_status)
+
+    async def async_refresh_anomalies(self) -> None:
+        """Fetch the anomalies only and push them to the listeners."""
+        anomalies: Anomalies | None = await self._async_fetch_volatile(
+            "anomalies", self.api.get_anomalies
+        )
+        if anomalies is not None:
+            self.async_set_updated_data({**self.data, "anomalies": anomalies})
+
+    async def _async_fetch_volatile(
+        self, name: str, call: Callable[[], Awaitable[Any]]
+    ) -> Any | None:
+        """Run a single volatile call, falling back to a full refresh on error."""
+        try:
+            return await self._async_fetch(name, call)
+        except (DiagralAPIError, UpdateFailed) as err:
+            _LOGGER.warning("Failed to refresh %s (%s), full refresh", name, err)
+            await self.async_request_refresh()
+            return None
+
+    def _static_refresh_due(self) -> bool:
+        """Return whether the static tier must be fetched on this update."""
+        return (
+            self._static_invalidated
+            or self._static_refreshed_at is None
+            or not self.data
+            or time.monotonic() - self._static_refreshed_at >= STATIC_DATA_TTL
+        )
+
+    async def _async_fetch(
+        self, name: str, call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Run a single API call bounded by API_CALL_TIMEOUT."""
+        try:
+            async with asyncio.timeout(API_CALL_TIMEOUT):
+                return await call()
+        except TimeoutError as err:
+            raise UpdateFailed(
+                f"Timeout after {API_CALL_TIMEOUT}s while fetching {name}"
+            ) from err
+
+    async def _async_fetch_all(
+        self, calls: dict[str, Callable[[], Awaitable[Any]]]
+    ) -> dict[str, Any]:
+        """Run the given API calls and return their results by name.
+
+        In concurrent mode the calls run at the same time; if one of them fails,
+        the others are cancelled and the error is propagated.
+        """
+        if not self.concurrent_fetch:
+            return {
+                name: await self._async_fetch(name, call)
+                for name, call in calls.items()
+            }
+
+        tasks = [
+            asyncio.create_task(self._async_fetch(name, call), name=f"{DOMAIN}_{name}")
+            for name, call in calls.items()
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            # Let the cancelled tasks finish before propagating the error
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return dict(zip(calls, results, strict=True))
+
+    async def async_request_refresh(self) -> None:
+        """Request a refresh, merged with the other requests of the window."""
+        self._pending_refresh_requests += 1
+        self.refresh_requests += 1
+        await super().async_request_refresh()
+
+    @callback
+    def _async_record_absorbed_requests(self) -> None:
+        """Record how many refresh requests the current fetch absorbs."""
+        if not self._pending_refresh_requests:
+            return
+        absorbed = self._pending_refresh_requests
+        self._pending_refresh_requests = 0
+        self.coalesced_fetches += 1
+        self.last_absorbed_requests = absorbed
+        self.max_absorbed_requests = max(self.max_absorbed_requests, absorbed)
+        _LOGGER.debug("Refresh absorbing %s request(s)", absorbed)
 
     async def _async_update_data(self) -> dict[str, Any]:
         """Fetch data from Diagral API."""
         _LOGGER.debug("Updating data with API instance: %s", id(self.api))
+        self._async_record_absorbed_requests()
+        # Detect a webhook that went silent since the last update
+        self._async_adapt_update_interval()
+        refresh_static: bool = self._static_refresh_due()
+        calls: dict[str, Callable[[], Awaitable[Any]]] = {
+            "system_status": self.api.get_system_status,
+            "anomalies": self.api.get_anomalies,
+        }
+        if refresh_static:
+            calls["alarm_config"] = self.api.get_configuration
+        started_at: float = time.monotonic()
         try:
-            alarm_config: AlarmConfiguration = await self.api.get_configuration()
-            groups: list[Group] = alarm_config.groups
-            devices_infos: DeviceInfos = await self.api.get_devices_info()
-            system_status: SystemStatus = await self.api.get_system_status()
-            anomalies: Anomalies = await self.api.get_anomalies()
+            results: dict[str, Any] = await self._async_fetch_all(calls)
+            system_status: SystemStatus = results["system_status"]
+            if (
+                self._status_applied_at is not None
+                and self._status_applied_at >= started_at
+                and self.data
+            ):
+                # A webhook was applied while the poll was in flight, the
+                # polled status may predate it
+                _LOGGER.debug("Keeping the system status applied from webhook")
+                system_status = self.data["system_status"]
+            anomalies: Anomalies = results["anomalies"]
+            if refresh_static:
+                alarm_config: AlarmConfiguration = results["alarm_config"]
+                groups: list[Group] = alarm_config.groups if alarm_config else []
+                # Devices are derived from the configuration cached by pydiagral,
+                # so this call does not reach the cloud
+                devices_infos: DeviceInfos = await self.api.get_devices_info()
+                lookup = DiagralLookupIndex.build(devices_infos, groups)
+            else:
+                _LOGGER.debug("Static data still valid, fetching volatile data only")
+                alarm_config = self.data["alarm_config"]
+                groups = self.data["groups"]
+                devices_infos = self.data["devices_infos"]
+                lookup = self.data.get("lookup") or DiagralLookupIndex.build(
+                    devices_infos, groups
+                )
 
             if alarm_config and system_status:
                 updated_data = {
                     "alarm_config": alarm_config,
                     "devices_infos": devices_infos,
                     "groups": groups,
+                    "lookup": lookup,
                     "system_status": system_status,
                     "anomalies": anomalies,
                 }
                 # Update only if the data is valid
                 self.data = updated_data
-                await self._update_device_info()
+                self.stale = False
+                self.last_refreshed_at = dt_util.utcnow()
+                if refresh_static:
+                    self._static_refreshed_at = time.monotonic()
+                    self._static_invalidated = False
+                    await self._update_device_info()
                 return updated_data
         except DiagralAPIError as err:
             raise UpdateFailed(f"Error communicating with API: {err}") from err
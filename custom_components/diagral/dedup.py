@@ -0,0 +1,45 @@
+"""Deduplication of the webhook notifications retried by the Diagral cloud."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Hashable
+import time
+
+from .const import WEBHOOK_DEDUP_MAX_SIZE, WEBHOOK_DEDUP_TTL
+
+
+class DiagralWebhookDeduplicator:
+    """Bounded LRU cache of the recently received notifications, with a TTL."""
+
+    def __init__(
+        self, max_size: int = WEBHOOK_DEDUP_MAX_SIZE, ttl: float = WEBHOOK_DEDUP_TTL
+    ) -> None:
+        """Initialize the cache."""
+        self._max_size = max_size
+        self._ttl = ttl
+        # Notification key -> last time seen, oldest first
+        self._seen: OrderedDict[Hashable, float] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def is_duplicate(self, key: Hashable) -> bool:
+        """Return True if the notification was already received, and record it."""
+        now = time.monotonic()
+        while self._seen and next(iter(self._seen.values())) <= now - self._ttl:
+            self._seen.popitem(last=False)
+
+        duplicate = key in self._seen
+        if duplicate:
+            self.hits += 1
+            self._seen.move_to_end(key)
+        else:
+            self.misses += 1
+        self._seen[key] = now
+        if len(self._seen) > self._max_size:
+            self._seen.popitem(last=False)
+        return duplicate
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the cache statistics."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._seen)}
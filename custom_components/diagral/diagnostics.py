@@ -8,6 +8,8 @@ from homeassistant.components.diagnostics import async_redact_data
 from homeassistant.core import HomeAssistant
 
 from . import DiagralConfigEntry
+from .coordinator import DiagralDataUpdateCoordinator
+from .session import async_get_client_session
 
 TO_REDACT = {
     "api_key",
@@ -16,6 +18,7 @@ TO_REDACT = {
     "secret_key",
     "username",
     "webhook_id",
+    "webhook_url",
 }
 
 
@@ -23,6 +26,7 @@ async def async_get_config_entry_diagnostics(
     hass: HomeAssistant, entry: DiagralConfigEntry
 ) -> dict[str, Any]:
     """Return diagnostics for a config entry."""
+    coordinator: DiagralDataUpdateCoordinator = entry.runtime_data.coordinator
 
     return {
         "info": async_redact_data(
@@ -32,4 +36,22 @@ async def async_get_config_entry_diagnostics(
             },
             TO_REDACT,
         ),
+        "coordinator": {
+            "last_refreshed_at": coordinator.last_refreshed_at,
+            "update_interval": coordinator.update_interval.total_seconds(),
+            "update_interval_reason": coordinator.update_interval_reason,
+            "webhook_registered_at": coordinator.webhook_registered_at,
+            "last_webhook_received_at": coordinator.last_webhook_received_at,
+            "refresh_requests": coordinator.refresh_requests,
+            "coalesced_fetches": coordinator.coalesced_fetches,
+            "last_absorbed_requests": coordinator.last_absorbed_requests,
+            "max_absorbed_requests": coordinator.max_absorbed_requests,
+        },
+        "webhook_dedup": entry.runtime_data.webhook_dedup.as_dict(),
+        "webhook_queue": entry.runtime_data.webhook_queue.as_dict(),
+        "command_queue": entry.runtime_data.command_queue.as_dict(),
+        "state_sequencer": coordinator.sequencer.as_dict(),
+        "command_confirmations": coordinator.confirmations.as_dict(),
+        # Shared by all the config entries
+        "client_session": async_get_client_session(hass).stats.as_dict(),
     }
@@ -11,6 +11,23 @@ class DiagralEntity(CoordinatorEntity[DiagralDataUpdateCoordinator]):
 
     _attr_has_entity_name = True
 
+    def __init__(
+        self,
+        coordinator: DiagralDataUpdateCoordinator,
+        coordinator_keys: frozenset[str] | None = None,
+    ) -> None:
+        """Initialize the entity.
+
+        When coordinator_keys is set, the entity is only updated when one of
+        these coordinator data keys changed.
+        """
+        super().__init__(coordinator, context=coordinator_keys)
+
+    @property
+    def assumed_state(self) -> bool:
+        """Return True while the data comes from the startup snapshot."""
+        return self.coordinator.stale
+
     @property
     def device_info(self) -> DeviceInfo:
         """Return device information about this Diagral device."""
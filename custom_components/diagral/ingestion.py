@@ -0,0 +1,89 @@
+"""Queue of the webhook notifications waiting to be processed."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+from typing import TYPE_CHECKING
+
+from pydiagral.models import WebHookNotification
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, WEBHOOK_QUEUE_MAX_SIZE
+
+if TYPE_CHECKING:
+    from . import DiagralConfigEntry
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DiagralWebhookQueue:
+    """Bounded queue of notifications processed in order by a worker task.
+
+    The webhook handler only enqueues notifications, so the HTTP request is
+    answered without waiting for the cloud refreshes they trigger. When the
+    queue is full, the oldest notification is dropped.
+    """
+
+    def __init__(self, max_size: int = WEBHOOK_QUEUE_MAX_SIZE) -> None:
+        """Initialize the queue."""
+        self._queue: asyncio.Queue[WebHookNotification] = asyncio.Queue(max_size)
+        self.max_depth = 0
+        self.dropped = 0
+        self.processed = 0
+
+    @callback
+    def async_start(
+        self,
+        hass: HomeAssistant,
+        entry: DiagralConfigEntry,
+        process: Callable[[WebHookNotification], Awaitable[None]],
+    ) -> None:
+        """Start the worker, stopped with the config entry."""
+        entry.async_create_background_task(
+            hass,
+            self._async_worker(process),
+            f"{DOMAIN}_{entry.entry_id}_webhook_queue",
+        )
+
+    @callback
+    def async_put(self, notification: WebHookNotification) -> None:
+        """Enqueue a notification, dropping the oldest one when full."""
+        if self._queue.full():
+            dropped = self._queue.get_nowait()
+            self._queue.task_done()
+            self.dropped += 1
+            _LOGGER.warning(
+                "Webhook queue full, dropping oldest notification: %s", dropped
+            )
+        self._queue.put_nowait(notification)
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    async def _async_worker(
+        self, process: Callable[[WebHookNotification], Awaitable[None]]
+    ) -> None:
+        """Process the notifications in order."""
+        while True:
+            notification = await self._queue.get()
+            try:
+                await process(notification)
+            except Exception:
+                _LOGGER.exception("Error processing webhook notification")
+            finally:
+                self.processed += 1
+                self._queue.task_done()
+
+    async def async_join(self) -> None:
+        """Wait until all enqueued notifications are processed."""
+        await self._queue.join()
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the queue metrics."""
+        return {
+            "depth": self._queue.qsize(),
+            "max_depth": self.max_depth,
+            "dropped": self.dropped,
+            "processed": self.processed,
+        }
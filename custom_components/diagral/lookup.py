@@ -0,0 +1,56 @@
+"""Lookup index of the Diagral devices and groups."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+
+from pydiagral.models import DeviceInfos, DeviceList, Group
+
+
+@dataclass(frozen=True, slots=True)
+class DiagralLookupIndex:
+    """Immutable index of the devices and groups of an alarm.
+
+    Built once per refresh of the configuration and shared by the webhook
+    enrichment, the alarm control panel and the sensors.
+    """
+
+    # (device type, device index) -> device, e.g. ("sensor", 3)
+    devices: Mapping[tuple[str, int], DeviceInfos]
+    # device index -> device label, across all device types
+    device_labels: Mapping[int, str]
+    # group index -> group
+    groups: Mapping[int, Group]
+
+    @classmethod
+    def build(
+        cls, devices_infos: DeviceList | None, groups: list[Group] | None
+    ) -> DiagralLookupIndex:
+        """Build the index from the devices and groups of the configuration."""
+        devices: dict[tuple[str, int], DeviceInfos] = {}
+        device_labels: dict[int, str] = {}
+        if devices_infos:
+            for field in fields(devices_infos):
+                # DeviceList attributes are the plural of the webhook device types
+                device_type = field.name.removesuffix("s")
+                for device in getattr(devices_infos, field.name) or []:
+                    devices[(device_type, device.index)] = device
+                    device_labels[device.index] = device.label
+        return cls(
+            devices=MappingProxyType(devices),
+            device_labels=MappingProxyType(device_labels),
+            groups=MappingProxyType({group.index: group for group in groups or []}),
+        )
+
+    def device(self, device_type: str, index: int) -> DeviceInfos | None:
+        """Return the device of a type (as sent in webhooks) and index."""
+        return self.devices.get((device_type.lower(), index))
+
+    def group(self, index: int) -> Group | None:
+        """Return the group of an index."""
+        return self.groups.get(index)
+
+
+EMPTY_LOOKUP_INDEX = DiagralLookupIndex.build(None, None)
@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 
 from pydiagral import DiagralAPI
 from pydiagral.models import ApiKeyWithSecret
@@ -11,7 +12,13 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
 
 from .const import CONF_API_KEY, CONF_PIN_CODE, CONF_SECRET_KEY, CONF_SERIAL_ID
+from .commands import DiagralCommandQueue
 from .coordinator import DiagralDataUpdateCoordinator
+from .dedup import DiagralWebhookDeduplicator
+from .ingestion import DiagralWebhookQueue
+
+if TYPE_CHECKING:
+    from .alarm_control_panel import DiagralAlarmControlPanel
 
 
 @dataclass
@@ -21,7 +28,14 @@ class DiagralData:
     config: DiagralConfigData
     coordinator: DiagralDataUpdateCoordinator
     api: DiagralAPI
-    webhook_id: str
+    webhook_id: str | None
+    webhook_dedup: DiagralWebhookDeduplicator = field(
+        default_factory=DiagralWebhookDeduplicator
+    )
+    webhook_queue: DiagralWebhookQueue = field(default_factory=DiagralWebhookQueue)
+    command_queue: DiagralCommandQueue = field(default_factory=DiagralCommandQueue)
+    # Set by the alarm control panel platform, the set_mode action commands it
+    alarm_panel: DiagralAlarmControlPanel | None = None
 
 
 @dataclass
@@ -5,11 +5,11 @@ from __future__ import annotations
 from collections.abc import Callable
 from dataclasses import dataclass
 import logging
+from typing import Any
 
 from pydiagral.models import (
     AlarmConfiguration,
     Anomalies,
-    AnomalyDetail,
     DeviceList,
     Group,
     SystemStatus,
@@ -21,9 +21,11 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 import homeassistant.util.dt as dt_util
 
 from . import DiagralConfigEntry
+from .anomalies import DiagralAnomaliesRenderer, RenderedAnomalies
 from .const import DOMAIN
-from .coordinator import DiagralDataUpdateCoordinator
+from .coordinator import DiagralDataUpdateCoordinator, get_active_groups
 from .entity import DiagralEntity
+from .lookup import EMPTY_LOOKUP_INDEX, DiagralLookupIndex
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -33,6 +35,8 @@ class DiagralSensorEntityDescription(SensorEntityDescription):
     """Sensor entity description for Diagral."""
 
     exists_fn: Callable[..., bool] = lambda _: True
+    # Coordinator data keys the sensor is computed from
+    coordinator_keys: frozenset[str] | None = None
 
 
 SENSORS: tuple[DiagralSensorEntityDescription, ...] = (
@@ -41,12 +45,14 @@ SENSORS: tuple[DiagralSensorEntityDescription, ...] = (
         translation_key="alarm_anomalies",
         icon="mdi:alert-box",
         native_unit_of_measurement="anomalies",
+        coordinator_keys=frozenset({"anomalies", "lookup"}),
     ),
     DiagralSensorEntityDescription(
         key="active_groups",
         translation_key="active_groups",
         icon="mdi:home-group",
         native_unit_of_measurement="active groups",
+        coordinator_keys=frozenset({"system_status", "groups", "alarm_config"}),
     ),
 )
 
@@ -67,6 +73,10 @@ async def async_setup_entry(
 class DiagralSensor(DiagralEntity, SensorEntity):
     """Representation of a Diagral sensor."""
 
+    # Date and time of the last change, not worth a recorder entry
+    _unrecorded_attributes = frozenset({"updated_at"})
+    _written_flags: tuple[bool, bool] | None = None
+
     def __init__(
         self,
         coordinator: DiagralDataUpdateCoordinator,
@@ -74,7 +84,7 @@ class DiagralSensor(DiagralEntity, SensorEntity):
         config_entry: DiagralConfigEntry,
     ) -> None:
         """Initialize the sensor."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, description.coordinator_keys)
         self.coordinator = coordinator
         self.entity_description: DiagralSensorEntityDescription = description
         self._config = config_entry.data.get("config", {})
@@ -83,12 +93,19 @@ class DiagralSensor(DiagralEntity, SensorEntity):
             "alarm_config", {}
         )
         self._attr_unique_id = f"{self._entry_id}_{DOMAIN}_{self._alarm_config.alarm.central.serial}_{description.key}"
+        self._anomalies_renderer = DiagralAnomaliesRenderer()
 
     @property
     def icon(self) -> str | None:
         """Return the icon to use in the frontend."""
         return self.entity_description.icon
 
+    async def async_added_to_hass(self) -> None:
+        """Compute the initial state from the current coordinator data."""
+        await super().async_added_to_hass()
+        self._update_state()
+        self._written_flags = (self.available, self.assumed_state)
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
@@ -98,14 +115,30 @@ class DiagralSensor(DiagralEntity, SensorEntity):
             self.name,
             self.entity_description.key,
         )
+        changed: bool = self._update_state()
+        flags = (self.available, self.assumed_state)
+        if not changed and flags == self._written_flags:
+            # Avoid a new state (and recorder row) when nothing meaningful changed
+            _LOGGER.debug("State unchanged for %s, skipping write", self.name)
+            return
+
+        _LOGGER.debug("State updated for %s: %s", self.name, self.state)
+        self._written_flags = flags
+        self.async_write_ha_state()
+
+    def _update_state(self) -> bool:
+        """Update the state from the coordinator data, return True if it changed."""
         alarm_config: AlarmConfiguration = self.coordinator.data.get("alarm_config")
         anomalies: Anomalies = self.coordinator.data.get("anomalies")
         groups: list[Group] = self.coordinator.data.get("groups", [])
         system_status: SystemStatus = self.coordinator.data.get("system_status")
         devices_infos: DeviceList = self.coordinator.data.get("devices_infos")
+        lookup: DiagralLookupIndex = self.coordinator.data.get(
+            "lookup", EMPTY_LOOKUP_INDEX
+        )
         if not alarm_config:
             _LOGGER.warning("No alarm_config in coordinator data for %s", self.name)
-            return
+            return False
 
         _LOGGER.debug("Anomalies received: %s", anomalies)
         _LOGGER.debug("Groups received: %s", groups)
@@ -113,129 +146,60 @@ class DiagralSensor(DiagralEntity, SensorEntity):
         _LOGGER.debug("Devices infos received: %s", devices_infos)
 
         if self.entity_description.key == "anomalies":
-            self._update_anomalies(anomalies, groups, devices_infos)
+            return self._update_anomalies(anomalies, lookup)
         if self.entity_description.key == "active_groups":
-            self._update_active_groups(system_status, groups, alarm_config)
-
-        _LOGGER.debug("State updated for %s: %s", self.name, self.state)
-        self.async_write_ha_state()
+            return self._update_active_groups(system_status, groups, alarm_config)
+        return False
+
+    def _set_state(self, value: int, attributes: dict[str, Any]) -> bool:
+        """Set the value and attributes, return True if they changed.
+
+        The updated_at attribute (if any) is only refreshed on a change, so that
+        it reports the date and time of the last change of the sensor content.
+        """
+        previous = {
+            key: item
+            for key, item in self._attr_extra_state_attributes.items()
+            if key != "updated_at"
+        }
+        current = {key: item for key, item in attributes.items() if key != "updated_at"}
+        if value == self._attr_native_value and current == previous:
+            return False
+        if "updated_at" in attributes:
+            # Current date and time in local timezone
+            attributes["updated_at"] = dt_util.now().isoformat()
+        self._attr_native_value = value
+        self._attr_extra_state_attributes = attributes
+        return True
 
     def _update_anomalies(
-        self, anomalies: Anomalies, groups: list[Group], devices_infos: DeviceList
-    ) -> None:
+        self, anomalies: Anomalies, lookup: DiagralLookupIndex
+    ) -> bool:
         """Update the anomalies data."""
         _LOGGER.debug(
-            "Update anomalies sensor. Anomalies: %s / Groups: %s / DeviceInfos: %s",
-            anomalies,
-            groups,
-            devices_infos,
+            "Update anomalies sensor. Anomalies: %s / Lookup: %s", anomalies, lookup
         )
-        if anomalies:
-            # Count the number of anomalies
-            anomaly_count = sum(
-                len(getattr(anomalies, attr))
-                for attr in vars(anomalies)
-                if isinstance(getattr(anomalies, attr), list)
-                and all(
-                    isinstance(item, AnomalyDetail) for item in getattr(anomalies, attr)
-                )
-            )
-            _LOGGER.debug("Anomaly count: %s", anomaly_count)
-            self._attr_native_value = anomaly_count
-
-            # Create a list of anomalies
-            self._attr_extra_state_attributes = {}
-            # Add created_at with the date and time of the anomaly creation in local timezone
-            if hasattr(anomalies, "created_at"):
-                created_at_utc = anomalies.created_at
-                created_at_local = dt_util.as_local(created_at_utc)
-                self._attr_extra_state_attributes["created_at"] = (
-                    created_at_local.isoformat()
-                )
-            # Add updated_at with the current date and time in local timezone
-            self._attr_extra_state_attributes["updated_at"] = dt_util.now().isoformat()
-
-            # Create a mapping from group index to group name
-            group_mapping = {group.index: group.name for group in groups}
-
-            # Create a mapping from device index to device label
-            device_mapping = {
-                device.index: device.label
-                for device_list in vars(devices_infos).values()
-                for device in device_list
-            }
-
-            # Define the order of keys
-            key_order = ["serial", "index", "group", "label", "anomaly_names"]
-            anomaly_name_order = ["id", "name"]
-
-            # Add each list of anomalies to extra state attributes
-            anomalies_dict = {}
-            for attr in vars(anomalies):
-                if isinstance(getattr(anomalies, attr), list) and all(
-                    isinstance(item, AnomalyDetail) for item in getattr(anomalies, attr)
-                ):
-                    # Create a list of details for each anomaly
-                    # Order the keys and remove None values
-                    details = [
-                        {
-                            key: (
-                                group_mapping[value]
-                                if key == "group" and value in group_mapping
-                                else device_mapping[value]
-                                if key == "index" and value in device_mapping
-                                else value
-                            )
-                            for key, value in sorted(
-                                vars(equipment).items(),
-                                key=lambda item: key_order.index(item[0])
-                                if item[0] in key_order
-                                else len(key_order),
-                            )
-                            if value is not None
-                        }
-                        for equipment in getattr(anomalies, attr)
-                    ]
-                    # Flatten anomaly names directly into the details
-                    for detail in details:
-                        if "anomaly_names" in detail:
-                            for anomaly in detail.pop("anomaly_names"):
-                                detail.update(
-                                    {
-                                        key: value
-                                        for key, value in vars(anomaly).items()
-                                        if key in anomaly_name_order
-                                    }
-                                )
-                    if details:  # Only add if there are anomalies
-                        anomalies_dict[attr] = details
-
-            if anomalies_dict:
-                self._attr_extra_state_attributes["anomalies"] = anomalies_dict
-
-            # Sort extra state attributes by key with created_at and updated_at first
-            self._attr_extra_state_attributes = {
-                k: self._attr_extra_state_attributes[k]
-                for k in (
-                    "created_at",
-                    "updated_at",
-                    *sorted(
-                        k
-                        for k in self._attr_extra_state_attributes
-                        if k not in ["created_at", "updated_at"]
-                    ),
-                )
-            }
-        else:
-            self._attr_native_value = 0
-            self._attr_extra_state_attributes = {}
+        if not anomalies:
+            return self._set_state(0, {})
+
+        # Unchanged anomalies reuse the previous render
+        rendered: RenderedAnomalies = self._anomalies_renderer.render(anomalies, lookup)
+        _LOGGER.debug("Anomaly count: %s", rendered.count)
+        attributes: dict[str, Any] = {
+            # Date and time of the anomaly creation in local timezone
+            "created_at": dt_util.as_local(anomalies.created_at).isoformat(),
+            "updated_at": None,
+        }
+        if rendered.details:
+            attributes["anomalies"] = rendered.details
+        return self._set_state(rendered.count, attributes)
 
     def _update_active_groups(
         self,
         system_status: SystemStatus,
         groups: list[Group],
         alarm_config: AlarmConfiguration,
-    ) -> None:
+    ) -> bool:
         """Update the active groups sensor."""
         _LOGGER.debug(
             "Update active_groups sensor. SystemStatus: %s / Groups: %s / AlarmConfig: %s",
@@ -244,15 +208,9 @@ class DiagralSensor(DiagralEntity, SensorEntity):
             alarm_config,
         )
 
-        if system_status.status == "PRESENCE":
-            # If the system is in presence mode, we grab the groups from the alarm configuration
-            group_list = alarm_config.presence_group
-        else:
-            # Otherwise, count the number of activated groups
-            group_list = system_status.activated_groups
+        group_list: list[int] = get_active_groups(system_status, alarm_config)
 
         active_groups_count: int = len(group_list)
-        self._attr_native_value = active_groups_count
 
         groups_info = [
             {
@@ -262,9 +220,8 @@ class DiagralSensor(DiagralEntity, SensorEntity):
             }
             for group in groups
         ]
-        self._attr_extra_state_attributes = {
-            "groups": groups_info,
-            "updated_at": dt_util.now().isoformat(),
-        }
         _LOGGER.debug("Active groups count: %s", active_groups_count)
         _LOGGER.debug("Groups info: %s", groups_info)
+        return self._set_state(
+            active_groups_count, {"groups": groups_info, "updated_at": None}
+        )
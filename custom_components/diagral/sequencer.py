@@ -0,0 +1,48 @@
+"""Ordering of the webhook-driven state updates by their event time."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+
+class DiagralStateSequencer:
+    """Track the newest notification time per category and reject older ones.
+
+    The Diagral cloud does not guarantee the delivery order of the
+    notifications: a late one must not overwrite the state set by a newer one.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the sequencer."""
+        # Category (STATUS, ANOMALY, ...) -> date_time of the newest notification
+        self._newest: dict[str, datetime] = {}
+        self.accepted = 0
+        self.rejected = 0
+
+    def accept(self, category: str, event_time: datetime | None) -> bool:
+        """Return False if the event is older than the newest of its category.
+
+        Accepted events become the newest of their category. Events sharing the
+        same time (several groups armed at once) are all accepted.
+        """
+        if event_time is None:
+            self.accepted += 1
+            return True
+        newest = self._newest.get(category)
+        if newest is not None and event_time < newest:
+            self.rejected += 1
+            return False
+        self._newest[category] = event_time
+        self.accepted += 1
+        return True
+
+    def as_dict(self) -> dict[str, object]:
+        """Return the sequencer statistics."""
+        return {
+            "newest": {
+                category: event_time.isoformat()
+                for category, event_time in self._newest.items()
+            },
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+        }
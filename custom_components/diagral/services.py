@@ -0,0 +1,165 @@
+"""Actions of the Diagral integration spanning several alarms."""
+
+from __future__ import annotations
+
+import asyncio
+from functools import partial
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from pydiagral.exceptions import DiagralAPIError
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+
+from .commands import MODE_COMMANDS, DiagralModeCommand, validate_code
+from .const import (
+    CONF_SERIAL_ID,
+    DOMAIN,
+    INPUT_CODE,
+    INPUT_CONFIG_ENTRIES,
+    INPUT_MAX_CONCURRENCY,
+    INPUT_MODE,
+    INPUT_SERIALS,
+    SERVICE_SET_MODE,
+    SET_MODE_DEFAULT_CONCURRENCY,
+    SET_MODE_MAX_CONCURRENCY,
+)
+
+if TYPE_CHECKING:
+    from . import DiagralConfigEntry
+
+_LOGGER = logging.getLogger(__name__)
+
+SET_MODE_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Optional(INPUT_CONFIG_ENTRIES): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional(INPUT_SERIALS): vol.All(cv.ensure_list, [cv.string]),
+            vol.Required(INPUT_MODE): vol.In(MODE_COMMANDS),
+            vol.Optional(INPUT_CODE): vol.Coerce(int),
+            vol.Optional(
+                INPUT_MAX_CONCURRENCY, default=SET_MODE_DEFAULT_CONCURRENCY
+            ): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=SET_MODE_MAX_CONCURRENCY)
+            ),
+        }
+    ),
+    cv.has_at_least_one_key(INPUT_CONFIG_ENTRIES, INPUT_SERIALS),
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the actions of the Diagral domain."""
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_MODE,
+        partial(async_set_mode, hass),
+        schema=SET_MODE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+async def async_set_mode(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Set the mode of several alarms, a bounded number of them at a time."""
+    entries: list[DiagralConfigEntry] = _async_get_entries(hass, call.data)
+    mode: DiagralModeCommand = MODE_COMMANDS[call.data[INPUT_MODE]]
+    semaphore = asyncio.Semaphore(call.data[INPUT_MAX_CONCURRENCY])
+    started_at = time.monotonic()
+    results: list[dict[str, Any]] = await asyncio.gather(
+        *(
+            _async_set_site_mode(entry, mode, call.data.get(INPUT_CODE), semaphore)
+            for entry in entries
+        )
+    )
+    return {
+        "sites": {
+            entry.entry_id: result
+            for entry, result in zip(entries, results, strict=True)
+        },
+        "duration": round(time.monotonic() - started_at, 3),
+    }
+
+
+@callback
+def _async_get_entries(
+    hass: HomeAssistant, data: dict[str, Any]
+) -> list[DiagralConfigEntry]:
+    """Return the loaded entries matching the requested entry ids and serials."""
+    loaded: list[DiagralConfigEntry] = [
+        entry
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.state is ConfigEntryState.LOADED
+    ]
+    by_id = {entry.entry_id: entry for entry in loaded}
+    by_serial = {entry.data[CONF_SERIAL_ID]: entry for entry in loaded}
+    entries: dict[str, DiagralConfigEntry] = {}
+    unknown: list[str] = []
+    for requested, index in (
+        (data.get(INPUT_CONFIG_ENTRIES, []), by_id),
+        (data.get(INPUT_SERIALS, []), by_serial),
+    ):
+        for key in requested:
+            if (entry := index.get(key)) is None:
+                unknown.append(key)
+            else:
+                entries[entry.entry_id] = entry
+    if unknown:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="unknown_sites",
+            translation_placeholders={"sites": ", ".join(unknown)},
+        )
+    return list(entries.values())
+
+
+async def _async_set_site_mode(
+    entry: DiagralConfigEntry,
+    mode: DiagralModeCommand,
+    code: int | None,
+    semaphore: asyncio.Semaphore,
+) -> dict[str, Any]:
+    """Send a mode command to an alarm and return its result."""
+    result: dict[str, Any] = {
+        "serial": entry.data[CONF_SERIAL_ID],
+        "title": entry.title,
+    }
+    if not validate_code(
+        entry.runtime_data.config.options.alarmpanel_options,
+        mode.target_state,
+        code,
+    ):
+        return {**result, "success": False, "error": "invalid_code"}
+
+    if (alarm_panel := entry.runtime_data.alarm_panel) is None:
+        return {**result, "success": False, "error": "unavailable"}
+
+    async with semaphore:
+        started_at = time.monotonic()
+        try:
+            # Sent as from the alarm panel, which shows the transition state
+            sent: bool = await alarm_panel.async_send_mode(mode)
+        except DiagralAPIError as err:
+            _LOGGER.error("Failed to %s (%s): %s", mode.description, entry.title, err)
+            result.update(success=False, error=str(err))
+        except Exception as err:  # noqa: BLE001
+            # Reported for this site only, the other sites keep their results
+            _LOGGER.exception(
+                "Unexpected error trying to %s (%s)", mode.description, entry.title
+            )
+            result.update(success=False, error=repr(err))
+        else:
+            result.update(success=True, superseded=not sent)
+        result["duration"] = round(time.monotonic() - started_at, 3)
+    return result
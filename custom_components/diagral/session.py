@@ -0,0 +1,100 @@
+"""Client session shared by the Diagral API clients."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+from pydiagral.api import DiagralAPI
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.util.hass_dict import HassKey
+
+from .const import DOMAIN
+
+
+class DiagralSessionStats:
+    """Count the requests sent and the connections they opened or reused."""
+
+    def __init__(self) -> None:
+        """Initialize the statistics."""
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Return the trace config feeding the statistics."""
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        return trace_config
+
+    async def _on_request_start(
+        self, session: aiohttp.ClientSession, context: SimpleNamespace, params: Any
+    ) -> None:
+        self.requests += 1
+
+    async def _on_connection_create_end(
+        self, session: aiohttp.ClientSession, context: SimpleNamespace, params: Any
+    ) -> None:
+        self.connections_created += 1
+
+    async def _on_connection_reuseconn(
+        self, session: aiohttp.ClientSession, context: SimpleNamespace, params: Any
+    ) -> None:
+        self.connections_reused += 1
+
+    def as_dict(self) -> dict[str, float]:
+        """Return the session statistics."""
+        connections = self.connections_created + self.connections_reused
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_ratio": (
+                round(self.connections_reused / connections, 3) if connections else 0.0
+            ),
+        }
+
+
+@dataclass(slots=True)
+class DiagralClientSession:
+    """The client session of the integration and its statistics."""
+
+    session: aiohttp.ClientSession
+    stats: DiagralSessionStats = field(default_factory=DiagralSessionStats)
+
+
+DATA_CLIENT_SESSION: HassKey[DiagralClientSession] = HassKey(f"{DOMAIN}_session")
+
+
+@callback
+def async_get_client_session(hass: HomeAssistant) -> DiagralClientSession:
+    """Return the client session shared by the config entries and flows.
+
+    The session uses the connector of Home Assistant (keep-alive, DNS cache,
+    connection limits) and is closed by Home Assistant when it stops.
+    """
+    if (client_session := hass.data.get(DATA_CLIENT_SESSION)) is None:
+        stats = DiagralSessionStats()
+        client_session = hass.data[DATA_CLIENT_SESSION] = DiagralClientSession(
+            async_create_clientsession(hass, trace_configs=[stats.trace_config()]),
+            stats,
+        )
+    return client_session
+
+
+@callback
+def async_create_diagral_api(hass: HomeAssistant, **kwargs: Any) -> DiagralAPI:
+    """Create a Diagral API client using the shared client session.
+
+    The client must not be used as a context manager: leaving it would close
+    the session of the other clients.
+    """
+    api = DiagralAPI(**kwargs)
+    api.session = async_get_client_session(hass).session
+    return api
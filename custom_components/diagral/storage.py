@@ -0,0 +1,97 @@
+"""Persistence of the last Diagral coordinator data for instant startup."""
+
+from __future__ import annotations
+
+from dataclasses import fields, is_dataclass
+from datetime import datetime
+import logging
+from typing import Any
+
+from pydiagral.models import AlarmConfiguration, Anomalies, DeviceList, SystemStatus
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, SNAPSHOT_SAVE_DELAY
+from .lookup import DiagralLookupIndex
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Coordinator data keys persisted in the snapshot and their pydiagral model
+SNAPSHOT_MODELS: dict[str, type] = {
+    "alarm_config": AlarmConfiguration,
+    "devices_infos": DeviceList,
+    "system_status": SystemStatus,
+    "anomalies": Anomalies,
+}
+
+
+def _to_raw(value: Any) -> Any:
+    """Convert a pydiagral model to the raw format returned by the Diagral API."""
+    if is_dataclass(value):
+        return {
+            field.metadata.get("alias", field.name): _to_raw(getattr(value, field.name))
+            for field in fields(value)
+            if getattr(value, field.name) is not None
+        }
+    if isinstance(value, list):
+        return [_to_raw(item) for item in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def serialize_snapshot(data: dict[str, Any]) -> dict[str, Any]:
+    """Return a JSON-serializable snapshot of the coordinator data."""
+    return {key: _to_raw(data.get(key)) for key in SNAPSHOT_MODELS}
+
+
+def deserialize_snapshot(raw: dict[str, Any]) -> dict[str, Any] | None:
+    """Rebuild the coordinator data from a snapshot.
+
+    Return None when the snapshot is incomplete or cannot be parsed.
+    """
+    try:
+        data: dict[str, Any] = {
+            # Empty values (e.g. no anomalies) are restored as they were stored
+            key: model.from_dict(raw[key]) if raw.get(key) else raw.get(key)
+            for key, model in SNAPSHOT_MODELS.items()
+        }
+    except (KeyError, TypeError, ValueError) as err:
+        _LOGGER.warning("Ignoring invalid Diagral snapshot: %s", err)
+        return None
+    if not data["alarm_config"] or not data["system_status"]:
+        return None
+    data["groups"] = data["alarm_config"].groups or []
+    data["lookup"] = DiagralLookupIndex.build(data["devices_infos"], data["groups"])
+    return data
+
+
+class DiagralSnapshotStore:
+    """Store the last good coordinator data of a config entry."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the snapshot store."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}"
+        )
+
+    async def async_load(self) -> dict[str, Any] | None:
+        """Load the coordinator data from the last snapshot."""
+        raw: dict[str, Any] | None = await self._store.async_load()
+        if not raw:
+            return None
+        return deserialize_snapshot(raw)
+
+    @callback
+    def async_save(self, data: dict[str, Any]) -> None:
+        """Schedule the save of the coordinator data."""
+        self._store.async_delay_save(
+            lambda: serialize_snapshot(data), SNAPSHOT_SAVE_DELAY
+        )
+
+    async def async_remove(self) -> None:
+        """Remove the snapshot."""
+        await self._store.async_remove()
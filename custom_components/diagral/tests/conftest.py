@@ -4,6 +4,31 @@ from unittest.mock import MagicMock
 from homeassistant.core import HomeAssistant
 
 
+def pytest_addoption(parser):
+    """Add the option running the benchmarks."""
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        default=False,
+        help="Run the benchmarks (tests marked with benchmark), skipped by default",
+    )
+
+
+def pytest_configure(config):
+    """Register the benchmark marker."""
+    config.addinivalue_line("markers", "benchmark: timing benchmark, run with --benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip the benchmarks unless requested: timings are not reliable on CI."""
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmark, run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
 @pytest.fixture
 def mock_hass():
     """Return a mock Home Assistant instance."""
@@ -3,11 +3,21 @@
 Tests _get_ha_state(), _validate_code(), and _is_code_arm_required()
 without making real API calls or instantiating the full entity.
 """
+import asyncio
+from functools import partial
+
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 from homeassistant.components.alarm_control_panel import AlarmControlPanelState
+from pydiagral.exceptions import DiagralAPIError
+from homeassistant.exceptions import ServiceValidationError
+from pydiagral.models import Group, SystemStatus
 
 from custom_components.diagral.alarm_control_panel import DiagralAlarmControlPanel
+from custom_components.diagral.commands import DiagralCommandQueue
+from custom_components.diagral.confirmation import DiagralCommandConfirmations
+from custom_components.diagral.coordinator import DiagralDataUpdateCoordinator
+from custom_components.diagral.lookup import DiagralLookupIndex
 from custom_components.diagral.const import (
     CONF_ALARMPANEL_ACTIONTYPE_CODE,
     CONF_ALARMPANEL_CODE,
@@ -150,3 +160,304 @@ class TestValidateCode:
         """'disarm' trigger on ARM transition must pass (code not required for arming)."""
         panel = make_panel_mock("disarm", 1234, AlarmControlPanelState.DISARMED)
         assert panel._validate_code(AlarmControlPanelState.ARMED_AWAY, None) is True
+
+
+class CommandPanel(DiagralAlarmControlPanel):
+    """Panel exposing its alarm state as state, as recent Home Assistant does."""
+
+    @property
+    def state(self):
+        """Return the alarm state."""
+        return self._attr_alarm_state
+
+
+def make_command_panel(alarm_state: AlarmControlPanelState, status: str) -> CommandPanel:
+    """Return a panel able to send commands, with a mocked API and coordinator.
+
+    Statuses pushed to the coordinator resolve the confirmations and notify
+    the panel, as the coordinator listeners do.
+    """
+    panel = object.__new__(CommandPanel)
+    panel._config = MagicMock()
+    panel._config.options.alarmpanel_options = {
+        CONF_ALARMPANEL_ACTIONTYPE_CODE: "never",
+        CONF_ALARMPANEL_CODE: None,
+    }
+    panel._attr_alarm_state = alarm_state
+    panel._attr_extra_state_attributes = {}
+    panel._pending_command = None
+    panel._commands = DiagralCommandQueue()
+    panel._api = MagicMock()
+    panel.coordinator = MagicMock()
+    panel.coordinator.confirmations = DiagralCommandConfirmations()
+    panel.coordinator.data = {"system_status": SystemStatus(status=status, activated_groups=[])}
+    panel.coordinator.async_apply_system_status.side_effect = lambda system_status: push_status(panel, system_status)
+    panel.coordinator.api = panel._api
+    panel.coordinator.async_send_command = partial(DiagralDataUpdateCoordinator.async_send_command, panel.coordinator)
+    panel.async_write_ha_state = MagicMock()
+    return panel
+
+
+def push_status(panel: CommandPanel, system_status: SystemStatus) -> None:
+    """Simulate a coordinator update with the given status."""
+    panel.coordinator.data = {"system_status": system_status}
+    panel.coordinator.confirmations.resolve(system_status)
+    panel._handle_coordinator_update()
+
+
+class TestCommandConfirmation:
+    """Tests for the optimistic state and the confirmation of the commands."""
+
+    async def test_arm_shows_arming_and_applies_answered_status(self):
+        """Arming must show ARMING at once and be confirmed by the answered status."""
+        panel = make_command_panel(AlarmControlPanelState.DISARMED, "OFF")
+        writes = []
+        panel.async_write_ha_state.side_effect = lambda: writes.append(panel._attr_alarm_state)
+        answered = SystemStatus(status="TEMPO_GROUP", activated_groups=[1])
+        panel._api.start_system = AsyncMock(return_value=answered)
+        await panel.async_alarm_arm_away()
+        assert writes[0] == AlarmControlPanelState.ARMING
+        assert panel._pending_command is None
+        panel.coordinator.async_apply_system_status.assert_called_once_with(answered)
+        panel.coordinator.async_request_refresh.assert_not_called()
+        panel.coordinator.async_track_confirmation.assert_called_once()
+
+    async def test_outdated_status_keeps_optimistic_state(self):
+        """A status predating the command must not overwrite the optimistic state."""
+        panel = make_command_panel(AlarmControlPanelState.ARMED_AWAY, "GROUP")
+        panel._api.stop_system = AsyncMock(return_value=None)
+        await panel.async_alarm_disarm()
+        push_status(panel, SystemStatus(status="GROUP", activated_groups=[1]))
+        assert panel._attr_alarm_state == AlarmControlPanelState.DISARMING
+
+    async def test_webhook_status_confirms_command(self):
+        """The next status reaching the target must confirm the command."""
+        panel = make_command_panel(AlarmControlPanelState.DISARMED, "OFF")
+        panel._api.presence = AsyncMock(return_value=None)
+        await panel.async_alarm_arm_home()
+        waiter = panel._pending_command
+        push_status(panel, SystemStatus(status="PRESENCE", activated_groups=[1]))
+        assert panel._attr_alarm_state == AlarmControlPanelState.ARMED_HOME
+        assert waiter.confirmed
+        assert panel.coordinator.confirmations.as_dict()["commands"]["presence"]["confirmed"] == 1
+
+    async def test_failed_command_rolls_back(self):
+        """A command rejected by the API must restore the previous state."""
+        panel = make_command_panel(AlarmControlPanelState.DISARMED, "OFF")
+        panel._api.start_system = AsyncMock(side_effect=DiagralAPIError("boom"))
+        await panel.async_alarm_arm_away()
+        assert panel._attr_alarm_state == AlarmControlPanelState.DISARMED
+        assert panel._pending_command is None
+        assert panel.coordinator.confirmations.as_dict()["pending"] == 0
+
+    async def test_unexpected_error_rolls_back(self):
+        """An error other than DiagralAPIError must not leave the panel stuck."""
+        panel = make_command_panel(AlarmControlPanelState.DISARMED, "OFF")
+        panel._api.start_system = AsyncMock(side_effect=RuntimeError("boom"))
+        with pytest.raises(RuntimeError):
+            await panel.async_alarm_arm_away()
+        assert panel._attr_alarm_state == AlarmControlPanelState.DISARMED
+        assert panel._pending_command is None
+        assert panel.coordinator.confirmations.as_dict()["pending"] == 0
+        push_status(panel, SystemStatus(status="GROUP", activated_groups=[1]))
+        assert panel._attr_alarm_state == AlarmControlPanelState.ARMED_AWAY
+
+    async def test_expired_command_rolls_back(self):
+        """An expired command must restore the state of the alarm."""
+        panel = make_command_panel(AlarmControlPanelState.DISARMED, "OFF")
+        writes = []
+        panel.async_write_ha_state.side_effect = lambda: writes.append(panel._attr_alarm_state)
+        panel._api.start_system = AsyncMock(return_value=None)
+        await panel.async_alarm_arm_away()
+        assert writes == [AlarmControlPanelState.ARMING]
+        panel.coordinator.confirmations.expire(panel._pending_command)
+        await asyncio.sleep(0)
+        assert panel._attr_alarm_state == AlarmControlPanelState.DISARMED
+        assert panel._pending_command is None
+        panel.async_write_ha_state.assert_called()
+        assert writes[-1] == AlarmControlPanelState.DISARMED
+
+    async def test_arming_keeps_trigger(self):
+        """Arming a triggered alarm must keep it triggered once confirmed."""
+        panel = make_command_panel(AlarmControlPanelState.TRIGGERED, "GROUP")
+        panel._api.start_system = AsyncMock(return_value=None)
+        await panel.async_alarm_arm_away()
+        assert panel._attr_alarm_state == AlarmControlPanelState.TRIGGERED
+        push_status(panel, SystemStatus(status="GROUP", activated_groups=[1]))
+        await asyncio.sleep(0)
+        assert panel._attr_alarm_state == AlarmControlPanelState.TRIGGERED
+        assert panel._pending_command is None
+
+    async def test_expired_disarm_keeps_trigger(self):
+        """A disarm left unconfirmed must not lose the trigger."""
+        panel = make_command_panel(AlarmControlPanelState.TRIGGERED, "GROUP")
+        writes = []
+        panel.async_write_ha_state.side_effect = lambda: writes.append(panel.state)
+        panel._api.stop_system = AsyncMock(return_value=None)
+        await panel.async_alarm_disarm()
+        assert writes == [AlarmControlPanelState.DISARMING]
+        panel.coordinator.confirmations.expire(panel._pending_command)
+        await asyncio.sleep(0)
+        assert panel._attr_alarm_state == AlarmControlPanelState.TRIGGERED
+        assert writes[-1] == AlarmControlPanelState.TRIGGERED
+
+    async def test_confirmed_disarm_clears_trigger(self):
+        """A confirmed disarm must end the trigger."""
+        panel = make_command_panel(AlarmControlPanelState.TRIGGERED, "GROUP")
+        panel._api.stop_system = AsyncMock(return_value=SystemStatus(status="OFF", activated_groups=[]))
+        await panel.async_alarm_disarm()
+        await asyncio.sleep(0)
+        assert panel._attr_alarm_state == AlarmControlPanelState.DISARMED
+
+    async def test_group_command_is_confirmed_by_answered_status(self):
+        """A group command must be confirmed by the status it answers."""
+        panel = make_command_panel(AlarmControlPanelState.DISARMED, "OFF")
+        panel._api.activate_group = AsyncMock(return_value=SystemStatus(status="GROUP", activated_groups=[1, 2]))
+        await panel.action_arm_groups([1, 2])
+        stats = panel.coordinator.confirmations.as_dict()
+        assert stats["pending"] == 0
+        assert stats["commands"]["activate_group"]["confirmed"] == 1
+
+    async def test_concurrent_mode_commands_keep_the_last_one(self):
+        """A mode command superseded while waiting must not be sent."""
+        panel = make_command_panel(AlarmControlPanelState.DISARMED, "OFF")
+        release = asyncio.Event()
+
+        async def slow_start():
+            await release.wait()
+            return None
+
+        panel._api.start_system = AsyncMock(side_effect=slow_start)
+        panel._api.presence = AsyncMock(return_value=None)
+        panel._api.stop_system = AsyncMock(return_value=None)
+        first = asyncio.create_task(panel.async_alarm_arm_away())
+        await asyncio.sleep(0)
+        queued = [asyncio.create_task(panel.async_alarm_arm_home()), asyncio.create_task(panel.async_alarm_disarm())]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *queued)
+        panel._api.presence.assert_not_awaited()
+        panel._api.stop_system.assert_awaited_once()
+        assert panel._commands.as_dict()["superseded"] == 1
+
+
+class TestSetGroups:
+    """Tests for action_set_groups()."""
+
+    def _panel(self, active: list[int]) -> CommandPanel:
+        """Return a panel with 4 groups, the given ones being active."""
+        panel = make_command_panel(AlarmControlPanelState.ARMED_AWAY, "GROUP")
+        panel.coordinator.data = {
+            "system_status": SystemStatus(status="GROUP" if active else "OFF", activated_groups=active),
+            "lookup": DiagralLookupIndex.build(None, [Group(index=index, name=f"Group {index}") for index in range(1, 5)]),
+        }
+        panel._api.activate_group = AsyncMock(return_value=None)
+        panel._api.disable_group = AsyncMock(return_value=None)
+        return panel
+
+    async def test_only_changed_groups_are_sent(self):
+        """Only the groups to add and to remove must be sent, once each."""
+        panel = self._panel([1, 2])
+        response = await panel.action_set_groups([2, 3, 4])
+        panel._api.activate_group.assert_awaited_once_with([3, 4])
+        panel._api.disable_group.assert_awaited_once_with([1])
+        assert response == {"activated": [3, 4], "disabled": [1], "superseded": False, "error": None}
+
+    async def test_unchanged_groups_send_nothing(self):
+        """Requesting the current groups must not call the API."""
+        panel = self._panel([1, 2])
+        response = await panel.action_set_groups([2, 1])
+        panel._api.activate_group.assert_not_awaited()
+        panel._api.disable_group.assert_not_awaited()
+        assert response == {"activated": [], "disabled": [], "superseded": False, "error": None}
+
+    async def test_empty_list_disarms_all_groups(self):
+        """An empty list must disable the active groups only."""
+        panel = self._panel([2, 4])
+        response = await panel.action_set_groups([])
+        panel._api.activate_group.assert_not_awaited()
+        assert response["disabled"] == [2, 4]
+
+    async def test_single_group_is_accepted(self):
+        """A single group id must be accepted."""
+        panel = self._panel([])
+        assert (await panel.action_set_groups(3))["activated"] == [3]
+
+    async def test_unknown_groups_are_rejected(self):
+        """Unknown group ids must raise a validation error without calling the API."""
+        panel = self._panel([1])
+        with pytest.raises(ServiceValidationError) as err:
+            await panel.action_set_groups([1, 7, 9])
+        assert err.value.translation_placeholders == {"group_ids": "7, 9"}
+        panel._api.activate_group.assert_not_awaited()
+
+    async def test_failed_call_is_reported(self):
+        """A call rejected by the API must stop the request and be reported."""
+        panel = self._panel([1])
+        panel._api.activate_group = AsyncMock(side_effect=DiagralAPIError("boom"))
+        response = await panel.action_set_groups([2])
+        panel._api.disable_group.assert_not_awaited()
+        assert response == {
+            "activated": [],
+            "disabled": [],
+            "superseded": False,
+            "error": {"command": "activate_group", "group_ids": [2], "message": "boom"},
+        }
+
+    async def test_partial_failure_is_reported(self):
+        """A failed disable after a successful activate must report both."""
+        panel = self._panel([1])
+        panel._api.disable_group = AsyncMock(side_effect=DiagralAPIError("boom"))
+        response = await panel.action_set_groups([2])
+        assert response["activated"] == [2]
+        assert response["disabled"] == []
+        assert response["error"]["command"] == "disable_group"
+
+    async def test_presence_groups_are_active(self):
+        """In PRESENCE mode, the active groups are the presence groups, as for the sensor."""
+        panel = self._panel([])
+        panel.coordinator.data["system_status"] = SystemStatus(status="PRESENCE", activated_groups=[])
+        panel.coordinator.data["alarm_config"] = MagicMock(presence_group=[1, 2])
+        response = await panel.action_set_groups([2, 3])
+        panel._api.activate_group.assert_awaited_once_with([3])
+        panel._api.disable_group.assert_awaited_once_with([1])
+        assert (response["activated"], response["disabled"]) == ([3], [1])
+
+    async def test_mode_command_does_not_supersede_groups(self):
+        """A mode command queued after a groups request must not cancel it."""
+        panel = self._panel([])
+        panel._api.stop_system = AsyncMock(return_value=None)
+        release = asyncio.Event()
+        busy = asyncio.ensure_future(panel._commands.async_run(release.wait))
+        groups = asyncio.ensure_future(panel.action_set_groups([1]))
+        disarm = asyncio.ensure_future(panel.async_alarm_disarm())
+        await asyncio.sleep(0)
+        release.set()
+        response, _, _ = await asyncio.gather(groups, disarm, busy)
+        assert response["superseded"] is False
+        panel._api.activate_group.assert_awaited_once_with([1])
+
+
+class TestAlertEvent:
+    """Tests for _handle_event_alert()."""
+
+    def _panel(self) -> CommandPanel:
+        """Return a disarmed panel with a named group."""
+        panel = make_command_panel(AlarmControlPanelState.DISARMED, "OFF")
+        panel.coordinator.data["lookup"] = DiagralLookupIndex.build(None, [Group(index=2, name="Garage")])
+        return panel
+
+    def test_intrusion_sets_trigger_group(self):
+        """An intrusion must trigger the alarm and describe its group."""
+        panel = self._panel()
+        panel._handle_event_alert({"type": "ALERT", "data": {"alarm_code": "1130", "group_index": "2"}})
+        assert panel._attr_alarm_state == AlarmControlPanelState.TRIGGERED
+        assert panel._attr_extra_state_attributes["trigger"] == {"group_name": "Garage", "group_id": 2}
+        panel.async_write_ha_state.assert_called_once()
+
+    def test_intrusion_without_group(self):
+        """An intrusion sent with a null group must still trigger the alarm."""
+        panel = self._panel()
+        panel._handle_event_alert({"type": "ALERT", "data": {"alarm_code": "1130", "group_index": None}})
+        assert panel._attr_alarm_state == AlarmControlPanelState.TRIGGERED
+        assert "trigger" not in panel._attr_extra_state_attributes
@@ -0,0 +1,220 @@
+"""Tests for the anomalies renderer in anomalies.py (Tier 2).
+
+Checks the rendered details against the previous per-update algorithm of the
+anomalies sensor and the render cache over repeated polls. The benchmark of
+the renders, with and without the render cache, runs with --benchmark.
+"""
+from datetime import datetime, timezone
+import time
+from unittest.mock import patch
+
+import pytest
+
+from pydiagral.models import (
+    Anomalies,
+    AnomalyDetail,
+    AnomalyName,
+    DeviceInfos,
+    DeviceList,
+    Group,
+)
+
+from custom_components.diagral.anomalies import (
+    DiagralAnomaliesRenderer,
+    anomalies_fingerprint,
+    render_anomalies,
+)
+from custom_components.diagral.lookup import DiagralLookupIndex
+
+# Size of the simulated anomaly set (per category)
+EQUIPMENTS_PER_CATEGORY = 150
+RENDERS = 50
+REPEATS = 3
+
+
+def make_anomalies(count: int, created_at: datetime | None = None) -> Anomalies:
+    """Build anomalies with count equipments in most categories."""
+    equipments = [
+        AnomalyDetail(
+            anomaly_names=[AnomalyName(id=1, name="Low battery"), AnomalyName(id=2, name="Tamper")],
+            serial=f"SN{index}",
+            index=index,
+            group=(index % 4) + 1,
+            label=None if index % 2 else f"Label {index}",
+        )
+        for index in range(1, count + 1)
+    ]
+    return Anomalies(
+        created_at=created_at or datetime(2024, 1, 1, tzinfo=timezone.utc),
+        sensors=list(equipments),
+        badges=list(equipments),
+        sirens=list(equipments),
+        cameras=list(equipments),
+        commands=list(equipments),
+        transmitters=[],
+    )
+
+
+def make_lookup(count: int) -> DiagralLookupIndex:
+    """Build a lookup index with count sensors and 4 groups."""
+    return DiagralLookupIndex.build(
+        DeviceList(sensors=[DeviceInfos(index=index, label=f"Sensor {index}") for index in range(1, count + 1)]),
+        [Group(index=index, name=f"Group {index}") for index in range(1, 5)],
+    )
+
+
+def legacy_render(anomalies: Anomalies, lookup: DiagralLookupIndex) -> tuple[int, dict]:
+    """Render anomalies with the algorithm previously run on every update."""
+    anomaly_count = sum(
+        len(getattr(anomalies, attr))
+        for attr in vars(anomalies)
+        if isinstance(getattr(anomalies, attr), list)
+        and all(isinstance(item, AnomalyDetail) for item in getattr(anomalies, attr))
+    )
+    group_mapping = {index: group.name for index, group in lookup.groups.items()}
+    device_mapping = dict(lookup.device_labels)
+    key_order = ["serial", "index", "group", "label", "anomaly_names"]
+    anomaly_name_order = ["id", "name"]
+    anomalies_dict = {}
+    for attr in vars(anomalies):
+        if isinstance(getattr(anomalies, attr), list) and all(
+            isinstance(item, AnomalyDetail) for item in getattr(anomalies, attr)
+        ):
+            details = [
+                {
+                    key: (
+                        group_mapping[value]
+                        if key == "group" and value in group_mapping
+                        else device_mapping[value]
+                        if key == "index" and value in device_mapping
+                        else value
+                    )
+                    for key, value in sorted(
+                        vars(equipment).items(),
+                        key=lambda item: key_order.index(item[0]) if item[0] in key_order else len(key_order),
+                    )
+                    if value is not None
+                }
+                for equipment in getattr(anomalies, attr)
+            ]
+            for detail in details:
+                if "anomaly_names" in detail:
+                    for anomaly in detail.pop("anomaly_names"):
+                        detail.update({key: value for key, value in vars(anomaly).items() if key in anomaly_name_order})
+            if details:
+                anomalies_dict[attr] = details
+    return anomaly_count, anomalies_dict
+
+
+class TestRenderAnomalies:
+    """Tests for render_anomalies()."""
+
+    def test_matches_legacy_render(self):
+        """The precompiled render must produce the same count and details, key order included."""
+        anomalies = make_anomalies(10)
+        lookup = make_lookup(5)
+        count, details = render_anomalies(anomalies, lookup)
+        legacy_count, legacy_details = legacy_render(anomalies, lookup)
+        assert count == legacy_count == 50
+        assert details == legacy_details
+        assert [list(detail) for detail in details["sensors"]] == [
+            list(detail) for detail in legacy_details["sensors"]
+        ]
+
+    def test_labels_and_group_names_are_resolved(self):
+        """Device index and group must be replaced by their label and name."""
+        count, details = render_anomalies(make_anomalies(1), make_lookup(1))
+        assert details["sensors"][0] == {
+            "serial": "SN1",
+            "index": "Sensor 1",
+            "group": "Group 2",
+            "id": 2,
+            "name": "Tamper",
+        }
+
+    def test_empty_categories_are_skipped(self):
+        """Empty or missing categories must not appear in the details."""
+        count, details = render_anomalies(make_anomalies(1), make_lookup(1))
+        assert "transmitters" not in details
+        assert "central" not in details
+
+
+class TestDiagralAnomaliesRenderer:
+    """Tests for the render cache."""
+
+    def test_unchanged_anomalies_reuse_render(self):
+        """Equal anomalies from a new poll must reuse the previous render."""
+        renderer = DiagralAnomaliesRenderer()
+        lookup = make_lookup(5)
+        first = renderer.render(make_anomalies(5), lookup)
+        assert renderer.render(make_anomalies(5), lookup) is first
+
+    def test_changed_anomalies_are_rendered(self):
+        """Different anomalies must be rendered again."""
+        renderer = DiagralAnomaliesRenderer()
+        lookup = make_lookup(5)
+        first = renderer.render(make_anomalies(5), lookup)
+        second = renderer.render(make_anomalies(4), lookup)
+        assert second is not first
+        assert second.count == 20
+
+    def test_new_lookup_index_is_rendered(self):
+        """A new lookup index (configuration refresh) must invalidate the render."""
+        renderer = DiagralAnomaliesRenderer()
+        anomalies = make_anomalies(5)
+        first = renderer.render(anomalies, make_lookup(5))
+        assert renderer.render(anomalies, make_lookup(5)) is not first
+
+    def test_fingerprint_ignores_created_at(self):
+        """Only the anomaly content is part of the fingerprint."""
+        assert anomalies_fingerprint(make_anomalies(3)) == anomalies_fingerprint(
+            make_anomalies(3, datetime(2025, 1, 1, tzinfo=timezone.utc))
+        )
+
+
+class TestAnomaliesRenderCache:
+    """Check the render cache over repeated polls of a large anomaly set."""
+
+    def test_unchanged_polls_are_rendered_once(self):
+        """Polls returning the same anomalies must hit the render cache."""
+        lookup = make_lookup(EQUIPMENTS_PER_CATEGORY)
+        polls = [make_anomalies(EQUIPMENTS_PER_CATEGORY) for _ in range(RENDERS)]
+        renderer = DiagralAnomaliesRenderer()
+        with patch(
+            "custom_components.diagral.anomalies.render_anomalies", wraps=render_anomalies
+        ) as render:
+            rendered = [renderer.render(anomalies, lookup) for anomalies in polls]
+        assert render.call_count == 1
+        assert all(result is rendered[0] for result in rendered)
+        assert (rendered[0].count, rendered[0].details) == legacy_render(polls[-1], lookup)
+
+
+@pytest.mark.benchmark
+class TestAnomaliesBenchmark:
+    """Benchmark the renders on a large anomaly set."""
+
+    def test_renders_are_faster_than_legacy(self):
+        """Precompiled and cached renders must beat the legacy render."""
+        lookup = make_lookup(EQUIPMENTS_PER_CATEGORY)
+        polls = [make_anomalies(EQUIPMENTS_PER_CATEGORY) for _ in range(RENDERS)]
+
+        def best_of(render) -> float:
+            """Return the best duration of rendering all polls, to absorb noise."""
+            durations = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                for anomalies in polls:
+                    render(anomalies, lookup)
+                durations.append(time.perf_counter() - start)
+            return min(durations)
+
+        legacy = best_of(legacy_render)
+        precompiled = best_of(render_anomalies)
+        cached = best_of(DiagralAnomaliesRenderer().render)
+
+        print(
+            f"\n{EQUIPMENTS_PER_CATEGORY * 5} anomalies x {RENDERS} polls: "
+            f"legacy={legacy * 1000:.1f}ms precompiled={precompiled * 1000:.1f}ms cached={cached * 1000:.1f}ms"
+        )
+        assert precompiled < legacy
+        assert cached < precompiled
@@ -0,0 +1,83 @@
+"""Tests for DiagralCommandQueue in commands.py (Tier 2)."""
+import asyncio
+
+from custom_components.diagral.commands import DiagralCommandQueue
+
+
+class TestDiagralCommandQueue:
+    """Tests for DiagralCommandQueue."""
+
+    async def test_commands_run_in_order(self):
+        """Commands must run one at a time, in submission order."""
+        queue = DiagralCommandQueue()
+        order: list[str] = []
+
+        def command(name: str):
+            async def run() -> None:
+                order.append(f"{name}-start")
+                await asyncio.sleep(0.01)
+                order.append(f"{name}-end")
+
+            return run
+
+        await asyncio.gather(queue.async_run(command("a")), queue.async_run(command("b")))
+        assert order == ["a-start", "a-end", "b-start", "b-end"]
+        assert queue.as_dict()["max_depth"] == 2
+        assert queue.as_dict()["depth"] == 0
+
+    async def test_waiting_command_is_superseded(self):
+        """Only the last waiting command of a key must run."""
+        queue = DiagralCommandQueue()
+        release = asyncio.Event()
+        ran: list[str] = []
+
+        async def blocking() -> None:
+            await release.wait()
+
+        def command(name: str):
+            async def run() -> None:
+                ran.append(name)
+
+            return run
+
+        running = asyncio.create_task(queue.async_run(blocking))
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.create_task(queue.async_run(command(name), key="mode"))
+            for name in ("arm", "disarm")
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(running, *waiting)
+        assert results == [True, False, True]
+        assert ran == ["disarm"]
+        assert queue.as_dict()["superseded"] == 1
+
+    async def test_commands_without_key_are_not_coalesced(self):
+        """Commands without key must all run."""
+        queue = DiagralCommandQueue()
+        ran: list[int] = []
+
+        def command(index: int):
+            async def run() -> None:
+                ran.append(index)
+
+            return run
+
+        await asyncio.gather(*(queue.async_run(command(index)) for index in range(3)))
+        assert ran == [0, 1, 2]
+        assert queue.as_dict()["executed"] == 3
+
+    async def test_wait_time_is_recorded(self):
+        """The time spent waiting behind another command must be recorded."""
+        queue = DiagralCommandQueue()
+
+        async def slow() -> None:
+            await asyncio.sleep(0.02)
+
+        async def fast() -> None:
+            return None
+
+        await asyncio.gather(queue.async_run(slow), queue.async_run(fast))
+        assert queue.as_dict()["last_wait"] >= 0.01
+        assert queue.as_dict()["max_wait"] >= queue.as_dict()["last_wait"]
@@ -0,0 +1,64 @@
+"""Tests for DiagralCommandConfirmations in confirmation.py (Tier 2)."""
+import asyncio
+
+from pydiagral.models import SystemStatus
+
+from custom_components.diagral.confirmation import DiagralCommandConfirmations
+
+
+def is_off(status: SystemStatus) -> bool:
+    """Return whether the alarm is disarmed."""
+    return status.status == "OFF"
+
+
+class TestDiagralCommandConfirmations:
+    """Tests for DiagralCommandConfirmations."""
+
+    async def test_matching_status_confirms_command(self):
+        """A status reaching the expected one must confirm the waiter."""
+        confirmations = DiagralCommandConfirmations()
+        waiter = confirmations.expect("stop_system", is_off)
+        confirmations.resolve(SystemStatus(status="GROUP", activated_groups=[1]))
+        assert not waiter.done
+        confirmations.resolve(SystemStatus(status="OFF", activated_groups=[]))
+        assert waiter.confirmed
+        assert await confirmations.wait(waiter, 1) is True
+        stats = confirmations.as_dict()
+        assert stats["pending"] == 0
+        assert stats["commands"]["stop_system"]["confirmed"] == 1
+
+    async def test_wait_times_out_without_expiring(self):
+        """A timeout must leave the waiter pending until expired."""
+        confirmations = DiagralCommandConfirmations()
+        waiter = confirmations.expect("stop_system", is_off)
+        assert await confirmations.wait(waiter, 0.01) is False
+        assert not waiter.done
+        confirmations.expire(waiter)
+        assert waiter.done and not waiter.confirmed
+        assert confirmations.as_dict()["commands"]["stop_system"]["expired"] == 1
+
+    async def test_waiter_resolved_while_waiting(self):
+        """A waiting command must be released as soon as it is confirmed."""
+        confirmations = DiagralCommandConfirmations()
+        waiter = confirmations.expect("stop_system", is_off)
+        asyncio.get_running_loop().call_soon(
+            confirmations.resolve, SystemStatus(status="OFF", activated_groups=[])
+        )
+        assert await confirmations.wait(waiter, 1) is True
+
+    async def test_expire_after_confirmation_is_ignored(self):
+        """Expiring a confirmed command must not count it as expired."""
+        confirmations = DiagralCommandConfirmations()
+        waiter = confirmations.expect("stop_system", is_off)
+        confirmations.resolve(SystemStatus(status="OFF", activated_groups=[]))
+        confirmations.expire(waiter)
+        assert confirmations.as_dict()["commands"]["stop_system"]["expired"] == 0
+
+    async def test_discarded_command_is_forgotten(self):
+        """A command that could not be sent must not be resolved later."""
+        confirmations = DiagralCommandConfirmations()
+        waiter = confirmations.expect("stop_system", is_off)
+        confirmations.discard(waiter)
+        confirmations.resolve(SystemStatus(status="OFF", activated_groups=[]))
+        assert waiter.future.cancelled()
+        assert confirmations.as_dict() == {"pending": 0, "commands": {}}
@@ -58,6 +58,23 @@ class TestScanInterval:
         assert isinstance(const.DEFAULT_SCAN_INTERVAL, int)
         assert const.DEFAULT_SCAN_INTERVAL > 0
 
+    def test_api_call_timeout(self, const):
+        """API_CALL_TIMEOUT must be positive and shorter than the scan interval."""
+        assert const.API_CALL_TIMEOUT > 0
+        assert const.API_CALL_TIMEOUT < const.DEFAULT_SCAN_INTERVAL
+
+    def test_webhook_scan_interval(self, const):
+        """WEBHOOK_SCAN_INTERVAL must be slower than the default scan interval."""
+        assert const.WEBHOOK_SCAN_INTERVAL > const.DEFAULT_SCAN_INTERVAL
+
+    def test_webhook_silence_threshold(self, const):
+        """WEBHOOK_SILENCE_THRESHOLD must span several slow polls."""
+        assert const.WEBHOOK_SILENCE_THRESHOLD > const.WEBHOOK_SCAN_INTERVAL
+
+    def test_static_data_ttl(self, const):
+        """STATIC_DATA_TTL must be longer than the scan interval."""
+        assert const.STATIC_DATA_TTL > const.DEFAULT_SCAN_INTERVAL
+
 
 class TestHaCloudDomain:
     """Tests for HA_CLOUD_DOMAIN."""
@@ -110,6 +127,18 @@ class TestServiceNames:
         assert isinstance(const.SERVICE_UNREGISTER_WEBHOOK, str)
         assert len(const.SERVICE_UNREGISTER_WEBHOOK) > 0
 
+    def test_service_refresh_configuration(self, const):
+        """SERVICE_REFRESH_CONFIGURATION must be a non-empty string."""
+        assert isinstance(const.SERVICE_REFRESH_CONFIGURATION, str)
+        assert len(const.SERVICE_REFRESH_CONFIGURATION) > 0
+
+    def test_signal_webhook_event_is_scoped_to_entry(self, const):
+        """SIGNAL_WEBHOOK_EVENT must differ per config entry."""
+        first = const.SIGNAL_WEBHOOK_EVENT.format(entry_id="entry1", alarm_type="ALERT")
+        second = const.SIGNAL_WEBHOOK_EVENT.format(entry_id="entry2", alarm_type="ALERT")
+        assert first != second
+        assert first.startswith(f"signal-{const.DOMAIN}-webhook-")
+
 
 class TestConfKeys:
     """Tests for CONF_* key constants."""
@@ -0,0 +1,615 @@
+"""Tests for the fetch logic of DiagralDataUpdateCoordinator (Tier 2).
+
+Uses a stubbed DiagralAPI with injected latency to compare the calls in flight
+of the sequential and concurrent fetch modes without any network access.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+import time
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from pydiagral.exceptions import DiagralAPIError
+from pydiagral.models import DeviceList, SystemStatus, WebHookNotification, WebHookNotificationDetail
+
+from custom_components.diagral.const import (
+    DEFAULT_SCAN_INTERVAL,
+    REFRESH_COALESCE_WINDOW,
+    SCAN_INTERVAL_REASON_NO_WEBHOOK,
+    SCAN_INTERVAL_REASON_WEBHOOK_ACTIVE,
+    SCAN_INTERVAL_REASON_WEBHOOK_SILENT,
+    WEBHOOK_SCAN_INTERVAL,
+    WEBHOOK_SILENCE_THRESHOLD,
+)
+from custom_components.diagral.coordinator import (
+    DiagralDataUpdateCoordinator,
+    patch_system_status,
+)
+
+# Simulated round trip of a single Diagral cloud call (seconds)
+API_LATENCY = 0.05
+
+
+class StubDiagralAPI:
+    """Stubbed DiagralAPI that sleeps before answering each call."""
+
+    def __init__(self, latency: float = API_LATENCY, fail_on: str | None = None) -> None:
+        """Initialize the stub with a per-call latency."""
+        self.latency = latency
+        self.fail_on = fail_on
+        self.cancelled: list[str] = []
+        self.alarm_config = MagicMock()
+        self.system_status = MagicMock()
+        self.anomalies = MagicMock()
+        self.devices_infos = DeviceList(cameras=[], commands=[], sensors=[], sirens=[], transmitters=[])
+        self.calls: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _call(self, name: str, result):
+        """Simulate a cloud round trip."""
+        self.calls.append(name)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if name == self.fail_on:
+                raise RuntimeError(f"{name} failed")
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+        finally:
+            self.in_flight -= 1
+        return result
+
+    async def get_configuration(self):
+        """Return the stubbed configuration."""
+        return await self._call("configuration", self.alarm_config)
+
+    async def get_system_status(self):
+        """Return the stubbed system status."""
+        return await self._call("system_status", self.system_status)
+
+    async def get_anomalies(self):
+        """Return the stubbed anomalies."""
+        return await self._call("anomalies", self.anomalies)
+
+    async def get_devices_info(self):
+        """Return the devices derived from the cached configuration."""
+        return self.devices_infos
+
+
+def make_coordinator(api: StubDiagralAPI, concurrent_fetch: bool) -> DiagralDataUpdateCoordinator:
+    """Return a coordinator set up with a mocked Home Assistant."""
+    coordinator = DiagralDataUpdateCoordinator(MagicMock(), api, concurrent_fetch=concurrent_fetch)
+    # Device registry updates are not under test
+    coordinator._update_device_info = AsyncMock()
+    return coordinator
+
+
+def all_calls(api: StubDiagralAPI) -> dict:
+    """Return the calls of a full (static + volatile) fetch."""
+    return {
+        "alarm_config": api.get_configuration,
+        "system_status": api.get_system_status,
+        "anomalies": api.get_anomalies,
+    }
+
+
+class TestFetchAll:
+    """Tests for _async_fetch_all()."""
+
+    async def test_results_are_returned_by_name(self):
+        """Both modes must return each result under its call name."""
+        api = StubDiagralAPI(latency=0)
+        for concurrent in (False, True):
+            result = await make_coordinator(api, concurrent)._async_fetch_all(all_calls(api))
+            assert result == {
+                "alarm_config": api.alarm_config,
+                "system_status": api.system_status,
+                "anomalies": api.anomalies,
+            }
+
+    async def test_failure_cancels_pending_calls(self):
+        """A failing call must cancel the other in-flight calls."""
+        api = StubDiagralAPI(fail_on="system_status")
+        with pytest.raises(RuntimeError):
+            await make_coordinator(api, True)._async_fetch_all(all_calls(api))
+        assert sorted(api.cancelled) == ["anomalies", "configuration"]
+
+    async def test_timeout_raises_update_failed(self, monkeypatch):
+        """A call exceeding API_CALL_TIMEOUT must raise UpdateFailed."""
+        monkeypatch.setattr("custom_components.diagral.coordinator.API_CALL_TIMEOUT", 0.01)
+        api = StubDiagralAPI(latency=1)
+        with pytest.raises(UpdateFailed):
+            await make_coordinator(api, True)._async_fetch_all(all_calls(api))
+
+
+class TestTieredRefresh:
+    """Tests for the static/volatile refresh tiers of _async_update_data()."""
+
+    async def test_first_update_fetches_static_tier(self):
+        """The first update must fetch configuration, status and anomalies."""
+        api = StubDiagralAPI(latency=0)
+        coordinator = make_coordinator(api, True)
+        data = await coordinator._async_update_data()
+        assert sorted(api.calls) == ["anomalies", "configuration", "system_status"]
+        assert data["alarm_config"] is api.alarm_config
+        assert data["devices_infos"] is api.devices_infos
+        coordinator._update_device_info.assert_awaited_once()
+
+    async def test_next_update_fetches_volatile_tier_only(self):
+        """While the static tier is fresh, only status and anomalies are fetched."""
+        api = StubDiagralAPI(latency=0)
+        coordinator = make_coordinator(api, True)
+        await coordinator._async_update_data()
+        api.calls.clear()
+        data = await coordinator._async_update_data()
+        assert sorted(api.calls) == ["anomalies", "system_status"]
+        assert data["alarm_config"] is api.alarm_config
+
+    async def test_expired_ttl_fetches_static_tier(self, monkeypatch):
+        """Once STATIC_DATA_TTL has elapsed, the configuration is fetched again."""
+        monkeypatch.setattr("custom_components.diagral.coordinator.STATIC_DATA_TTL", 0)
+        api = StubDiagralAPI(latency=0)
+        coordinator = make_coordinator(api, True)
+        await coordinator._async_update_data()
+        api.calls.clear()
+        await coordinator._async_update_data()
+        assert "configuration" in api.calls
+
+    async def test_invalidation_fetches_static_tier(self):
+        """async_invalidate_static_data() must force a configuration fetch once."""
+        api = StubDiagralAPI(latency=0)
+        coordinator = make_coordinator(api, True)
+        await coordinator._async_update_data()
+        coordinator.async_invalidate_static_data("test")
+        api.calls.clear()
+        await coordinator._async_update_data()
+        assert "configuration" in api.calls
+        api.calls.clear()
+        await coordinator._async_update_data()
+        assert "configuration" not in api.calls
+
+
+def make_status_notification(
+    alarm_code: str, group_index: str, date_time: datetime = datetime(2024, 1, 1, tzinfo=timezone.utc)
+) -> WebHookNotification:
+    """Build a STATUS WebHookNotification."""
+    return WebHookNotification(
+        transmitter_id="TX001",
+        alarm_type="STATUS",
+        alarm_code=alarm_code,
+        alarm_description="Test status",
+        group_index=group_index,
+        detail=WebHookNotificationDetail(device_type=None, device_index=None),
+        user=None,
+        date_time=date_time,
+    )
+
+
+class TestPatchSystemStatus:
+    """Tests for patch_system_status()."""
+
+    def test_arming_from_off_activates_group(self):
+        """Arming a group while disarmed must switch to GROUP with this group."""
+        status = SystemStatus(status="OFF", activated_groups=[])
+        result = patch_system_status(status, make_status_notification("3401", "2"))
+        assert result == SystemStatus(status="GROUP", activated_groups=[2])
+
+    def test_arming_adds_to_active_groups(self):
+        """Arming a group while other groups are armed must keep them."""
+        status = SystemStatus(status="GROUP", activated_groups=[1])
+        result = patch_system_status(status, make_status_notification("3407", "3"))
+        assert result == SystemStatus(status="GROUP", activated_groups=[1, 3])
+
+    def test_disarming_last_group_switches_off(self):
+        """Disarming the last active group must switch to OFF."""
+        status = SystemStatus(status="GROUP", activated_groups=[2])
+        result = patch_system_status(status, make_status_notification("1401", "2"))
+        assert result == SystemStatus(status="OFF", activated_groups=[])
+
+    def test_disarming_one_group_keeps_others(self):
+        """Disarming one group must keep the other active groups."""
+        status = SystemStatus(status="GROUP", activated_groups=[1, 2])
+        result = patch_system_status(status, make_status_notification("1407", "1"))
+        assert result == SystemStatus(status="GROUP", activated_groups=[2])
+
+    def test_non_numeric_group_index_is_not_applicable(self):
+        """A group index such as NIGHT_MODE_GROUP_CODE cannot be applied."""
+        status = SystemStatus(status="OFF", activated_groups=[])
+        assert patch_system_status(status, make_status_notification("3401", "NIGHT_MODE_GROUP_CODE")) is None
+
+    def test_unknown_status_code_is_not_applicable(self):
+        """Codes other than arming/disarming cannot be applied."""
+        status = SystemStatus(status="OFF", activated_groups=[])
+        assert patch_system_status(status, make_status_notification("1306", "1")) is None
+
+    def test_tempo_group_is_not_applicable(self):
+        """Arming a group during TEMPO_GROUP must not drop the other groups."""
+        status = SystemStatus(status="TEMPO_GROUP", activated_groups=[1, 2])
+        assert patch_system_status(status, make_status_notification("3401", "3")) is None
+
+    def test_presence_is_not_applicable(self):
+        """Group notifications during PRESENCE must not switch to GROUP or OFF."""
+        status = SystemStatus(status="PRESENCE", activated_groups=[])
+        assert patch_system_status(status, make_status_notification("3401", "2")) is None
+        assert patch_system_status(status, make_status_notification("1401", "2")) is None
+
+    def test_unknown_current_status_is_not_applicable(self):
+        """Without a current status, the other groups are unknown."""
+        assert patch_system_status(None, make_status_notification("3401", "2")) is None
+
+
+class TestApplyStatusNotification:
+    """Tests for async_apply_status_notification()."""
+
+    def test_applicable_notification_pushes_patched_status(self):
+        """An applicable notification must push data without refreshing."""
+        coordinator = make_coordinator(StubDiagralAPI(latency=0), True)
+        coordinator.data = {"system_status": SystemStatus(status="OFF", activated_groups=[]), "groups": []}
+        coordinator.async_set_updated_data = MagicMock()
+        assert coordinator.async_apply_status_notification(make_status_notification("3401", "1")) is True
+        pushed = coordinator.async_set_updated_data.call_args.args[0]
+        assert pushed["system_status"] == SystemStatus(status="GROUP", activated_groups=[1])
+        assert pushed["groups"] == []
+
+    def test_unapplicable_notification_returns_false(self):
+        """A notification that cannot be applied must not push any data."""
+        coordinator = make_coordinator(StubDiagralAPI(latency=0), True)
+        coordinator.data = {"system_status": SystemStatus(status="OFF", activated_groups=[])}
+        coordinator.async_set_updated_data = MagicMock()
+        assert coordinator.async_apply_status_notification(make_status_notification("1306", "1")) is False
+        coordinator.async_set_updated_data.assert_not_called()
+
+    def test_out_of_order_notification_is_dropped(self):
+        """A notification older than the last applied one must not overwrite the status."""
+        coordinator = make_coordinator(StubDiagralAPI(latency=0), True)
+        coordinator.data = {"system_status": SystemStatus(status="OFF", activated_groups=[])}
+        coordinator.async_set_updated_data = MagicMock()
+        newer = make_status_notification("3401", "1", datetime(2024, 1, 1, 0, 0, 5, tzinfo=timezone.utc))
+        older = make_status_notification("1401", "1", datetime(2024, 1, 1, tzinfo=timezone.utc))
+        assert coordinator.async_apply_status_notification(newer) is True
+        assert coordinator.async_apply_status_notification(older) is True
+        coordinator.async_set_updated_data.assert_called_once()
+
+    async def test_poll_keeps_status_applied_while_in_flight(self):
+        """A poll started before a webhook was applied must keep the webhook status."""
+        api = StubDiagralAPI(latency=0.05)
+        coordinator = make_coordinator(api, True)
+        await coordinator._async_update_data()
+        webhook_status = SystemStatus(status="GROUP", activated_groups=[1])
+
+        async def apply_webhook():
+            await asyncio.sleep(0.01)
+            coordinator.data = {**coordinator.data, "system_status": webhook_status}
+            coordinator._status_applied_at = time.monotonic()
+
+        data, _ = await asyncio.gather(coordinator._async_update_data(), apply_webhook())
+        assert data["system_status"] is webhook_status
+
+    async def test_poll_after_webhook_uses_polled_status(self):
+        """A poll started after the webhook was applied must use the polled status."""
+        api = StubDiagralAPI(latency=0)
+        coordinator = make_coordinator(api, True)
+        await coordinator._async_update_data()
+        coordinator._status_applied_at = time.monotonic()
+        await asyncio.sleep(0.001)
+        data = await coordinator._async_update_data()
+        assert data["system_status"] is api.system_status
+
+    async def test_refresh_status_fetches_status_only(self):
+        """A status refresh must call get_system_status only."""
+        api = StubDiagralAPI(latency=0)
+        coordinator = make_coordinator(api, True)
+        coordinator.data = {"system_status": None}
+        coordinator.async_set_updated_data = MagicMock()
+        await coordinator.async_refresh_status()
+        assert api.calls == ["system_status"]
+        assert coordinator.async_set_updated_data.call_args.args[0]["system_status"] is api.system_status
+        assert coordinator._status_applied_at is not None
+
+    async def test_unconfirmed_command_fetches_status(self):
+        """A command left unconfirmed must fetch the status, then expire."""
+        api = StubDiagralAPI(latency=0)
+        coordinator = make_coordinator(api, True)
+        coordinator.confirmation_timeout = 0.01
+        coordinator.data = {"system_status": SystemStatus(status="OFF", activated_groups=[])}
+        coordinator.async_set_updated_data = MagicMock()
+        waiter = coordinator.confirmations.expect("start_system", lambda status: status.status == "GROUP")
+        await coordinator._async_confirm(waiter)
+        assert api.calls == ["system_status"]
+        assert waiter.done and not waiter.confirmed
+
+    async def test_confirmed_command_skips_status_fetch(self):
+        """A command confirmed by a status update must not call the API."""
+        api = StubDiagralAPI(latency=0)
+        coordinator = make_coordinator(api, True)
+        waiter = coordinator.confirmations.expect("stop_system", lambda status: status.status == "OFF")
+        asyncio.get_running_loop().call_soon(
+            coordinator.confirmations.resolve, SystemStatus(status="OFF", activated_groups=[])
+        )
+        await coordinator._async_confirm(waiter)
+        assert api.calls == []
+        assert waiter.confirmed
+
+    async def test_failed_command_discards_waiter(self):
+        """A command rejected by the API must not leave its waiter pending."""
+        api = StubDiagralAPI(latency=0)
+        api.start_system = AsyncMock(side_effect=DiagralAPIError("boom"))
+        coordinator = make_coordinator(api, True)
+        coordinator.async_track_confirmation = MagicMock()
+        waiter = coordinator.confirmations.expect("start_system", lambda status: True)
+        with pytest.raises(DiagralAPIError):
+            await coordinator.async_send_command(waiter)
+        assert waiter.future.cancelled()
+        coordinator.async_track_confirmation.assert_not_called()
+
+    async def test_timed_out_command_raises_api_error(self, monkeypatch):
+        """A command exceeding API_CALL_TIMEOUT must fail like an API error."""
+        monkeypatch.setattr("custom_components.diagral.coordinator.API_CALL_TIMEOUT", 0.01)
+        api = StubDiagralAPI(latency=0)
+
+        async def hanging_command():
+            await asyncio.sleep(1)
+
+        api.start_system = hanging_command
+        coordinator = make_coordinator(api, True)
+        waiter = coordinator.confirmations.expect("start_system", lambda status: True)
+        with pytest.raises(DiagralAPIError):
+            await coordinator.async_send_command(waiter)
+        assert waiter.future.cancelled()
+        assert coordinator.confirmations.as_dict()["pending"] == 0
+
+    async def test_unexpected_error_discards_waiter(self):
+        """Any error raised by the command must not leave its waiter pending."""
+        api = StubDiagralAPI(latency=0)
+        api.start_system = AsyncMock(side_effect=RuntimeError("boom"))
+        coordinator = make_coordinator(api, True)
+        waiter = coordinator.confirmations.expect("start_system", lambda status: True)
+        with pytest.raises(RuntimeError):
+            await coordinator.async_send_command(waiter)
+        assert waiter.future.cancelled()
+        assert coordinator.confirmations.as_dict()["pending"] == 0
+
+    def test_confirmation_timeout_is_configurable(self):
+        """The confirmation deadline must be set by the constructor."""
+        coordinator = DiagralDataUpdateCoordinator(MagicMock(), StubDiagralAPI(), confirmation_timeout=5)
+        assert coordinator.confirmation_timeout == 5
+
+    async def test_refresh_anomalies_fetches_anomalies_only(self):
+        """An anomaly refresh must call get_anomalies only."""
+        api = StubDiagralAPI(latency=0)
+        coordinator = make_coordinator(api, True)
+        coordinator.data = {"anomalies": None}
+        coordinator.async_set_updated_data = MagicMock()
+        await coordinator.async_refresh_anomalies()
+        assert api.calls == ["anomalies"]
+        assert coordinator.async_set_updated_data.call_args.args[0]["anomalies"] is api.anomalies
+
+
+class TestScopedListeners:
+    """Tests for the key-scoped async_update_listeners()."""
+
+    def _coordinator_with_listeners(self) -> tuple[DiagralDataUpdateCoordinator, dict[str, MagicMock]]:
+        """Return a coordinator with one listener per scope."""
+        coordinator = make_coordinator(StubDiagralAPI(latency=0), True)
+        listeners = {
+            "status": MagicMock(),
+            "anomalies": MagicMock(),
+            "unscoped": MagicMock(),
+        }
+        coordinator._listeners = {
+            MagicMock(): (listeners["status"], frozenset({"system_status"})),
+            MagicMock(): (listeners["anomalies"], frozenset({"anomalies", "groups"})),
+            MagicMock(): (listeners["unscoped"], None),
+        }
+        return coordinator, listeners
+
+    def _notify(self, coordinator: DiagralDataUpdateCoordinator, listeners: dict[str, MagicMock], data: dict) -> set[str]:
+        """Push data and return the names of the notified listeners."""
+        for listener in listeners.values():
+            listener.reset_mock()
+        coordinator.data = data
+        coordinator.async_update_listeners()
+        return {name for name, listener in listeners.items() if listener.called}
+
+    async def test_status_update_confirms_pending_command(self):
+        """A status pushed to the listeners must first resolve the pending commands."""
+        coordinator, listeners = self._coordinator_with_listeners()
+        waiter = coordinator.confirmations.expect("stop_system", lambda status: status.status == "OFF")
+        seen: list[bool] = []
+        listeners["status"].side_effect = lambda: seen.append(waiter.confirmed)
+        self._notify(coordinator, listeners, {"system_status": SystemStatus(status="OFF", activated_groups=[])})
+        assert seen == [True]
+
+    def test_first_update_notifies_everyone(self):
+        """The first data must be pushed to every listener."""
+        coordinator, listeners = self._coordinator_with_listeners()
+        data = {"system_status": SystemStatus(status="OFF", activated_groups=[]), "anomalies": None, "groups": []}
+        assert self._notify(coordinator, listeners, data) == {"status", "anomalies", "unscoped"}
+
+    def test_unchanged_data_only_notifies_unscoped(self):
+        """An identical poll must not wake scoped listeners."""
+        coordinator, listeners = self._coordinator_with_listeners()
+        data = {"system_status": SystemStatus(status="OFF", activated_groups=[]), "anomalies": None, "groups": []}
+        self._notify(coordinator, listeners, data)
+        # Equal but distinct objects, as returned by a new poll
+        same = {"system_status": SystemStatus(status="OFF", activated_groups=[]), "anomalies": None, "groups": []}
+        assert self._notify(coordinator, listeners, same) == {"unscoped"}
+
+    def test_changed_key_notifies_subscribed_listeners(self):
+        """A status change must only wake listeners subscribed to system_status."""
+        coordinator, listeners = self._coordinator_with_listeners()
+        data = {"system_status": SystemStatus(status="OFF", activated_groups=[]), "anomalies": None, "groups": []}
+        self._notify(coordinator, listeners, data)
+        changed = {**data, "system_status": SystemStatus(status="GROUP", activated_groups=[1])}
+        assert self._notify(coordinator, listeners, changed) == {"status", "unscoped"}
+
+    def test_availability_change_notifies_everyone(self):
+        """A failed update must wake every listener to refresh availability."""
+        coordinator, listeners = self._coordinator_with_listeners()
+        data = {"system_status": SystemStatus(status="OFF", activated_groups=[]), "anomalies": None, "groups": []}
+        self._notify(coordinator, listeners, data)
+        coordinator.last_update_success = False
+        assert self._notify(coordinator, listeners, data) == {"status", "anomalies", "unscoped"}
+
+
+class TestSnapshot:
+    """Tests for the snapshot restore and save."""
+
+    async def test_restore_snapshot_marks_data_stale(self):
+        """Restored data must be flagged as stale until the live refresh."""
+        coordinator = make_coordinator(StubDiagralAPI(latency=0), True)
+        snapshot = {"system_status": SystemStatus(status="OFF", activated_groups=[])}
+        coordinator.store = MagicMock(async_load=AsyncMock(return_value=snapshot))
+        assert await coordinator.async_restore_snapshot() is True
+        assert coordinator.data is snapshot
+        assert coordinator.stale is True
+        await coordinator._async_update_data()
+        assert coordinator.stale is False
+
+    async def test_restore_without_snapshot_returns_false(self):
+        """Without snapshot, the regular first refresh must be used."""
+        coordinator = make_coordinator(StubDiagralAPI(latency=0), True)
+        coordinator.store = MagicMock(async_load=AsyncMock(return_value=None))
+        assert await coordinator.async_restore_snapshot() is False
+        assert coordinator.stale is False
+
+    def test_changed_live_data_is_saved(self):
+        """Live data must be saved when it changed, stale data never."""
+        coordinator = make_coordinator(StubDiagralAPI(latency=0), True)
+        coordinator.store = MagicMock()
+        coordinator.data = {"system_status": SystemStatus(status="OFF", activated_groups=[])}
+        coordinator.async_update_listeners()
+        coordinator.store.async_save.assert_called_once_with(coordinator.data)
+        coordinator.store.async_save.reset_mock()
+        coordinator.data = dict(coordinator.data)
+        coordinator.async_update_listeners()
+        coordinator.store.async_save.assert_not_called()
+        coordinator.stale = True
+        coordinator.data = {"system_status": SystemStatus(status="GROUP", activated_groups=[1])}
+        coordinator.async_update_listeners()
+        coordinator.store.async_save.assert_not_called()
+
+
+class TestCoalescedRefresh:
+    """Tests for the refresh requests merged by the debouncer."""
+
+    async def test_burst_is_absorbed_by_one_fetch(self):
+        """Requests made within the window must be counted on the next fetch."""
+        api = StubDiagralAPI(latency=0)
+        coordinator = make_coordinator(api, True)
+        with patch.object(coordinator._debounced_refresh, "async_call") as debounced:
+            for _ in range(3):
+                await coordinator.async_request_refresh()
+        assert debounced.await_count == 3
+        await coordinator._async_update_data()
+        assert coordinator.refresh_requests == 3
+        assert coordinator.coalesced_fetches == 1
+        assert coordinator.last_absorbed_requests == 3
+        assert coordinator.max_absorbed_requests == 3
+
+    def test_first_request_is_not_delayed(self):
+        """The first request must be fetched at once, the burst after it merged."""
+        coordinator = make_coordinator(StubDiagralAPI(latency=0), True)
+        assert coordinator._debounced_refresh.immediate is True
+        assert coordinator._debounced_refresh.cooldown == REFRESH_COALESCE_WINDOW
+
+    async def test_scheduled_poll_is_not_counted(self):
+        """A poll without pending request must not count as a coalesced fetch."""
+        coordinator = make_coordinator(StubDiagralAPI(latency=0), True)
+        await coordinator._async_update_data()
+        assert coordinator.coalesced_fetches == 0
+
+    async def test_counters_reset_between_windows(self):
+        """Each fetch must only absorb the requests made since the previous one."""
+        coordinator = make_coordinator(StubDiagralAPI(latency=0), True)
+        with patch.object(coordinator._debounced_refresh, "async_call"):
+            for _ in range(4):
+                await coordinator.async_request_refresh()
+            await coordinator._async_update_data()
+            await coordinator.async_request_refresh()
+            await coordinator._async_update_data()
+        assert coordinator.coalesced_fetches == 2
+        assert coordinator.last_absorbed_requests == 1
+        assert coordinator.max_absorbed_requests == 4
+
+
+class TestAdaptiveUpdateInterval:
+    """Tests for the webhook-driven update interval."""
+
+    NOW = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+    def _coordinator_at(self, monkeypatch, now: datetime) -> DiagralDataUpdateCoordinator:
+        """Return a coordinator with dt_util.utcnow() frozen at the given time."""
+        monkeypatch.setattr("custom_components.diagral.coordinator.dt_util.utcnow", lambda: now)
+        return make_coordinator(StubDiagralAPI(latency=0), True)
+
+    def test_no_webhook_uses_default_interval(self, monkeypatch):
+        """Without webhook, the default (fast) interval must be used."""
+        coordinator = self._coordinator_at(monkeypatch, self.NOW)
+        coordinator.async_set_webhook_registered(False)
+        assert coordinator.update_interval == timedelta(seconds=DEFAULT_SCAN_INTERVAL)
+        assert coordinator.update_interval_reason == SCAN_INTERVAL_REASON_NO_WEBHOOK
+
+    def test_registered_webhook_slows_polling_down(self, monkeypatch):
+        """A freshly registered webhook must switch to the slow interval."""
+        coordinator = self._coordinator_at(monkeypatch, self.NOW)
+        coordinator.async_set_webhook_registered(True)
+        assert coordinator.update_interval == timedelta(seconds=WEBHOOK_SCAN_INTERVAL)
+        assert coordinator.update_interval_reason == SCAN_INTERVAL_REASON_WEBHOOK_ACTIVE
+
+    def test_silent_webhook_restores_default_interval(self, monkeypatch):
+        """A webhook silent for longer than the threshold must restore fast polling."""
+        coordinator = self._coordinator_at(monkeypatch, self.NOW)
+        coordinator.async_set_webhook_registered(True)
+        later = self.NOW + timedelta(seconds=WEBHOOK_SILENCE_THRESHOLD + 1)
+        monkeypatch.setattr("custom_components.diagral.coordinator.dt_util.utcnow", lambda: later)
+        coordinator._async_adapt_update_interval()
+        assert coordinator.update_interval == timedelta(seconds=DEFAULT_SCAN_INTERVAL)
+        assert coordinator.update_interval_reason == SCAN_INTERVAL_REASON_WEBHOOK_SILENT
+
+    def test_received_webhook_keeps_slow_polling(self, monkeypatch):
+        """A recent notification must keep the slow interval after the threshold."""
+        coordinator = self._coordinator_at(monkeypatch, self.NOW)
+        coordinator.async_set_webhook_registered(True)
+        later = self.NOW + timedelta(seconds=WEBHOOK_SILENCE_THRESHOLD + 1)
+        monkeypatch.setattr("custom_components.diagral.coordinator.dt_util.utcnow", lambda: later)
+        coordinator.async_webhook_received()
+        assert coordinator.update_interval == timedelta(seconds=WEBHOOK_SCAN_INTERVAL)
+        assert coordinator.update_interval_reason == SCAN_INTERVAL_REASON_WEBHOOK_ACTIVE
+
+
+class TestFetchConcurrency:
+    """Compare the calls in flight of the sequential and concurrent fetches."""
+
+    async def test_sequential_fetch_runs_one_call_at_a_time(self):
+        """Sequential fetch must wait for each call before the next one."""
+        api = StubDiagralAPI()
+        await make_coordinator(api, False)._async_fetch_all(all_calls(api))
+        assert api.max_in_flight == 1
+
+    async def test_concurrent_fetch_runs_all_calls_at_once(self):
+        """Concurrent fetch must have all the calls in flight together."""
+        api = StubDiagralAPI()
+        await make_coordinator(api, True)._async_fetch_all(all_calls(api))
+        assert api.max_in_flight == 3
+
+
+@pytest.mark.benchmark
+class TestFetchBenchmark:
+    """Benchmark sequential versus concurrent fetch with injected latency."""
+
+    async def test_concurrent_fetch_is_bounded_by_slowest_call(self):
+        """Concurrent fetch must take roughly one round trip instead of three."""
+        durations = {}
+        for concurrent in (False, True):
+            api = StubDiagralAPI()
+            start = time.perf_counter()
+            await make_coordinator(api, concurrent)._async_fetch_all(all_calls(api))
+            durations[concurrent] = time.perf_counter() - start
+        print(f"\nsequential={durations[False] * 1000:.1f}ms concurrent={durations[True] * 1000:.1f}ms")
+        assert durations[False] >= 3 * API_LATENCY
+        assert durations[True] < 2 * API_LATENCY
@@ -0,0 +1,44 @@
+"""Tests for DiagralWebhookDeduplicator in dedup.py (Tier 2).
+
+Time is patched to test the TTL without waiting.
+"""
+from unittest.mock import patch
+
+from custom_components.diagral.dedup import DiagralWebhookDeduplicator
+
+
+class TestDiagralWebhookDeduplicator:
+    """Tests for DiagralWebhookDeduplicator."""
+
+    def test_first_delivery_is_not_duplicate(self):
+        """A new notification must be processed."""
+        dedup = DiagralWebhookDeduplicator()
+        assert dedup.is_duplicate(("TX", "1130")) is False
+        assert dedup.as_dict() == {"hits": 0, "misses": 1, "size": 1}
+
+    def test_retried_delivery_is_duplicate(self):
+        """A notification delivered again must be dropped."""
+        dedup = DiagralWebhookDeduplicator()
+        dedup.is_duplicate(("TX", "1130"))
+        assert dedup.is_duplicate(("TX", "1130")) is True
+        assert dedup.is_duplicate(("TX", "3401")) is False
+        assert dedup.as_dict() == {"hits": 1, "misses": 2, "size": 2}
+
+    def test_expired_notification_is_not_duplicate(self):
+        """A notification older than the TTL must be processed again."""
+        dedup = DiagralWebhookDeduplicator(ttl=10)
+        with patch("custom_components.diagral.dedup.time.monotonic", return_value=100):
+            dedup.is_duplicate("key")
+        with patch("custom_components.diagral.dedup.time.monotonic", return_value=111):
+            assert dedup.is_duplicate("key") is False
+
+    def test_size_is_bounded(self):
+        """The least recently seen notification must be evicted first."""
+        dedup = DiagralWebhookDeduplicator(max_size=2)
+        dedup.is_duplicate("a")
+        dedup.is_duplicate("b")
+        dedup.is_duplicate("a")  # "a" becomes the most recently seen
+        dedup.is_duplicate("c")  # evicts "b"
+        assert dedup.as_dict()["size"] == 2
+        assert dedup.is_duplicate("a") is True
+        assert dedup.is_duplicate("b") is False
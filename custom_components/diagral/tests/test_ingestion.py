@@ -0,0 +1,117 @@
+"""Tests for DiagralWebhookQueue in ingestion.py (Tier 2).
+
+The worker is run as a plain asyncio task instead of a config entry
+background task. The enqueue latency benchmark runs with --benchmark.
+"""
+import asyncio
+import time
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.diagral.ingestion import DiagralWebhookQueue
+
+# Simulated duration of the processing of a notification (seconds)
+PROCESS_LATENCY = 0.02
+
+
+def start_worker(queue: DiagralWebhookQueue, process) -> asyncio.Task:
+    """Start the worker of the queue as a plain task."""
+    entry = MagicMock()
+    entry.async_create_background_task.side_effect = lambda hass, coro, name: asyncio.create_task(coro)
+    queue.async_start(MagicMock(), entry, process)
+    return entry.async_create_background_task.call_args.args[1]
+
+
+class TestDiagralWebhookQueue:
+    """Tests for DiagralWebhookQueue."""
+
+    @pytest.fixture
+    def processed(self):
+        """Return the list of processed notifications."""
+        return []
+
+    async def test_notifications_are_processed_in_order(self, processed):
+        """The worker must process the notifications in their arrival order."""
+        queue = DiagralWebhookQueue()
+
+        async def process(notification):
+            await asyncio.sleep(0)
+            processed.append(notification)
+
+        start_worker(queue, process)
+        for notification in ("a", "b", "c"):
+            queue.async_put(notification)
+        await queue.async_join()
+        assert processed == ["a", "b", "c"]
+        assert queue.as_dict() == {"depth": 0, "max_depth": 3, "dropped": 0, "processed": 3}
+
+    async def test_overflow_drops_oldest(self):
+        """A full queue must drop its oldest notification."""
+        queue = DiagralWebhookQueue(max_size=2)
+        for notification in ("a", "b", "c"):
+            queue.async_put(notification)
+        assert queue.as_dict() == {"depth": 2, "max_depth": 2, "dropped": 1, "processed": 0}
+        assert queue._queue.get_nowait() == "b"
+
+    async def test_error_does_not_stop_worker(self, processed):
+        """A failing notification must not stop the processing of the next ones."""
+        queue = DiagralWebhookQueue()
+
+        async def process(notification):
+            if notification == "bad":
+                raise ValueError("invalid alarm code")
+            processed.append(notification)
+
+        start_worker(queue, process)
+        queue.async_put("bad")
+        queue.async_put("good")
+        await queue.async_join()
+        assert processed == ["good"]
+        assert queue.processed == 2
+
+
+class TestIngestionBurst:
+    """Check the enqueue of a burst of notifications."""
+
+    async def test_enqueue_does_not_wait_for_processing(self):
+        """Enqueuing a burst must return before any notification is processed."""
+        queue = DiagralWebhookQueue()
+        processed = []
+
+        async def process(notification):
+            await asyncio.sleep(PROCESS_LATENCY)
+            processed.append(notification)
+
+        start_worker(queue, process)
+        for notification in range(20):
+            queue.async_put(notification)
+        assert processed == []
+        assert queue.max_depth == 20
+        await queue.async_join()
+        assert processed == list(range(20))
+
+
+@pytest.mark.benchmark
+class TestIngestionBenchmark:
+    """Benchmark the enqueue latency under a burst of notifications."""
+
+    async def test_enqueue_does_not_wait_for_processing(self):
+        """Enqueuing a burst must not wait for the slow processing."""
+        queue = DiagralWebhookQueue()
+
+        async def process(notification):
+            await asyncio.sleep(PROCESS_LATENCY)
+
+        start_worker(queue, process)
+        start = time.perf_counter()
+        for notification in range(20):
+            queue.async_put(notification)
+        enqueue = time.perf_counter() - start
+        await queue.async_join()
+        total = time.perf_counter() - start
+
+        print(f"\nenqueue={enqueue * 1000:.2f}ms processing={total * 1000:.1f}ms")
+        assert enqueue < PROCESS_LATENCY
+        assert total >= 20 * PROCESS_LATENCY
@@ -0,0 +1,166 @@
+"""Tests for the webhook lifecycle of the Diagral integration (Tier 2).
+
+Tests async_provision_webhook() without waiting for the real backoff delays
+and register_webhook() with mocked Home Assistant and Diagral cloud calls.
+"""
+import sys
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from homeassistant.helpers.network import NoURLAvailableError
+from pydiagral.exceptions import DiagralAPIError
+
+from custom_components.diagral import (
+    WebhookUnavailable,
+    async_provision_webhook,
+    register_webhook,
+)
+from custom_components.diagral.const import (
+    CONF_WEBHOOK_ID,
+    CONF_WEBHOOK_URL,
+    WEBHOOK_RETRY_INITIAL_DELAY,
+    WEBHOOK_RETRY_MAX_ATTEMPTS,
+    WEBHOOK_RETRY_MAX_DELAY,
+)
+
+
+def make_entry() -> MagicMock:
+    """Return a config entry whose webhook is not provisioned yet."""
+    entry = MagicMock()
+    entry.title = "Home"
+    entry.runtime_data.webhook_id = None
+    return entry
+
+
+async def provision(*results) -> tuple[str | None, MagicMock, AsyncMock, AsyncMock]:
+    """Run async_provision_webhook() with register_webhook() returning results."""
+    entry = make_entry()
+    register = AsyncMock(side_effect=results)
+    sleep = AsyncMock()
+    with (
+        patch("custom_components.diagral.register_webhook", register),
+        patch("custom_components.diagral.asyncio.sleep", sleep),
+    ):
+        webhook_id = await async_provision_webhook(MagicMock(), entry, MagicMock())
+    return webhook_id, entry, register, sleep
+
+
+class TestProvisionWebhook:
+    """Tests for async_provision_webhook()."""
+
+    async def test_first_attempt_success(self):
+        """A successful registration must be stored without any retry."""
+        webhook_id, entry, register, sleep = await provision("abc")
+        assert webhook_id == "abc"
+        assert entry.runtime_data.webhook_id == "abc"
+        entry.runtime_data.coordinator.async_set_webhook_registered.assert_called_once_with(True)
+        register.assert_awaited_once()
+        sleep.assert_not_awaited()
+
+    async def test_retry_with_backoff_until_success(self):
+        """Failed attempts must be retried with a doubling delay."""
+        webhook_id, entry, register, sleep = await provision(None, None, "abc")
+        assert webhook_id == "abc"
+        assert register.await_count == 3
+        assert [call.args[0] for call in sleep.await_args_list] == [
+            WEBHOOK_RETRY_INITIAL_DELAY,
+            WEBHOOK_RETRY_INITIAL_DELAY * 2,
+        ]
+
+    async def test_api_error_is_retried(self):
+        """A Diagral API error must not stop the provisioning."""
+        webhook_id, entry, register, sleep = await provision(DiagralAPIError("boom"), "abc")
+        assert webhook_id == "abc"
+        assert entry.runtime_data.webhook_id == "abc"
+
+    async def test_gives_up_after_max_attempts(self):
+        """The provisioning must stop after the maximum number of attempts."""
+        webhook_id, entry, register, sleep = await provision(*[None] * WEBHOOK_RETRY_MAX_ATTEMPTS)
+        assert webhook_id is None
+        assert entry.runtime_data.webhook_id is None
+        entry.runtime_data.coordinator.async_set_webhook_registered.assert_not_called()
+        assert register.await_count == WEBHOOK_RETRY_MAX_ATTEMPTS
+        delays = [call.args[0] for call in sleep.await_args_list]
+        assert len(delays) == WEBHOOK_RETRY_MAX_ATTEMPTS - 1
+        assert max(delays) == WEBHOOK_RETRY_MAX_DELAY
+
+    async def test_unavailable_webhook_is_not_retried(self):
+        """A webhook that cannot be created with the current setup must fail fast."""
+        webhook_id, entry, register, sleep = await provision(WebhookUnavailable("no URL"))
+        assert webhook_id is None
+        register.assert_awaited_once()
+        sleep.assert_not_awaited()
+
+
+EXTERNAL_URL = "https://home.example.com"
+
+
+async def register(data: dict, force: bool = False) -> tuple[str | None, MagicMock, AsyncMock, MagicMock]:
+    """Run register_webhook() for an entry with data and an external URL."""
+    hass = MagicMock()
+    entry = MagicMock()
+    entry.title = "Home"
+    entry.data = data
+    api = AsyncMock()
+    api.get_webhook.return_value = MagicMock(webhook_url=f"{EXTERNAL_URL}/api/webhook/old")
+    local_register = MagicMock()
+    with (
+        patch.dict(sys.modules, {"homeassistant.components.cloud": MagicMock()}),
+        patch("custom_components.diagral.get_url", return_value=EXTERNAL_URL),
+        patch("custom_components.diagral.async_register_webhook_handler", local_register),
+    ):
+        webhook_id = await register_webhook(hass, entry, api, "test", force=force)
+    return webhook_id, hass, api, local_register
+
+
+class TestRegisterWebhook:
+    """Tests for the reuse of the stored webhook in register_webhook()."""
+
+    async def test_new_webhook_is_stored(self):
+        """A first registration must call the cloud and store the webhook."""
+        webhook_id, hass, api, local_register = await register({})
+        api.update_webhook.assert_awaited_once()
+        data = hass.config_entries.async_update_entry.call_args.kwargs["data"]
+        assert data[CONF_WEBHOOK_ID] == webhook_id
+        assert data[CONF_WEBHOOK_URL] == f"{EXTERNAL_URL}/api/webhook/{webhook_id}"
+        local_register.assert_called_once()
+
+    async def test_unchanged_url_skips_cloud_calls(self):
+        """A stored webhook with the same URL must be reused without cloud calls."""
+        data = {CONF_WEBHOOK_ID: "abc", CONF_WEBHOOK_URL: f"{EXTERNAL_URL}/api/webhook/abc"}
+        webhook_id, hass, api, local_register = await register(data)
+        assert webhook_id == "abc"
+        api.get_webhook.assert_not_awaited()
+        api.update_webhook.assert_not_awaited()
+        api.register_webhook.assert_not_awaited()
+        hass.config_entries.async_update_entry.assert_not_called()
+        assert local_register.call_args.args[2] == "abc"
+
+    async def test_changed_url_updates_cloud(self):
+        """A stored webhook with another URL must be updated on the cloud."""
+        data = {CONF_WEBHOOK_ID: "abc", CONF_WEBHOOK_URL: "https://old.example.com/api/webhook/abc"}
+        webhook_id, hass, api, local_register = await register(data)
+        assert webhook_id == "abc"
+        api.update_webhook.assert_awaited_once()
+        assert hass.config_entries.async_update_entry.call_args.kwargs["data"][CONF_WEBHOOK_URL] == (
+            f"{EXTERNAL_URL}/api/webhook/abc"
+        )
+
+    async def test_force_updates_cloud(self):
+        """A forced registration must call the cloud even if the URL is unchanged."""
+        data = {CONF_WEBHOOK_ID: "abc", CONF_WEBHOOK_URL: f"{EXTERNAL_URL}/api/webhook/abc"}
+        webhook_id, hass, api, local_register = await register(data, force=True)
+        assert webhook_id == "abc"
+        api.update_webhook.assert_awaited_once()
+
+    async def test_no_url_raises_unavailable(self):
+        """Without an external URL, the webhook cannot be created."""
+        entry = MagicMock()
+        entry.data = {}
+        with (
+            patch.dict(sys.modules, {"homeassistant.components.cloud": MagicMock()}),
+            patch("custom_components.diagral.get_url", side_effect=NoURLAvailableError),
+            pytest.raises(WebhookUnavailable),
+        ):
+            await register_webhook(MagicMock(), entry, AsyncMock(), "test")
@@ -0,0 +1,116 @@
+"""Tests for DiagralLookupIndex in lookup.py (Tier 2).
+
+Tests the device and group lookups and checks them against the linear scans
+they replace on an install with hundreds of devices. The benchmark against
+these scans runs with --benchmark.
+"""
+import time
+
+import pytest
+from pydiagral.models import DeviceInfos, DeviceList, Group
+
+from custom_components.diagral.lookup import EMPTY_LOOKUP_INDEX, DiagralLookupIndex
+
+# Size of the simulated install (per device type)
+DEVICES_PER_TYPE = 200
+GROUPS = 8
+LOOKUPS = 5000
+
+
+def make_device_list(count: int) -> DeviceList:
+    """Build a DeviceList with count devices of each type."""
+    return DeviceList(
+        **{
+            name: [DeviceInfos(index=index, label=f"{name} {index}") for index in range(1, count + 1)]
+            for name in ("cameras", "commands", "sensors", "sirens", "transmitters")
+        }
+    )
+
+
+def make_groups(count: int) -> list[Group]:
+    """Build count groups."""
+    return [Group(index=index, name=f"Group {index}") for index in range(1, count + 1)]
+
+
+class TestDiagralLookupIndex:
+    """Tests for DiagralLookupIndex."""
+
+    def test_device_lookup_by_webhook_type(self):
+        """Devices must be found from the webhook device type and index."""
+        index = DiagralLookupIndex.build(make_device_list(3), [])
+        assert index.device("SENSOR", 2).label == "sensors 2"
+        assert index.device("siren", 3).label == "sirens 3"
+
+    def test_unknown_device_returns_none(self):
+        """Unknown device types and indexes must return None."""
+        index = DiagralLookupIndex.build(make_device_list(3), [])
+        assert index.device("sensor", 99) is None
+        assert index.device("unknowndevice", 1) is None
+
+    def test_group_lookup(self):
+        """Groups must be found from their index."""
+        index = DiagralLookupIndex.build(None, make_groups(3))
+        assert index.group(2).name == "Group 2"
+        assert index.group(9) is None
+
+    def test_none_device_lists_are_ignored(self):
+        """Device types without any device must not break the build."""
+        devices = DeviceList(sensors=[DeviceInfos(index=1, label="Door")])
+        index = DiagralLookupIndex.build(devices, None)
+        assert index.device("sensor", 1).label == "Door"
+        assert index.device_labels == {1: "Door"}
+
+    def test_empty_index(self):
+        """The empty index must not find anything."""
+        assert EMPTY_LOOKUP_INDEX.device("sensor", 1) is None
+        assert EMPTY_LOOKUP_INDEX.group(1) is None
+
+    def test_index_is_immutable(self):
+        """The mappings shared between consumers must be read-only."""
+        index = DiagralLookupIndex.build(make_device_list(1), make_groups(1))
+        with pytest.raises(TypeError):
+            index.groups[2] = Group(index=2, name="Group 2")
+
+
+class TestLookupLargeInstall:
+    """Check the index against the linear scans it replaces."""
+
+    def test_index_matches_linear_scan(self):
+        """Indexed lookups must return what the per-webhook linear scans found."""
+        devices_infos = make_device_list(DEVICES_PER_TYPE)
+        groups = make_groups(GROUPS)
+        index = DiagralLookupIndex.build(devices_infos, groups)
+        for target in range(1, DEVICES_PER_TYPE + 1):
+            assert index.device("SENSOR", target) is next(
+                info for info in devices_infos.sensors if info.index == target
+            )
+            assert index.group((target % GROUPS) + 1) is next(
+                group for group in groups if group.index == (target % GROUPS) + 1
+            )
+
+
+@pytest.mark.benchmark
+class TestLookupBenchmark:
+    """Benchmark the index against the linear scans it replaces."""
+
+    def test_index_is_faster_than_linear_scan(self):
+        """Indexed lookups must beat the per-webhook linear scans."""
+        devices_infos = make_device_list(DEVICES_PER_TYPE)
+        groups = make_groups(GROUPS)
+        targets = [(i % DEVICES_PER_TYPE) + 1 for i in range(LOOKUPS)]
+
+        start = time.perf_counter()
+        for target in targets:
+            next(info for info in getattr(devices_infos, "sensors") if info.index == target)
+            next(group for group in groups if group.index == (target % GROUPS) + 1)
+        linear = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = DiagralLookupIndex.build(devices_infos, groups)
+        for target in targets:
+            index.device("SENSOR", target)
+            index.group((target % GROUPS) + 1)
+        indexed = time.perf_counter() - start
+
+        print(f"\nlinear={linear * 1000:.1f}ms indexed={indexed * 1000:.1f}ms (build included)")
+        assert indexed < linear
@@ -7,14 +7,17 @@ from datetime import datetime, timezone
 
 import pytest
 from unittest.mock import MagicMock, patch
-from pydiagral.models import Anomalies, AnomalyDetail, AnomalyName, DeviceList
+from pydiagral.models import Anomalies, AnomalyDetail, AnomalyName, DeviceList, Group
 
+from custom_components.diagral.anomalies import DiagralAnomaliesRenderer
+from custom_components.diagral.lookup import DiagralLookupIndex
 from custom_components.diagral.sensor import DiagralSensor
 
 
 # An empty DeviceList with explicit empty lists to avoid iteration errors
 # (vars(MagicMock()) would contain non-iterable sentinel objects)
 EMPTY_DEVICE_LIST = DeviceList(cameras=[], commands=[], sensors=[], sirens=[], transmitters=[])
+EMPTY_LOOKUP_INDEX = DiagralLookupIndex.build(EMPTY_DEVICE_LIST, [])
 
 
 def make_sensor_mock() -> DiagralSensor:
@@ -26,6 +29,7 @@ def make_sensor_mock() -> DiagralSensor:
     sensor = object.__new__(DiagralSensor)
     sensor._attr_native_value = None
     sensor._attr_extra_state_attributes = {}
+    sensor._anomalies_renderer = DiagralAnomaliesRenderer()
     return sensor
 
 
@@ -35,7 +39,7 @@ class TestUpdateAnomalies:
     def test_no_anomalies_sets_value_to_zero(self):
         """None anomalies must set native_value to 0 and clear attributes."""
         sensor = make_sensor_mock()
-        sensor._update_anomalies(None, [], MagicMock())
+        sensor._update_anomalies(None, EMPTY_LOOKUP_INDEX)
         assert sensor._attr_native_value == 0
         assert sensor._attr_extra_state_attributes == {}
 
@@ -46,7 +50,7 @@ class TestUpdateAnomalies:
         with patch("custom_components.diagral.sensor.dt_util") as mock_dt:
             mock_dt.as_local.return_value.isoformat.return_value = "2024-01-01T00:00:00+00:00"
             mock_dt.now.return_value.isoformat.return_value = "2024-01-01T00:00:00"
-            sensor._update_anomalies(anomalies, [], EMPTY_DEVICE_LIST)
+            sensor._update_anomalies(anomalies, EMPTY_LOOKUP_INDEX)
         assert sensor._attr_native_value == 0
 
     def test_anomalies_count_is_correct(self):
@@ -61,7 +65,7 @@ class TestUpdateAnomalies:
         with patch("custom_components.diagral.sensor.dt_util") as mock_dt:
             mock_dt.as_local.return_value.isoformat.return_value = "2024-01-01T00:00:00+00:00"
             mock_dt.now.return_value.isoformat.return_value = "2024-01-01T00:00:00"
-            sensor._update_anomalies(anomalies, [], EMPTY_DEVICE_LIST)
+            sensor._update_anomalies(anomalies, EMPTY_LOOKUP_INDEX)
         assert sensor._attr_native_value == 2
 
     def test_anomalies_updated_at_is_set(self):
@@ -75,7 +79,7 @@ class TestUpdateAnomalies:
         with patch("custom_components.diagral.sensor.dt_util") as mock_dt:
             mock_dt.as_local.return_value.isoformat.return_value = "2024-01-01T00:00:00+00:00"
             mock_dt.now.return_value.isoformat.return_value = "2024-01-01T12:00:00"
-            sensor._update_anomalies(anomalies, [], EMPTY_DEVICE_LIST)
+            sensor._update_anomalies(anomalies, EMPTY_LOOKUP_INDEX)
         assert sensor._attr_extra_state_attributes.get("updated_at") == "2024-01-01T12:00:00"
 
 
@@ -158,3 +162,52 @@ class TestUpdateActiveGroups:
             sensor._update_active_groups(system_status, groups, alarm_config)
 
         assert sensor._attr_native_value == 0
+
+
+class TestChangeDetection:
+    """Tests for the state change detection of the sensors."""
+
+    def _update(self, sensor: DiagralSensor, activated_groups: list[int], now: str) -> bool:
+        """Update the active groups sensor at the given time."""
+        system_status = MagicMock(status="GROUP", activated_groups=activated_groups)
+        groups = [Group(index=1, name="Group 1"), Group(index=2, name="Group 2")]
+        with patch("custom_components.diagral.sensor.dt_util") as mock_dt:
+            mock_dt.now.return_value.isoformat.return_value = now
+            return sensor._update_active_groups(system_status, groups, MagicMock())
+
+    def test_first_update_is_a_change(self):
+        """The first update must be reported as a change."""
+        sensor = make_sensor_mock()
+        assert self._update(sensor, [1], "2024-01-01T00:00:00") is True
+        assert sensor._attr_extra_state_attributes["updated_at"] == "2024-01-01T00:00:00"
+
+    def test_unchanged_content_keeps_updated_at(self):
+        """An update with the same content must not change updated_at."""
+        sensor = make_sensor_mock()
+        self._update(sensor, [1], "2024-01-01T00:00:00")
+        attributes = sensor._attr_extra_state_attributes
+        assert self._update(sensor, [1], "2024-01-01T00:05:00") is False
+        assert sensor._attr_extra_state_attributes is attributes
+        assert attributes["updated_at"] == "2024-01-01T00:00:00"
+
+    def test_changed_content_refreshes_updated_at(self):
+        """An update with another content must refresh updated_at."""
+        sensor = make_sensor_mock()
+        self._update(sensor, [1], "2024-01-01T00:00:00")
+        assert self._update(sensor, [1, 2], "2024-01-01T00:05:00") is True
+        assert sensor._attr_native_value == 2
+        assert sensor._attr_extra_state_attributes["updated_at"] == "2024-01-01T00:05:00"
+
+    def test_unchanged_anomalies_are_not_a_change(self):
+        """The same anomalies from a new poll must not be reported as a change."""
+        sensor = make_sensor_mock()
+        anomalies = Anomalies(
+            created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            sensors=[AnomalyDetail(anomaly_names=[AnomalyName(id=1, name="Fault")])],
+        )
+        assert sensor._update_anomalies(anomalies, EMPTY_LOOKUP_INDEX) is True
+        assert sensor._update_anomalies(anomalies, EMPTY_LOOKUP_INDEX) is False
+
+    def test_updated_at_is_not_recorded(self):
+        """updated_at must be excluded from the recorder."""
+        assert "updated_at" in DiagralSensor._unrecorded_attributes
@@ -0,0 +1,44 @@
+"""Tests for DiagralStateSequencer in sequencer.py (Tier 2)."""
+from datetime import datetime, timedelta, timezone
+
+from custom_components.diagral.sequencer import DiagralStateSequencer
+
+T0 = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class TestDiagralStateSequencer:
+    """Tests for DiagralStateSequencer."""
+
+    def test_newer_events_are_accepted(self):
+        """Events in order must all be accepted."""
+        sequencer = DiagralStateSequencer()
+        assert sequencer.accept("STATUS", T0) is True
+        assert sequencer.accept("STATUS", T0 + timedelta(seconds=1)) is True
+        assert sequencer.as_dict()["newest"] == {"STATUS": "2024-01-01T12:00:01+00:00"}
+
+    def test_older_event_is_rejected(self):
+        """An event older than the newest of its category must be rejected."""
+        sequencer = DiagralStateSequencer()
+        sequencer.accept("STATUS", T0 + timedelta(seconds=5))
+        assert sequencer.accept("STATUS", T0) is False
+        assert sequencer.as_dict()["rejected"] == 1
+        assert sequencer.as_dict()["newest"]["STATUS"] == "2024-01-01T12:00:05+00:00"
+
+    def test_same_time_events_are_accepted(self):
+        """Events sharing the same time (several groups) must all be accepted."""
+        sequencer = DiagralStateSequencer()
+        assert sequencer.accept("STATUS", T0) is True
+        assert sequencer.accept("STATUS", T0) is True
+
+    def test_categories_are_independent(self):
+        """An older event of another category must be accepted."""
+        sequencer = DiagralStateSequencer()
+        sequencer.accept("STATUS", T0 + timedelta(seconds=5))
+        assert sequencer.accept("ANOMALY", T0) is True
+
+    def test_event_without_time_is_accepted(self):
+        """An event without time cannot be ordered and must be accepted."""
+        sequencer = DiagralStateSequencer()
+        sequencer.accept("STATUS", T0)
+        assert sequencer.accept("STATUS", None) is True
+        assert sequencer.as_dict()["accepted"] == 2
@@ -0,0 +1,231 @@
+"""Tests for the set_mode action in services.py (Tier 2).
+
+Config entries and their coordinators are mocked; the commands go through
+the alarm panels, the real command queue and confirmations. The fan-out benchmark runs with
+--benchmark.
+"""
+import asyncio
+import time
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from homeassistant.components.alarm_control_panel import AlarmControlPanelState
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.exceptions import ServiceValidationError
+from pydiagral.exceptions import DiagralAPIError
+
+from custom_components.diagral.alarm_control_panel import DiagralAlarmControlPanel
+from custom_components.diagral.commands import DiagralCommandQueue
+from custom_components.diagral.confirmation import DiagralCommandConfirmations
+from custom_components.diagral.const import (
+    CONF_ALARMPANEL_ACTIONTYPE_CODE,
+    CONF_ALARMPANEL_CODE,
+    CONF_SERIAL_ID,
+    INPUT_CODE,
+    INPUT_CONFIG_ENTRIES,
+    INPUT_MODE,
+    INPUT_SERIALS,
+)
+from custom_components.diagral.services import SET_MODE_SCHEMA, async_set_mode
+
+# Simulated round trip of a command to the Diagral cloud (seconds)
+COMMAND_LATENCY = 0.05
+
+
+def make_entry(index: int, actiontype_code: str = "never", latency: float = COMMAND_LATENCY) -> MagicMock:
+    """Return a loaded entry whose coordinator sends commands with a latency."""
+    entry = MagicMock()
+    entry.entry_id = f"entry{index}"
+    entry.title = f"Site {index}"
+    entry.state = ConfigEntryState.LOADED
+    entry.data = {CONF_SERIAL_ID: f"SERIAL{index}"}
+    entry.runtime_data.config.options.alarmpanel_options = {
+        CONF_ALARMPANEL_ACTIONTYPE_CODE: actiontype_code,
+        CONF_ALARMPANEL_CODE: 1234,
+    }
+    entry.runtime_data.command_queue = DiagralCommandQueue()
+    coordinator = entry.runtime_data.coordinator
+    coordinator.confirmations = DiagralCommandConfirmations()
+
+    async def send_command(waiter, *args):
+        await asyncio.sleep(latency)
+
+    coordinator.async_send_command = AsyncMock(side_effect=send_command)
+    entry.runtime_data.alarm_panel = make_panel(entry)
+    return entry
+
+
+def make_panel(entry: MagicMock) -> DiagralAlarmControlPanel:
+    """Return the disarmed alarm panel of an entry, recording its written states."""
+    panel = object.__new__(DiagralAlarmControlPanel)
+    panel.coordinator = entry.runtime_data.coordinator
+    panel._commands = entry.runtime_data.command_queue
+    panel._attr_alarm_state = AlarmControlPanelState.DISARMED
+    panel._pending_command = None
+    panel.writes = []
+    panel.async_write_ha_state = MagicMock(side_effect=lambda: panel.writes.append(panel._attr_alarm_state))
+    return panel
+
+
+def make_hass(entries: list[MagicMock]) -> MagicMock:
+    """Return a hass whose config entries are the given ones."""
+    hass = MagicMock()
+    hass.config_entries.async_entries.return_value = entries
+    return hass
+
+
+def make_call(**data) -> MagicMock:
+    """Return a set_mode call with validated data."""
+    call = MagicMock()
+    call.data = SET_MODE_SCHEMA(data)
+    return call
+
+
+class TestSetMode:
+    """Tests for async_set_mode()."""
+
+    async def test_all_sites_are_commanded(self):
+        """Each requested site must get the mode command and a result."""
+        entries = [make_entry(index) for index in range(3)]
+        call = make_call(**{INPUT_CONFIG_ENTRIES: ["entry0", "entry1"], INPUT_SERIALS: ["SERIAL2"], INPUT_MODE: "arm_away"})
+        response = await async_set_mode(make_hass(entries), call)
+        assert list(response["sites"]) == ["entry0", "entry1", "entry2"]
+        for entry in entries:
+            waiter = entry.runtime_data.coordinator.async_send_command.await_args.args[0]
+            assert waiter.command == "start_system"
+            assert response["sites"][entry.entry_id]["success"] is True
+            assert response["sites"][entry.entry_id]["serial"] == entry.data[CONF_SERIAL_ID]
+
+    async def test_sites_are_commanded_through_their_panel(self):
+        """The alarm panel of each site must show the transition state."""
+        entry = make_entry(0)
+        panel = entry.runtime_data.alarm_panel
+        call = make_call(**{INPUT_CONFIG_ENTRIES: ["entry0"], INPUT_MODE: "arm_away"})
+        await async_set_mode(make_hass([entry]), call)
+        assert panel.writes == [AlarmControlPanelState.ARMING]
+        assert panel._pending_command.command == "start_system"
+
+    async def test_failed_command_restores_the_panel(self):
+        """A failed command must restore the panel state and not stay pending."""
+        entry = make_entry(0)
+        entry.runtime_data.coordinator.async_send_command.side_effect = DiagralAPIError("boom")
+        panel = entry.runtime_data.alarm_panel
+        call = make_call(**{INPUT_CONFIG_ENTRIES: ["entry0"], INPUT_MODE: "arm_away"})
+        sites = (await async_set_mode(make_hass([entry]), call))["sites"]
+        assert sites["entry0"]["error"] == "boom"
+        assert panel.writes == [AlarmControlPanelState.ARMING, AlarmControlPanelState.DISARMED]
+        assert panel._pending_command is None
+
+    async def test_site_without_panel_is_unavailable(self):
+        """A site whose alarm panel is not set up must fail on its own."""
+        entry = make_entry(0)
+        entry.runtime_data.alarm_panel = None
+        call = make_call(**{INPUT_CONFIG_ENTRIES: ["entry0"], INPUT_MODE: "disarm"})
+        sites = (await async_set_mode(make_hass([entry]), call))["sites"]
+        assert sites["entry0"] == {"serial": "SERIAL0", "title": "Site 0", "success": False, "error": "unavailable"}
+        entry.runtime_data.coordinator.async_send_command.assert_not_awaited()
+
+    async def test_same_site_requested_twice_is_commanded_once(self):
+        """An entry requested by id and serial must be commanded once."""
+        entry = make_entry(0)
+        call = make_call(**{INPUT_CONFIG_ENTRIES: ["entry0"], INPUT_SERIALS: ["SERIAL0"], INPUT_MODE: "disarm"})
+        response = await async_set_mode(make_hass([entry]), call)
+        assert list(response["sites"]) == ["entry0"]
+        entry.runtime_data.coordinator.async_send_command.assert_awaited_once()
+
+    async def test_unknown_sites_are_rejected(self):
+        """Unknown or unloaded sites must raise before any command."""
+        loaded, unloaded = make_entry(0), make_entry(1)
+        unloaded.state = ConfigEntryState.NOT_LOADED
+        call = make_call(**{INPUT_SERIALS: ["SERIAL0", "SERIAL1", "NOPE"], INPUT_MODE: "disarm"})
+        with pytest.raises(ServiceValidationError) as err:
+            await async_set_mode(make_hass([loaded, unloaded]), call)
+        assert err.value.translation_placeholders == {"sites": "SERIAL1, NOPE"}
+        loaded.runtime_data.coordinator.async_send_command.assert_not_awaited()
+
+    async def test_failures_are_reported_per_site(self):
+        """Invalid codes and API errors must only fail their own site."""
+        ok, bad_code, api_error = make_entry(0), make_entry(1, "always"), make_entry(2)
+        api_error.runtime_data.coordinator.async_send_command.side_effect = DiagralAPIError("boom")
+        call = make_call(**{INPUT_CONFIG_ENTRIES: ["entry0", "entry1", "entry2"], INPUT_MODE: "arm_home", INPUT_CODE: "9999"})
+        sites = (await async_set_mode(make_hass([ok, bad_code, api_error]), call))["sites"]
+        assert sites["entry0"]["success"] is True
+        assert sites["entry1"] == {"serial": "SERIAL1", "title": "Site 1", "success": False, "error": "invalid_code"}
+        assert sites["entry2"]["success"] is False
+        bad_code.runtime_data.coordinator.async_send_command.assert_not_awaited()
+
+    async def test_unexpected_errors_are_reported_per_site(self):
+        """An error other than DiagralAPIError must not abort the other sites."""
+        ok, failing = make_entry(0), make_entry(1)
+        failing.runtime_data.coordinator.async_send_command.side_effect = TimeoutError()
+        call = make_call(**{INPUT_CONFIG_ENTRIES: ["entry0", "entry1"], INPUT_MODE: "disarm"})
+        sites = (await async_set_mode(make_hass([ok, failing]), call))["sites"]
+        assert sites["entry0"]["success"] is True
+        assert sites["entry1"]["success"] is False
+        assert sites["entry1"]["error"] == "TimeoutError()"
+
+    def test_entries_or_serials_are_required(self):
+        """A call without any site must be rejected by the schema."""
+        with pytest.raises(Exception):
+            SET_MODE_SCHEMA({INPUT_MODE: "disarm"})
+
+
+class TestSetModeConcurrency:
+    """Check the fan-out of the commands to the sites."""
+
+    async def test_concurrency_is_bounded(self):
+        """Sites must run concurrently, never more than the limit at a time."""
+        concurrency = 4
+        entries = [make_entry(index) for index in range(8)]
+        running = 0
+        peak = 0
+
+        def tracking(entry):
+            async def send_command(waiter, *args):
+                nonlocal running, peak
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(COMMAND_LATENCY)
+                running -= 1
+
+            entry.runtime_data.coordinator.async_send_command.side_effect = send_command
+
+        for entry in entries:
+            tracking(entry)
+        ids = [entry.entry_id for entry in entries]
+
+        await async_set_mode(
+            make_hass(entries),
+            make_call(**{INPUT_CONFIG_ENTRIES: ids, INPUT_MODE: "arm_away", "max_concurrency": 1}),
+        )
+        assert peak == 1
+
+        peak = 0
+        response = await async_set_mode(
+            make_hass(entries),
+            make_call(**{INPUT_CONFIG_ENTRIES: ids, INPUT_MODE: "arm_away", "max_concurrency": concurrency}),
+        )
+        assert peak == concurrency
+        assert all(site["success"] for site in response["sites"].values())
+
+
+@pytest.mark.benchmark
+class TestSetModeBenchmark:
+    """Benchmark the fan-out against one site at a time."""
+
+    async def test_concurrent_fan_out_is_faster(self):
+        """Sites commanded concurrently must take a fraction of the sequential time."""
+        concurrency = 4
+        entries = [make_entry(index) for index in range(8)]
+        ids = [entry.entry_id for entry in entries]
+        durations = {}
+        for max_concurrency in (1, concurrency):
+            call = make_call(**{INPUT_CONFIG_ENTRIES: ids, INPUT_MODE: "arm_away", "max_concurrency": max_concurrency})
+            start = time.perf_counter()
+            response = await async_set_mode(make_hass(entries), call)
+            durations[max_concurrency] = time.perf_counter() - start
+
+        print(f"\n{len(entries)} sites: sequential={durations[1] * 1000:.0f}ms concurrent={durations[concurrency] * 1000:.0f}ms")
+        assert durations[concurrency] < durations[1] / 2
+        assert response["duration"] >= COMMAND_LATENCY * len(entries) / concurrency
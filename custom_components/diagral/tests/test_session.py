@@ -0,0 +1,82 @@
+"""Tests for the shared client session in session.py (Tier 2).
+
+The statistics are fed by a real aiohttp session talking to a local server.
+"""
+from unittest.mock import MagicMock, patch
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from custom_components.diagral.session import (
+    DATA_CLIENT_SESSION,
+    DiagralSessionStats,
+    async_create_diagral_api,
+    async_get_client_session,
+)
+
+API_PARAMS = {
+    "username": "user@example.com",
+    "password": "secret",
+    "serial_id": "SERIAL123",
+}
+
+
+async def make_server() -> TestServer:
+    """Start a local server answering every request."""
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+class TestDiagralSessionStats:
+    """Tests for DiagralSessionStats."""
+
+    async def test_connections_are_reused(self):
+        """Sequential requests must reuse the first connection."""
+        stats = DiagralSessionStats()
+        server = await make_server()
+        try:
+            async with aiohttp.ClientSession(
+                trace_configs=[stats.trace_config()]
+            ) as session:
+                for _ in range(5):
+                    async with session.get(server.make_url("/")) as response:
+                        await response.read()
+        finally:
+            await server.close()
+        assert stats.as_dict() == {
+            "requests": 5,
+            "connections_created": 1,
+            "connections_reused": 4,
+            "reuse_ratio": 0.8,
+        }
+
+    def test_empty_stats(self):
+        """Stats without any connection must not divide by zero."""
+        assert DiagralSessionStats().as_dict()["reuse_ratio"] == 0.0
+
+
+class TestClientSession:
+    """Tests for the session shared by the Diagral API clients."""
+
+    def test_session_is_created_once(self, mock_hass):
+        """Every client must get the same session."""
+        mock_hass.data = {}
+        with patch(
+            "custom_components.diagral.session.async_create_clientsession",
+            return_value=MagicMock(),
+        ) as create:
+            first = async_create_diagral_api(mock_hass, **API_PARAMS)
+            second = async_create_diagral_api(mock_hass, **API_PARAMS)
+        create.assert_called_once()
+        assert first is not second
+        assert first.session is second.session
+        assert first.session is mock_hass.data[DATA_CLIENT_SESSION].session
+        assert async_get_client_session(mock_hass) is mock_hass.data[DATA_CLIENT_SESSION]
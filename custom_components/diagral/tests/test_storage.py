@@ -0,0 +1,125 @@
+"""Tests for the coordinator snapshot in storage.py (Tier 2).
+
+Checks the snapshot round trip with real pydiagral models and that a warm
+startup (snapshot restore) does not call the Diagral cloud, unlike a cold
+startup (live fetch). The startup benchmark runs with --benchmark.
+"""
+import json
+import time
+
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from pydiagral.models import AlarmConfiguration, Anomalies, DeviceList, SystemStatus
+
+from custom_components.diagral.lookup import DiagralLookupIndex
+from custom_components.diagral.storage import (
+    DiagralSnapshotStore,
+    deserialize_snapshot,
+    serialize_snapshot,
+)
+
+from .test_coordinator import StubDiagralAPI, make_coordinator
+
+
+def make_data() -> dict:
+    """Return coordinator data built from raw Diagral API payloads."""
+    alarm_config = AlarmConfiguration.from_dict(
+        {
+            "alarm": {
+                "name": "Home",
+                "central": {"serial": "SERIAL123", "firmwares": {"CENTRAL": "1.0", "CENTRALRADIO": "2.0"}},
+            },
+            "groups": [{"name": "Ground floor", "index": 1, "inputDelay": 30}],
+            "sensors": [{"index": 3, "label": "Front Door", "isVideo": False}],
+            "presenceGroup": [1],
+        }
+    )
+    devices_infos = DeviceList.from_dict(
+        {"cameras": [], "commands": [], "sensors": [{"index": 3, "label": "Front Door"}], "sirens": [], "transmitters": []}
+    )
+    return {
+        "alarm_config": alarm_config,
+        "devices_infos": devices_infos,
+        "groups": alarm_config.groups,
+        "lookup": DiagralLookupIndex.build(devices_infos, alarm_config.groups),
+        "system_status": SystemStatus.from_dict({"status": "GROUP", "activated_groups": [1]}),
+        "anomalies": Anomalies.from_dict(
+            {
+                "created_at": "2024-01-01T00:00:00",
+                "sensors": [{"index": 3, "group": 1, "anomaly_names": [{"id": 1, "name": "Low battery"}]}],
+            }
+        ),
+    }
+
+
+class TestSnapshotSerialization:
+    """Tests for serialize_snapshot() and deserialize_snapshot()."""
+
+    def test_round_trip_restores_equal_data(self):
+        """A JSON round trip must restore data equal to the original."""
+        data = make_data()
+        raw = json.loads(json.dumps(serialize_snapshot(data)))
+        assert deserialize_snapshot(raw) == data
+
+    def test_aliases_are_preserved(self):
+        """Aliased fields must be stored under their Diagral API name."""
+        raw = serialize_snapshot(make_data())
+        assert raw["alarm_config"]["groups"][0]["inputDelay"] == 30
+        assert raw["alarm_config"]["presenceGroup"] == [1]
+
+    def test_empty_anomalies_are_restored_as_is(self):
+        """An empty anomalies payload must not be parsed."""
+        data = {**make_data(), "anomalies": {}}
+        assert deserialize_snapshot(serialize_snapshot(data))["anomalies"] == {}
+
+    def test_incomplete_snapshot_is_ignored(self):
+        """A snapshot without system status must not be restored."""
+        raw = serialize_snapshot({**make_data(), "system_status": None})
+        assert deserialize_snapshot(raw) is None
+
+    def test_invalid_snapshot_is_ignored(self):
+        """A snapshot that cannot be parsed must not be restored."""
+        raw = serialize_snapshot(make_data())
+        raw["anomalies"] = {"sensors": []}  # created_at is required
+        assert deserialize_snapshot(raw) is None
+
+
+class TestStartup:
+    """Compare cold (live fetch) and warm (snapshot) startups."""
+
+    async def test_warm_startup_does_not_call_the_cloud(self):
+        """Restoring the snapshot must not wait for any cloud round trip."""
+        api = StubDiagralAPI()
+        await make_coordinator(api, True)._async_update_data()
+        assert api.calls
+
+        store = object.__new__(DiagralSnapshotStore)
+        store._store = MagicMock(async_load=AsyncMock(return_value=json.loads(json.dumps(serialize_snapshot(make_data())))))
+        api = StubDiagralAPI()
+        coordinator = make_coordinator(api, True)
+        coordinator.store = store
+        assert await coordinator.async_restore_snapshot() is True
+        assert coordinator.stale is True
+        assert api.calls == []
+
+
+@pytest.mark.benchmark
+class TestStartupBenchmark:
+    """Benchmark cold (live fetch) versus warm (snapshot) startup."""
+
+    async def test_warm_startup_is_faster_than_cold_startup(self):
+        """Restoring the snapshot must not wait for any cloud round trip."""
+        start = time.perf_counter()
+        await make_coordinator(StubDiagralAPI(), True)._async_update_data()
+        cold = time.perf_counter() - start
+
+        store = object.__new__(DiagralSnapshotStore)
+        store._store = MagicMock(async_load=AsyncMock(return_value=json.loads(json.dumps(serialize_snapshot(make_data())))))
+        coordinator = make_coordinator(StubDiagralAPI(), True)
+        coordinator.store = store
+        start = time.perf_counter()
+        assert await coordinator.async_restore_snapshot() is True
+        warm = time.perf_counter() - start
+
+        print(f"\ncold={cold * 1000:.1f}ms warm={warm * 1000:.1f}ms")
+        assert warm < cold
@@ -1,9 +1,11 @@
-"""Tests for enrich_data_alert_anomaly() in webhook.py (Tier 2).
+"""Tests for enrich_data_alert_anomaly() and webhook routing in webhook.py (Tier 2).
 
-Tests the pure data-enrichment function without any HTTP calls
-or Home Assistant event bus interaction.
+Tests the pure data-enrichment function and the webhook_id routing table
+without any HTTP calls or Home Assistant event bus interaction.
 """
 from datetime import datetime, timezone
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from pydiagral.models import (
@@ -11,9 +13,21 @@ from pydiagral.models import (
     DeviceList,
     WebHookNotification,
     WebHookNotificationDetail,
+    WebHookNotificationUser,
 )
 
-from custom_components.diagral.webhook import enrich_data_alert_anomaly
+from custom_components.diagral.dedup import DiagralWebhookDeduplicator
+from custom_components.diagral.ingestion import DiagralWebhookQueue
+from custom_components.diagral.lookup import DiagralLookupIndex
+from custom_components.diagral.webhook import (
+    DATA_WEBHOOK_ROUTES,
+    async_register_webhook_handler,
+    async_unregister_webhook_handler,
+    enrich_data_alert_anomaly,
+    build_event_data,
+    handle_webhook,
+    publish_event,
+)
 
 
 def make_notification(device_type: str | None, device_index: str | None) -> WebHookNotification:
@@ -48,14 +62,14 @@ class TestEnrichDataAlertAnomaly:
     def test_device_type_none_skips_enrichment(self):
         """When device_type is None, data must be returned unchanged."""
         data = make_notification(device_type=None, device_index="1")
-        result = enrich_data_alert_anomaly(data, make_device_list(), {})
+        result = enrich_data_alert_anomaly(data, DiagralLookupIndex.build(make_device_list(), []))
         assert result is data
         assert result.detail.device_label is None
 
     def test_device_index_none_skips_enrichment(self):
         """When device_index is None, data must be returned unchanged."""
         data = make_notification(device_type="sensor", device_index=None)
-        result = enrich_data_alert_anomaly(data, make_device_list(), {})
+        result = enrich_data_alert_anomaly(data, DiagralLookupIndex.build(make_device_list(), []))
         assert result is data
         assert result.detail.device_label is None
 
@@ -63,26 +77,126 @@ class TestEnrichDataAlertAnomaly:
         """When a matching device is found, device_label must be set."""
         data = make_notification(device_type="sensor", device_index="5")
         devices = make_device_list(sensors=[DeviceInfos(index=5, label="Front Door")])
-        result = enrich_data_alert_anomaly(data, devices, {})
+        result = enrich_data_alert_anomaly(data, DiagralLookupIndex.build(devices, []))
         assert result.detail.device_label == "Front Door"
 
     def test_no_matching_device_leaves_label_none(self):
         """When no device matches the index, device_label must remain None."""
         data = make_notification(device_type="sensor", device_index="99")
         devices = make_device_list(sensors=[DeviceInfos(index=5, label="Front Door")])
-        result = enrich_data_alert_anomaly(data, devices, {})
+        result = enrich_data_alert_anomaly(data, DiagralLookupIndex.build(devices, []))
         assert result.detail.device_label is None
 
     def test_unknown_device_type_leaves_label_none(self):
         """When device_type doesn't match any DeviceList attribute, label stays None."""
         data = make_notification(device_type="unknowndevice", device_index="1")
         devices = make_device_list(sensors=[DeviceInfos(index=1, label="Sensor A")])
-        result = enrich_data_alert_anomaly(data, devices, {})
+        result = enrich_data_alert_anomaly(data, DiagralLookupIndex.build(devices, []))
         assert result.detail.device_label is None
 
     def test_device_type_is_lowercased_and_pluralized(self):
         """device_type 'SENSOR' must match 'sensors' attribute on DeviceList."""
         data = make_notification(device_type="SENSOR", device_index="3")
         devices = make_device_list(sensors=[DeviceInfos(index=3, label="Back Door")])
-        result = enrich_data_alert_anomaly(data, devices, {})
+        result = enrich_data_alert_anomaly(data, DiagralLookupIndex.build(devices, []))
         assert result.detail.device_label == "Back Door"
+
+
+class TestWebhookRouting:
+    """Tests for the webhook_id to config entry routing table."""
+
+    @pytest.fixture
+    def hass(self):
+        """Return a mock Home Assistant instance with real hass.data."""
+        hass = MagicMock()
+        hass.data = {}
+        return hass
+
+    def test_register_adds_route_and_bound_handler(self, hass):
+        """Registration must route the webhook_id to its entry."""
+        entry = MagicMock()
+        with patch("custom_components.diagral.webhook.webhook_async_register") as register, patch(
+            "custom_components.diagral.webhook.webhook_async_unregister"
+        ):
+            async_register_webhook_handler(hass, entry, "abc")
+        assert hass.data[DATA_WEBHOOK_ROUTES] == {"abc": entry}
+        handler = register.call_args.args[4]
+        assert handler.func is handle_webhook
+        assert handler.args == (entry,)
+
+    def test_unregister_removes_route(self, hass):
+        """Unregistration must remove the route and tolerate unknown ids."""
+        hass.data[DATA_WEBHOOK_ROUTES] = {"abc": MagicMock()}
+        with patch("custom_components.diagral.webhook.webhook_async_unregister"):
+            async_unregister_webhook_handler(hass, "abc")
+            async_unregister_webhook_handler(hass, "unknown")
+        assert hass.data[DATA_WEBHOOK_ROUTES] == {}
+
+    async def test_duplicate_delivery_is_dropped(self, hass):
+        """A notification delivered twice must only be processed once."""
+        entry = MagicMock()
+        entry.runtime_data.webhook_dedup = DiagralWebhookDeduplicator()
+        entry.runtime_data.webhook_queue = DiagralWebhookQueue()
+        hass.data[DATA_WEBHOOK_ROUTES] = {"abc": entry}
+        request = MagicMock(json=AsyncMock(return_value={}))
+        with patch(
+            "custom_components.diagral.webhook.WebHookNotification.from_dict",
+            side_effect=lambda _: make_notification("SENSOR", "1"),
+        ):
+            await handle_webhook(entry, hass, "abc", request)
+            await handle_webhook(entry, hass, "abc", request)
+        assert entry.runtime_data.webhook_queue.as_dict()["depth"] == 1
+
+    async def test_unrouted_webhook_is_ignored(self, hass):
+        """A request for a webhook_id no longer routed to the entry must be ignored."""
+        hass.data[DATA_WEBHOOK_ROUTES] = {"abc": MagicMock()}
+        request = MagicMock(json=AsyncMock())
+        await handle_webhook(MagicMock(), hass, "abc", request)
+        request.json.assert_not_awaited()
+
+
+class TestPublishEvent:
+    """Tests for publish_event()."""
+
+    def test_signal_is_scoped_to_entry(self):
+        """Webhook events must only be dispatched to the entities of their entry."""
+        hass = MagicMock()
+        with patch("custom_components.diagral.webhook.async_dispatcher_send") as send:
+            publish_event(hass, "entry1", "ALERT", {"alarm_code": "1130"})
+        assert send.call_args.args[1] == "signal-diagral-webhook-entry1-ALERT"
+        assert send.call_args.args[2] == {"type": "ALERT", "data": {"alarm_code": "1130"}}
+
+    def test_catch_all_and_typed_events_are_fired(self):
+        """Events must be fired as DIAGRAL_EVENT and as DIAGRAL_<type>."""
+        hass = MagicMock()
+        with patch("custom_components.diagral.webhook.async_dispatcher_send"):
+            publish_event(hass, "entry1", "ALERT", {"alarm_code": "1130"})
+        event_data = {"type": "ALERT", "data": {"alarm_code": "1130"}}
+        assert [call.args for call in hass.bus.async_fire.call_args_list] == [
+            ("DIAGRAL_EVENT", event_data),
+            ("DIAGRAL_ALERT", event_data),
+        ]
+
+
+class TestBuildEventData:
+    """Tests for build_event_data()."""
+
+    def test_payload_is_json_native(self):
+        """Nested models and datetimes must be converted to JSON types."""
+        data = make_notification(device_type="SENSOR", device_index="3")
+        data.detail.device_label = "Front Door"
+        data.user = WebHookNotificationUser(username="John", user_type="owner")
+        assert build_event_data(data) == {
+            "transmitter_id": "TX001",
+            "alarm_code": "123",
+            "alarm_description": "Test alert",
+            "group_index": "1",
+            "detail": {"device_type": "SENSOR", "device_index": "3", "device_label": "Front Door"},
+            "user": {"username": "John", "user_type": "owner"},
+            "date_time": "2024-01-01T00:00:00+00:00",
+        }
+        json.dumps(build_event_data(data))
+
+    def test_missing_user_is_none(self):
+        """A notification without user must have a None user."""
+        assert build_event_data(make_notification(None, None))["user"] is None
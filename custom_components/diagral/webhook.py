@@ -1,72 +1,137 @@
 """Module to handle incoming webhooks from Diagral."""
 
+from __future__ import annotations
+
+from dataclasses import asdict
+from functools import partial
 import logging
+from typing import TYPE_CHECKING, Any
 
 from aiohttp.web import Request
-from pydiagral.models import DeviceInfos, DeviceList, WebHookNotification
+from pydiagral.models import DeviceInfos, WebHookNotification
 
-from homeassistant.core import HomeAssistant
+from homeassistant.components.webhook import (
+    async_register as webhook_async_register,
+    async_unregister as webhook_async_unregister,
+)
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.dispatcher import async_dispatcher_send
-
-from .const import DOMAIN
+from homeassistant.util.hass_dict import HassKey
+
+from .const import (
+    ALARM_CODE_CONFIGURATION_CHANGED,
+    DOMAIN,
+    EVENT_WEBHOOK,
+    EVENT_WEBHOOK_TYPED,
+    SIGNAL_WEBHOOK_EVENT,
+)
 from .coordinator import DiagralDataUpdateCoordinator
+from .lookup import EMPTY_LOOKUP_INDEX, DiagralLookupIndex
+
+if TYPE_CHECKING:
+    from . import DiagralConfigEntry
 
 _LOGGER = logging.getLogger(__name__)
 
+# Routing table of the registered webhooks: webhook_id -> config entry
+DATA_WEBHOOK_ROUTES: HassKey[dict[str, DiagralConfigEntry]] = HassKey(
+    f"{DOMAIN}_webhook_routes"
+)
+
+
+@callback
+def async_register_webhook_handler(
+    hass: HomeAssistant, entry: DiagralConfigEntry, webhook_id: str
+) -> None:
+    """Register the webhook handler bound to its config entry."""
+    # The handler may still be registered when the registration is requested again
+    async_unregister_webhook_handler(hass, webhook_id)
+    webhook_async_register(
+        hass, DOMAIN, "Diagral Webhook", webhook_id, partial(handle_webhook, entry)
+    )
+    hass.data.setdefault(DATA_WEBHOOK_ROUTES, {})[webhook_id] = entry
+
+
+@callback
+def async_unregister_webhook_handler(hass: HomeAssistant, webhook_id: str) -> None:
+    """Unregister the webhook handler and its route."""
+    webhook_async_unregister(hass, webhook_id)
+    hass.data.get(DATA_WEBHOOK_ROUTES, {}).pop(webhook_id, None)
+
 
 async def handle_webhook(
-    hass: HomeAssistant, webhook_id: str, request: Request
+    entry: DiagralConfigEntry, hass: HomeAssistant, webhook_id: str, request: Request
 ) -> None:
-    """Handle incoming webhook from Diagral."""
+    """Handle incoming webhook from Diagral for the entry it is bound to."""
+    # Ignore requests still in flight for a webhook unregistered in the meantime
+    if hass.data.get(DATA_WEBHOOK_ROUTES, {}).get(webhook_id) is not entry:
+        _LOGGER.error("No entry found for webhook_id: %s", webhook_id)
+        return
+
     try:
         data_received = await request.json()
         _LOGGER.debug("Received webhook data: %s", data_received)
         data = WebHookNotification.from_dict(data_received)
         _LOGGER.debug("Received webhook data (parsed): %s", data)
 
-        # Retrieve the entry_id from the webhook_id
-        entry_id = next(
-            (
-                entry.entry_id
-                for entry in hass.config_entries.async_entries(DOMAIN)
-                if entry.runtime_data.webhook_id == webhook_id
-            ),
-            None,
-        )
-        if entry_id is None:
-            _LOGGER.error("No entry found for webhook_id: %s", webhook_id)
+        # The Diagral cloud retries notifications: drop them before any work
+        if entry.runtime_data.webhook_dedup.is_duplicate(notification_key(data)):
+            _LOGGER.debug("Dropping duplicate webhook notification: %s", data)
             return
 
-        # Retrieve the config entry from the entry_id
-        entry = hass.config_entries.async_get_entry(entry_id)
-        if entry is None:
-            _LOGGER.error("No config entry found for entry_id: %s", entry_id)
-            return
+        # Processed in order by the queue worker, the request is answered now
+        entry.runtime_data.webhook_queue.async_put(data)
+
+    except ValueError:
+        _LOGGER.error("Received invalid JSON data from webhook")
 
-        # Retrieve the alarm_config from the coordinator
-        coordinator: DiagralDataUpdateCoordinator = entry.runtime_data.coordinator
-        devices_infos: DeviceList = coordinator.data.get("devices_infos", {})
-        groups = coordinator.data.get("groups", {})
 
-        # Check the alarm type and handle the request accordingly
-        if data.alarm_type in ["STATUS", "ANOMALY"]:
-            _LOGGER.debug("Received status change webhook (type: %s)", data.alarm_type)
+async def async_process_notification(
+    hass: HomeAssistant, entry: DiagralConfigEntry, data: WebHookNotification
+) -> None:
+    """Apply a webhook notification and publish its events."""
+    # Retrieve the coordinator of the entry
+    coordinator: DiagralDataUpdateCoordinator = entry.runtime_data.coordinator
+    coordinator.async_webhook_received()
+
+    # Check the alarm type and handle the request accordingly
+    if data.alarm_type == "STATUS":
+        _LOGGER.debug("Received status change webhook (code: %s)", data.alarm_code)
+        if int(data.alarm_code) == ALARM_CODE_CONFIGURATION_CHANGED:
+            coordinator.async_invalidate_static_data("configuration changed")
             await coordinator.async_request_refresh()
-
-        # Enrich the data with additional information
-        if data.alarm_type in ["ALERT", "ANOMALY"]:
-            enriched_data = enrich_data_alert_anomaly(data, devices_infos, groups)
+        elif not coordinator.async_apply_status_notification(data):
+            _LOGGER.debug("Status webhook cannot be applied, refreshing data")
+            await coordinator.async_request_refresh()
+    elif data.alarm_type == "ANOMALY":
+        _LOGGER.debug("Received anomaly webhook (code: %s)", data.alarm_code)
+        # A newer anomaly notification already fetched the current anomalies
+        if coordinator.sequencer.accept("ANOMALY", data.date_time):
+            await coordinator.async_refresh_anomalies()
         else:
-            enriched_data = data
-        # Publish the event to the event bus
-        publish_event(hass, enriched_data.__dict__)
+            _LOGGER.debug("Out of order anomaly webhook, skipping refresh")
 
-    except ValueError:
-        _LOGGER.error("Received invalid JSON data from webhook")
+    # Enrich the data with additional information
+    if data.alarm_type in ["ALERT", "ANOMALY"]:
+        enriched_data = enrich_data_alert_anomaly(
+            data, coordinator.data.get("lookup", EMPTY_LOOKUP_INDEX)
+        )
+    else:
+        enriched_data = data
+    # Publish the event to the entities and the event bus, the data is built
+    # once per notification since duplicates never reach the queue
+    publish_event(
+        hass, entry.entry_id, data.alarm_type, build_event_data(enriched_data)
+    )
+
+
+def notification_key(data: WebHookNotification) -> tuple:
+    """Return the key identifying a notification across deliveries."""
+    return (data.transmitter_id, data.alarm_code, data.date_time, data.group_index)
 
 
 def enrich_data_alert_anomaly(
-    data: WebHookNotification, devices_infos: DeviceList, groups: dict
+    data: WebHookNotification, lookup: DiagralLookupIndex
 ) -> WebHookNotification:
     """Enrich the data with additional information."""
 
@@ -75,39 +140,46 @@ def enrich_data_alert_anomaly(
         _LOGGER.debug("Device type or index is None, skipping enrichment")
         return data
 
-    webhook_device_types = (
-        data.detail.device_type.lower() + "s"
-    )  # Adding 's' to match the key in devices_infos
-    webhook_device_index = int(data.detail.device_index)
-
-    device_info: DeviceInfos | None = None
-    _LOGGER.debug("Webhook device types: %s", webhook_device_types)
-    _LOGGER.debug("Enriching data with device_infos: %s", devices_infos)
-    # if webhook_device_types in devices_infos:
-    if hasattr(devices_infos, webhook_device_types):
-        device_list = getattr(devices_infos, webhook_device_types)
-        device_info = next(
-            (info for info in device_list if info.index == webhook_device_index),
-            None,
-        )
+    device_info: DeviceInfos | None = lookup.device(
+        data.detail.device_type, int(data.detail.device_index)
+    )
     if device_info:
         data.detail.device_label = device_info.label
     return data
 
 
-def publish_event(hass: HomeAssistant, data: dict) -> None:
-    """Publish event to the event bus."""
-    event_type = data.pop("alarm_type", None)
-    _LOGGER.debug("Publishing event %s : %s", event_type, data)
-    async_dispatcher_send(
-        hass,
-        f"signal-{DOMAIN}-webhook-{event_type}",
-        {"type": event_type, "data": data},
-    )
+def build_event_data(data: WebHookNotification) -> dict[str, Any]:
+    """Return the JSON-native data of a notification, shared by all consumers."""
+    return {
+        "transmitter_id": data.transmitter_id,
+        "alarm_code": data.alarm_code,
+        "alarm_description": data.alarm_description,
+        "group_index": data.group_index,
+        "detail": asdict(data.detail) if data.detail else None,
+        "user": asdict(data.user) if data.user else None,
+        "date_time": data.date_time.isoformat() if data.date_time else None,
+    }
+
 
+def publish_event(
+    hass: HomeAssistant, entry_id: str, event_type: str, data: dict[str, Any]
+) -> None:
+    """Publish event to the entities of the entry and to the event bus."""
+    _LOGGER.debug("Publishing event %s : %s", event_type, data)
+    # The same payload is shared by the dispatcher and the bus events
     event_data = {
         "type": event_type,
         "data": data,
     }
+    async_dispatcher_send(
+        hass,
+        SIGNAL_WEBHOOK_EVENT.format(entry_id=entry_id, alarm_type=event_type),
+        event_data,
+    )
 
-    hass.bus.async_fire(f"{DOMAIN.upper()}_EVENT", event_data)
+    hass.bus.async_fire(EVENT_WEBHOOK, event_data)
+    # Typed event, so that automations can listen to a single alarm type
+    if event_type:
+        hass.bus.async_fire(
+            EVENT_WEBHOOK_TYPED.format(alarm_type=event_type), event_data
+        )